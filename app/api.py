@@ -0,0 +1,133 @@
+"""
+Routes API additionnelles montées devant le backend Reflex (api_transformer).
+"""
+
+import hmac
+import os
+from datetime import date
+from typing import Optional
+
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+
+from .services.config_loader import config_loader
+from .services.download_tokens import download_tokens
+from .services.pdf_cache import pdf_cache
+from .services.prewarm import prewarm_status
+from .services.report_bundle import iter_bundle
+from .services.simulation_export import EXPORT_FORMATS, SimulationExport, stream_export
+from .services.simulation_repository import SimulationFilters
+
+
+# Jeton d'administration (routes /admin/* désactivées s'il est vide)
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN", "")
+
+api = FastAPI()
+
+
+def _check_admin_token(token: str):
+    """Vérifie le jeton d'administration envoyé dans l'en-tête X-Admin-Token."""
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not token or not hmac.compare_digest(token, ADMIN_API_TOKEN):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+@api.get("/ping")
+async def ping():
+    """
+    Health check: 503 tant que le préchargement des fiches n'est pas
+    terminé (ou expiré), afin que le proxy n'envoie pas de trafic trop tôt.
+    """
+    status = prewarm_status.to_dict()
+    if not prewarm_status.is_ready:
+        return JSONResponse(status_code=503, content={"status": "warming", "prewarm": status})
+    return {"status": "ready", "prewarm": status}
+
+
+@api.post("/admin/fiches/invalidate")
+async def invalidate_all_fiches(x_admin_token: str = Header(default="")):
+    """
+    Invalide toutes les configurations de fiches en cache.
+    Le cache vidé est celui de ce worker (les autres revalident le leur par
+    ETag à la fin du TTL); l'éviction du snapshot est publiée dans le bucket
+    et atteint les autres workers sous CATALOG_EVICTIONS_REFRESH.
+    """
+    _check_admin_token(x_admin_token)
+    count = config_loader.invalidate_fiche_config()
+    return {"invalidated": count}
+
+
+@api.post("/admin/fiches/{fiche_code}/invalidate")
+async def invalidate_fiche(fiche_code: str, x_admin_token: str = Header(default="")):
+    """
+    Invalide la configuration d'une fiche republiée dans le bucket.
+    Les autres workers l'évincent du snapshot à leur prochaine vérification
+    (CATALOG_EVICTIONS_REFRESH) et revalident leur cache par ETag à la fin du TTL.
+    """
+    _check_admin_token(x_admin_token)
+    count = config_loader.invalidate_fiche_config(fiche_code)
+    return {"fiche_code": fiche_code, "invalidated": count}
+
+
+async def _export_response(user_id: Optional[str], filters: SimulationFilters, fmt: str) -> StreamingResponse:
+    """Réponse diffusée d'un export (en-têtes connus avant la première ligne)."""
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=404, detail="Not found")
+    # Liste des paramètres: requête bloquante, hors de la boucle d'événements
+    export = await run_in_threadpool(SimulationExport, user_id, filters)
+    filename = f"simulations_{date.today().isoformat()}.{fmt}"
+    return StreamingResponse(
+        stream_export(export, fmt),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@api.get("/export/simulations.{fmt}")
+async def export_simulations(fmt: str, token: str = ""):
+    """Export de l'historique de l'utilisateur (jeton émis par DashboardState.export_history)."""
+    payload = download_tokens.verify(token, "export")
+    if payload is None:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    filters = SimulationFilters(**{
+        key: str(value) for key, value in (payload.get("filters") or {}).items()
+        if key in SimulationFilters.__dataclass_fields__
+    })
+    return await _export_response(payload["sub"], filters, fmt)
+
+
+@api.get("/export/reports/dossier.zip")
+async def download_report_bundle(token: str = ""):
+    """Archive ZIP des rapports d'une sélection (jeton émis par DashboardState.build_bulk_report)."""
+    payload = download_tokens.verify(token, "bundle")
+    if payload is None:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    simulation_ids = [str(sim_id) for sim_id in payload.get("ids") or []]
+    filename = f"rapports_simulations_{date.today().isoformat()}.zip"
+    return StreamingResponse(
+        iter_bundle(payload["sub"], simulation_ids),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@api.get("/export/reports/{key}.pdf")
+async def download_report(key: str, token: str = ""):
+    """Rapport PDF en cache (jeton émis avec son empreinte, voir report_download_url)."""
+    payload = download_tokens.verify(token, "report")
+    if payload is None or payload.get("report") != key:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    path = await run_in_threadpool(pdf_cache.local_path, key, bool(payload.get("shared")))
+    if path is None:
+        raise HTTPException(status_code=410, detail="Gone")
+    # Content-Length connu, fichier envoyé par blocs
+    return FileResponse(path, media_type="application/pdf", filename=payload.get("filename") or f"{key}.pdf")
+
+
+@api.get("/admin/simulations/export.{fmt}")
+async def export_all_simulations(fmt: str, user_id: str = "", x_admin_token: str = Header(default="")):
+    """Export de l'historique d'un utilisateur, ou de tous si user_id est vide."""
+    _check_admin_token(x_admin_token)
+    return await _export_response(user_id or None, SimulationFilters(), fmt)
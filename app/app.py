@@ -14,6 +14,10 @@ Application Reflex avec Supabase backend
 import reflex as rx
 
 from .pages import landing_page
+from .api import api
+from .services.prewarm import prewarm_fiche_catalog
+from .services.catalog_snapshot import refresh_catalog_snapshot
+from .services.execution_pool import start_execution_pool
 
 
 @rx.page(route="/", title="RDE Consulting - Accueil")
@@ -30,4 +34,12 @@ app = rx.App(
     stylesheets=[
         "https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap",
     ],
-)
\ No newline at end of file
+    api_transformer=api,
+)
+
+# Préchargement du catalogue des fiches au démarrage (voir /ping)
+app.register_lifespan_task(prewarm_fiche_catalog)
+# Snapshot du catalogue: chargement au démarrage et rafraîchissement périodique
+app.register_lifespan_task(refresh_catalog_snapshot)
+# Pool de processus pour le code des fiches (FICHE_EXECUTION_BACKEND=pool)
+app.register_lifespan_task(start_execution_pool)
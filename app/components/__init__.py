@@ -8,6 +8,7 @@ from .kpi_card import kpi_card, kpi_grid, mini_kpi, result_card
 from .selector_grid import selector_card, selector_grid, typology_card, beneficiary_card
 from .stepper import step_indicator, simulation_stepper, progress_bar, step_navigation
 from .simulation_table import simulation_table, simulation_row
+from .virtual_list import virtual_list, virtual_table_body, in_view
 from .dynamic_form import form_field, dynamic_form_field, simulator_form, form_summary
 
 __all__ = [
@@ -37,6 +38,10 @@ __all__ = [
     # Table
     "simulation_table",
     "simulation_row",
+    # Virtual list
+    "virtual_list",
+    "virtual_table_body",
+    "in_view",
     # Form
     "form_field",
     "dynamic_form_field",
@@ -4,7 +4,12 @@ Composant Simulation Table - Tableau des simulations pour le dashboard.
 
 import reflex as rx
 from ..styles import COLORS, SHADOWS, RADIUS
-from ..state.user_state import UserState
+from ..state.user_state import UserState, FILTER_DEBOUNCE_MS
+from .virtual_list import virtual_table_body
+
+
+# Hauteur fixe d'une ligne (réservation des lignes hors fenêtre)
+ROW_HEIGHT = 64
 
 
 def table_header_cell(
@@ -166,6 +171,7 @@ def simulation_row(simulation: dict) -> rx.Component:
                 spacing="1",
             ),
         ),
+        height=f"{ROW_HEIGHT}px",
         _hover={"background": COLORS["background"]},
     )
 
@@ -175,11 +181,14 @@ def simulation_table() -> rx.Component:
     return rx.box(
         # Filtres
         rx.hstack(
-            rx.input(
-                placeholder="Rechercher...",
-                value=UserState.filter_search,
-                on_change=UserState.set_filter_search,
-                width="250px",
+            rx.debounce_input(
+                rx.input(
+                    placeholder="Rechercher...",
+                    value=UserState.filter_search,
+                    on_change=UserState.set_filter_search,
+                    width="250px",
+                ),
+                debounce_timeout=FILTER_DEBOUNCE_MS,
             ),
             rx.select(
                 [""] + UserState.available_sectors,
@@ -212,24 +221,34 @@ def simulation_table() -> rx.Component:
             gap="2",
         ),
         
-        # Tableau
-        rx.table.root(
-            rx.table.header(
-                rx.table.row(
-                    table_header_cell("Simulation", "name", True),
-                    table_header_cell("Date", "created_at", True),
-                    table_header_cell("Secteur", "sector", True),
-                    table_header_cell("Typologie", "typology", True),
-                    table_header_cell("Résultat", "result_euros", True),
-                    table_header_cell("Actions"),
+        # Tableau (seule la fenêtre courante est rendue)
+        rx.box(
+            rx.table.root(
+                rx.table.header(
+                    rx.table.row(
+                        table_header_cell("Simulation", "name", True),
+                        table_header_cell("Date", "created_at", True),
+                        table_header_cell("Secteur", "sector", True),
+                        table_header_cell("Typologie", "typology", True),
+                        table_header_cell("Résultat", "result_euros", True),
+                        table_header_cell("Actions"),
+                    ),
                 ),
-            ),
-            rx.table.body(
-                rx.foreach(
-                    UserState.paginated_simulations,
+                virtual_table_body(
+                    UserState.simulations,
                     simulation_row,
+                    window_start=UserState.window_start,
+                    total=UserState.filtered_count,
+                    has_more=UserState.window_has_more,
+                    row_height=ROW_HEIGHT,
+                    on_window_back=UserState.window_back,
+                    on_window_forward=UserState.window_forward,
+                    col_span=6,
                 ),
+                width="100%",
             ),
+            max_height="640px",
+            overflow_y="auto",
             width="100%",
         ),
         
@@ -259,44 +278,14 @@ def simulation_table() -> rx.Component:
             rx.box(),
         ),
         
-        # Pagination
+        # Compteur
         rx.cond(
             UserState.total_simulations > 0,
             rx.hstack(
-                rx.hstack(
-                    rx.text(
-                        f"{UserState.total_simulations} simulation(s)",
-                        font_size="0.875rem",
-                        color=COLORS["text_muted"],
-                    ),
-                    rx.select(
-                        ["10", "25", "50"],
-                        value=str(UserState.page_size),
-                        on_change=UserState.set_page_size,
-                        width="80px",
-                    ),
-                    rx.text("par page", font_size="0.875rem", color=COLORS["text_muted"]),
-                    spacing="2",
-                ),
-                rx.spacer(),
-                rx.hstack(
-                    rx.icon_button(
-                        rx.icon(tag="chevron-left", size=18),
-                        variant="ghost",
-                        disabled=UserState.current_page <= 1,
-                        on_click=UserState.previous_page,
-                    ),
-                    rx.text(
-                        f"Page {UserState.current_page} / {UserState.total_pages}",
-                        font_size="0.875rem",
-                    ),
-                    rx.icon_button(
-                        rx.icon(tag="chevron-right", size=18),
-                        variant="ghost",
-                        disabled=UserState.current_page >= UserState.total_pages,
-                        on_click=UserState.next_page,
-                    ),
-                    spacing="2",
+                rx.text(
+                    f"{UserState.filtered_count} simulation(s)",
+                    font_size="0.875rem",
+                    color=COLORS["text_muted"],
                 ),
                 width="100%",
                 padding="1rem",
@@ -0,0 +1,116 @@
+"""
+Composant Virtual List - Listes et tableaux virtualisés.
+
+Seule la fenêtre courante (fournie par l'état, voir state/virtual_window.py)
+est rendue. La hauteur des lignes hors fenêtre est réservée par deux zones
+observées (react-intersection-observer): quand le défilement atteint l'une
+d'elles, l'état décale la fenêtre et renvoie les lignes correspondantes.
+Chaque zone est remontée à chaque décalage (clé = début de fenêtre) pour être
+signalée à nouveau si elle reste visible après un défilement rapide.
+"""
+
+import reflex as rx
+from reflex.event import EventHandler, passthrough_event_spec
+
+
+class InView(rx.Component):
+    """Élément observé: on_change(True) quand il entre dans la zone visible."""
+
+    library = "react-intersection-observer@9.16.0"
+    tag = "InView"
+
+    # Élément HTML rendu (div par défaut, tr dans un tableau)
+    as_: rx.Var[str]
+    # Marge autour de la zone visible (anticipation du chargement)
+    root_margin: rx.Var[str]
+    threshold: rx.Var[float]
+
+    on_change: EventHandler[passthrough_event_spec(bool)]
+
+
+in_view = InView.create
+
+
+def _reserved_zone(rows, row_height: int, key, on_reach, *children, **props) -> rx.Component:
+    """Zone réservant la hauteur de `rows` lignes hors fenêtre (1px minimum)."""
+    return in_view(
+        *children,
+        key=key,
+        root_margin="400px",
+        on_change=on_reach,
+        style={"height": f"max(1px, calc({rows} * {row_height}px))"},
+        **props,
+    )
+
+
+def virtual_list(
+    items: rx.Var,
+    render_fn,
+    window_start: rx.Var,
+    total: rx.Var,
+    has_more: rx.Var,
+    row_height: int,
+    on_window_back,
+    on_window_forward,
+    **props,
+) -> rx.Component:
+    """
+    Liste virtualisée.
+
+    Args:
+        items: Lignes de la fenêtre courante
+        render_fn: Rendu d'une ligne
+        window_start: Position de la première ligne de la fenêtre
+        total: Nombre total de lignes
+        has_more: Des lignes existent après la fenêtre
+        row_height: Hauteur d'une ligne (px, espacement compris)
+        on_window_back: Événement (bool) pour reculer la fenêtre
+        on_window_forward: Événement (bool) pour avancer la fenêtre
+    """
+    return rx.box(
+        rx.cond(
+            window_start > 0,
+            _reserved_zone(window_start, row_height, window_start, on_window_back),
+        ),
+        rx.foreach(items, render_fn),
+        rx.cond(
+            has_more,
+            _reserved_zone(total - window_start - items.length(), row_height, window_start, on_window_forward),
+        ),
+        display="grid",
+        **props,
+    )
+
+
+def virtual_table_body(
+    items: rx.Var,
+    render_fn,
+    window_start: rx.Var,
+    total: rx.Var,
+    has_more: rx.Var,
+    row_height: int,
+    on_window_back,
+    on_window_forward,
+    col_span: int,
+) -> rx.Component:
+    """
+    Corps de tableau virtualisé (mêmes arguments que virtual_list).
+
+    Args:
+        col_span: Nombre de colonnes du tableau
+    """
+    def reserved_row(rows, on_reach) -> rx.Component:
+        return _reserved_zone(
+            rows,
+            row_height,
+            window_start,
+            on_reach,
+            rx.el.td(col_span=col_span, style={"padding": "0"}),
+            as_="tr",
+        )
+
+    return rx.table.body(
+        rx.cond(window_start > 0, reserved_row(window_start, on_window_back)),
+        rx.foreach(items, render_fn),
+        rx.cond(has_more, reserved_row(total - window_start - items.length(), on_window_forward)),
+    )
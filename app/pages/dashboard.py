@@ -100,6 +100,13 @@ def quick_action_card(title: str, description: str, icon: str, href: str, color:
 def simulation_row(sim: dict) -> rx.Component:
     """Ligne du tableau de simulation."""
     return rx.table.row(
+        # Sélection (rapports groupés)
+        rx.table.cell(
+            rx.checkbox(
+                checked=DashboardState.selected_ids.contains(sim["id"]),
+                on_change=lambda _checked: DashboardState.toggle_selection(sim["id"]),
+            ),
+        ),
         # N°
         rx.table.cell(
             rx.box(
@@ -180,6 +187,13 @@ def simulations_table() -> rx.Component:
         rx.table.root(
             rx.table.header(
                 rx.table.row(
+                    rx.table.column_header_cell(
+                        rx.checkbox(
+                            checked=DashboardState.all_selected,
+                            on_change=lambda _checked: DashboardState.toggle_select_all(),
+                        ),
+                        width="4%",
+                    ),
                     rx.table.column_header_cell(
                         rx.text("N°", font_size=Typography.SIZE_XS, font_weight=Typography.WEIGHT_SEMIBOLD, color=Colors.GRAY_500),
                         width="5%",
@@ -228,7 +242,7 @@ def simulations_table() -> rx.Component:
                                 align="center",
                                 padding=Spacing.XL,
                             ),
-                            col_span=8,
+                            col_span=9,
                         ),
                     ),
                 ),
@@ -244,6 +258,69 @@ def simulations_table() -> rx.Component:
     )
 
 
+def bulk_report_actions() -> rx.Component:
+    """Boutons des rapports groupés (visibles dès qu'une simulation est sélectionnée)."""
+    return rx.cond(
+        DashboardState.selection_count > 0,
+        rx.hstack(
+            rx.button(
+                rx.hstack(
+                    rx.icon("files", size=16),
+                    rx.text("Dossier PDF (", DashboardState.selection_count, ")"),
+                    spacing="2",
+                    align="center",
+                ),
+                on_click=DashboardState.build_bulk_report("pdf"),
+                loading=DashboardState.bulk_running,
+                size="2",
+                style={"background": Colors.PRIMARY, "color": Colors.WHITE},
+            ),
+            rx.button(
+                rx.hstack(rx.icon("archive", size=16), rx.text("ZIP"), spacing="2", align="center"),
+                on_click=DashboardState.build_bulk_report("zip"),
+                disabled=DashboardState.bulk_running,
+                variant="outline",
+                size="2",
+            ),
+            rx.icon_button(
+                rx.icon("x", size=14),
+                on_click=DashboardState.clear_selection,
+                disabled=DashboardState.bulk_running,
+                variant="ghost",
+                size="2",
+                title="Vider la sélection",
+            ),
+            spacing="2",
+        ),
+    )
+
+
+def bulk_report_progress() -> rx.Component:
+    """Progression du rapport groupé en cours."""
+    return rx.cond(
+        DashboardState.bulk_running,
+        rx.vstack(
+            rx.hstack(
+                rx.text(DashboardState.bulk_status, font_size=Typography.SIZE_SM, color=Colors.GRAY_700),
+                rx.spacer(),
+                rx.text(
+                    DashboardState.bulk_done, " / ", DashboardState.bulk_total,
+                    font_size=Typography.SIZE_SM,
+                    color=Colors.GRAY_500,
+                ),
+                width="100%",
+            ),
+            rx.progress(value=DashboardState.bulk_progress, width="100%"),
+            spacing="2",
+            width="100%",
+            padding=Spacing.MD,
+            background=Colors.WHITE,
+            border_radius=Borders.RADIUS_LG,
+            border=f"1px solid {Colors.GRAY_100}",
+        ),
+    )
+
+
 def dashboard_content() -> rx.Component:
     """Contenu du tableau de bord."""
     return rx.vstack(
@@ -290,7 +367,27 @@ def dashboard_content() -> rx.Component:
         
         # Simulations récentes
         rx.vstack(
-            section_header("Mes simulations", "history"),
+            section_header(
+                "Mes simulations",
+                "history",
+                rx.hstack(
+                    bulk_report_actions(),
+                    rx.button(
+                        rx.hstack(rx.icon("file-down", size=16), rx.text("CSV"), spacing="2", align="center"),
+                        on_click=DashboardState.export_history("csv"),
+                        variant="outline",
+                        size="2",
+                    ),
+                    rx.button(
+                        rx.hstack(rx.icon("file-spreadsheet", size=16), rx.text("Excel"), spacing="2", align="center"),
+                        on_click=DashboardState.export_history("xlsx"),
+                        variant="outline",
+                        size="2",
+                    ),
+                    spacing="2",
+                ),
+            ),
+            bulk_report_progress(),
             simulations_table(),
             spacing="4",
             width="100%",
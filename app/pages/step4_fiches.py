@@ -3,6 +3,12 @@
 #from ..state import SimulationState
 #from ..styles.design_system import Colors, Typography, Spacing, Borders, Shadows
 #from .simulation_layout import simulation_layout, recap_bar, recap_item
+from ..components.virtual_list import virtual_list
+
+
+# Hauteur fixe d'un item de fiche et pas de la liste (item + espacement)
+FICHE_ITEM_HEIGHT = 88
+FICHE_ROW_HEIGHT = FICHE_ITEM_HEIGHT + 8
 #
 #
 #def fiche_item(fiche: dict) -> rx.Component:
@@ -301,6 +307,8 @@ def fiche_item(fiche: dict) -> rx.Component:
         },
         transition="all 0.2s ease",
         width="100%",
+        height=f"{FICHE_ITEM_HEIGHT}px",
+        overflow="hidden",
     )
 
 
@@ -352,7 +360,7 @@ def step4_content() -> rx.Component:
                 # Compteur
                 rx.hstack(
                     rx.text(
-                        f"{SimulationState.filtered_fiches.length()} fiche(s) disponible(s)",
+                        f"{SimulationState.filtered_fiches_count} fiche(s) disponible(s)",
                         font_size=Typography.SIZE_XS,
                         color=Colors.GRAY_500,
                     ),
@@ -372,11 +380,18 @@ def step4_content() -> rx.Component:
                 
                 # Liste des fiches
                 rx.cond(
-                    SimulationState.filtered_fiches.length() > 0,
+                    SimulationState.filtered_fiches_count > 0,
                     rx.scroll_area(
-                        rx.vstack(
-                            rx.foreach(SimulationState.filtered_fiches, fiche_item),
-                            spacing="2",
+                        virtual_list(
+                            SimulationState.visible_fiches,
+                            fiche_item,
+                            window_start=SimulationState.fiche_window_start,
+                            total=SimulationState.filtered_fiches_count,
+                            has_more=SimulationState.fiche_window_has_more,
+                            row_height=FICHE_ROW_HEIGHT,
+                            on_window_back=SimulationState.fiche_window_back,
+                            on_window_forward=SimulationState.fiche_window_forward,
+                            gap="0.5rem",
                             width="100%",
                         ),
                         height="350px",
@@ -209,6 +209,61 @@ def export_button() -> rx.Component:
     )
 
 
+def sensitivity_row(item: rx.Var) -> rx.Component:
+    """Ligne de sensibilité: effet d'un paramètre sur la prime."""
+    return rx.vstack(
+        rx.hstack(
+            rx.text(item["label"], font_size=Typography.SIZE_SM, color=Colors.GRAY_600),
+            rx.spacer(),
+            rx.text(item["spread_label"], font_size=Typography.SIZE_SM, font_weight=Typography.WEIGHT_MEDIUM, color=Colors.GRAY_900),
+            width="100%",
+            align="center",
+        ),
+        rx.progress(value=item["share"], max=100, width="100%", size="1"),
+        spacing="1",
+        width="100%",
+        padding_y="6px",
+    )
+
+
+def sensitivity_section() -> rx.Component:
+    """Analyse de sensibilité: variation de la prime selon chaque paramètre."""
+    return detail_section_card(
+        "Sensibilité de la prime",
+        "sliders-horizontal",
+        rx.vstack(
+            rx.hstack(
+                rx.text(
+                    "Écart de volume selon les options et ±50 % sur les valeurs saisies.",
+                    font_size=Typography.SIZE_XS,
+                    color=Colors.GRAY_500,
+                ),
+                rx.spacer(),
+                rx.button(
+                    rx.cond(
+                        SimulationState.sweep_running,
+                        rx.hstack(rx.spinner(size="1"), rx.text(f"{SimulationState.sweep_progress} %"), spacing="2", align="center"),
+                        rx.hstack(rx.icon("play", size=14), rx.text("Analyser"), spacing="2", align="center"),
+                    ),
+                    on_click=SimulationState.run_sensitivity_sweep,
+                    disabled=SimulationState.sweep_running,
+                    variant="soft",
+                    size="2",
+                ),
+                width="100%",
+                align="center",
+            ),
+            rx.cond(
+                SimulationState.sweep_error != "",
+                rx.text(SimulationState.sweep_error, font_size=Typography.SIZE_XS, color=Colors.ERROR),
+            ),
+            rx.foreach(SimulationState.sweep_sensitivities, sensitivity_row),
+            spacing="2",
+            width="100%",
+        ),
+    )
+
+
 def result_content() -> rx.Component:
     """Contenu de la page résultats."""
     return rx.vstack(
@@ -330,6 +385,9 @@ def result_content() -> rx.Component:
             ),
         ),
         
+        # Analyse de sensibilité
+        sensitivity_section(),
+        
         # Actions - centrées
         rx.hstack(
             save_button(),
@@ -14,12 +14,22 @@ from .supabase_service import supabase, get_supabase_client
 
 from .auth_service import AuthService, AuthResult, auth_service
 
-from .config_loader import ConfigLoader, FicheConfig, config_loader
+from .config_loader import ConfigLoader, FicheConfig, config_loader, fiche_config_cache
+
+from .function_cache import FunctionCache, CompiledFunction, function_cache
+from .prewarm import prewarm_fiche_catalog, prewarm_status
+from .catalog_snapshot import CatalogSnapshot, catalog_snapshots
+
+from .simulation_repository import SimulationRepository, simulation_repository
+from .simulation_store import SimulationStore, simulation_store
+from .simulation_export import SimulationExport, stream_export
+from .download_tokens import DownloadTokens, download_tokens
 
 from .calculation_engine import (
     FunctionLoader,
     CalculationEngine,
     CalculationResult,
+    BatchCalculationResult,
     calculation_engine,
 )
 
@@ -38,9 +48,27 @@ __all__ = [
     "ConfigLoader",
     "FicheConfig",
     "config_loader",
+    "fiche_config_cache",
+    "prewarm_fiche_catalog",
+    "prewarm_status",
+    "CatalogSnapshot",
+    "catalog_snapshots",
+    # Simulations
+    "SimulationRepository",
+    "simulation_repository",
+    "SimulationStore",
+    "simulation_store",
+    "SimulationExport",
+    "stream_export",
+    "DownloadTokens",
+    "download_tokens",
     # Calculation
+    "FunctionCache",
+    "CompiledFunction",
+    "function_cache",
     "FunctionLoader",
     "CalculationEngine",
     "CalculationResult",
+    "BatchCalculationResult",
     "calculation_engine",
 ]
@@ -7,8 +7,17 @@ Basé sur le FunctionLoader existant.
 import inspect
 import ast
 import types
-from typing import Any, Dict, Optional
-from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+from dataclasses import dataclass, field
+
+try:
+    import numpy as np
+except ImportError:  # Calcul par lot sans vectorisation
+    np = None
+
+from .function_cache import CompiledFunction, function_cache, hash_source
+from .fiche_compiler import compile_closed_form
 
 
 @dataclass
@@ -21,6 +30,83 @@ class CalculationResult:
     euros: float = 0.0
 
 
+@dataclass
+class BatchCalculationResult:
+    """
+    Résultat d'un calcul par lot (une valeur par ligne).
+    cumacs/euros sont des tableaux NumPy si NumPy est installé, des listes sinon;
+    les lignes en erreur valent 0.0 et sont signalées dans errors.
+    """
+    cumacs: Sequence[float]
+    euros: Sequence[float]
+    success: List[bool]
+    errors: Dict[int, str] = field(default_factory=dict)
+    vectorized: bool = False
+
+
+# Opérations autorisées pour l'évaluation vectorisée
+_ARITHMETIC_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.USub, ast.UAdd)
+
+
+@lru_cache(maxsize=256)
+def is_pure_arithmetic(code_string: str) -> bool:
+    """
+    Indique si une fonction de fiche est une pure expression arithmétique
+    de ses paramètres (affectations locales et return uniquement).
+    Une telle fonction donne le même résultat appelée avec des tableaux NumPy.
+    
+    Args:
+        code_string: Code source de la fonction
+        
+    Returns:
+        True si la fonction peut être évaluée de manière vectorisée
+    """
+    try:
+        tree = ast.parse(code_string)
+    except SyntaxError:
+        return False
+    
+    func = next((node for node in tree.body if isinstance(node, ast.FunctionDef)), None)
+    if func is None or func.decorator_list or func.args.vararg or func.args.kwarg:
+        return False
+    
+    known = {arg.arg for arg in func.args.args + func.args.kwonlyargs}
+    
+    def is_arithmetic(node: ast.AST) -> bool:
+        if isinstance(node, ast.Constant):
+            return isinstance(node.value, (int, float)) and not isinstance(node.value, bool)
+        if isinstance(node, ast.Name):
+            return node.id in known
+        if isinstance(node, ast.BinOp):
+            return (
+                isinstance(node.op, _ARITHMETIC_OPERATORS)
+                and is_arithmetic(node.left)
+                and is_arithmetic(node.right)
+            )
+        if isinstance(node, ast.UnaryOp):
+            return isinstance(node.op, _ARITHMETIC_OPERATORS) and is_arithmetic(node.operand)
+        return False
+    
+    body = func.body
+    # Docstring éventuelle
+    if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant):
+        body = body[1:]
+    if not body or not isinstance(body[-1], ast.Return):
+        return False
+    
+    for statement in body[:-1]:
+        if not (
+            isinstance(statement, ast.Assign)
+            and len(statement.targets) == 1
+            and isinstance(statement.targets[0], ast.Name)
+            and is_arithmetic(statement.value)
+        ):
+            return False
+        known.add(statement.targets[0].id)
+    
+    return body[-1].value is not None and is_arithmetic(body[-1].value)
+
+
 class FunctionLoader:
     """
     Utilitaire pour charger, inspecter et exécuter dynamiquement
@@ -33,17 +119,51 @@ class FunctionLoader:
         signature: Signature de la fonction
     """
     
-    def __init__(self, code_string: str):
+    def __init__(self, code_string: str, fiche_code: str = ""):
         """
         Initialise le FunctionLoader avec une chaîne de code.
+        La fonction compilée provient du cache process-wide si disponible.
         
         Args:
             code_string: Code Python contenant au moins une fonction
+            fiche_code: Code de la fiche associée (clé du cache)
         """
         self.code_string = code_string
+        compiled = function_cache.get_or_compile(
+            code_string,
+            self._compile,
+            fiche_code=fiche_code,
+            namespace="calculation_engine",
+        )
+        self.function_name = compiled.name
+        self.function = compiled.function
+        self.signature = compiled.signature
+        self.closed_form = compiled.closed_form
+    
+    def _compile(self) -> CompiledFunction:
+        """
+        Parse, exécute le code et construit la signature de la fonction.
+        
+        Returns:
+            CompiledFunction à mettre en cache
+        """
         self.function_name = self._extract_function_name()
-        self.function = self._load_function()
-        self.signature = inspect.signature(self.function)
+        function = self._load_function()
+        
+        # Forme close (tables + produit): évaluateur spécialisé, sinon exec classique
+        try:
+            closed_form = compile_closed_form(self.code_string)
+        except Exception as e:
+            print(f"⚠️ Compilation en forme close impossible: {e}")
+            closed_form = None
+        
+        return CompiledFunction(
+            name=self.function_name,
+            function=closed_form.scalar if closed_form else function,
+            signature=inspect.signature(function),
+            source_hash=hash_source(self.code_string),
+            closed_form=closed_form,
+        )
     
     def _extract_function_name(self) -> str:
         """
@@ -202,18 +322,19 @@ class CalculationEngine:
         self._function_loader: Optional[FunctionLoader] = None
         self._current_function_string: str = ""
     
-    def load_function(self, function_string: str) -> bool:
+    def load_function(self, function_string: str, fiche_code: str = "") -> bool:
         """
         Charge une fonction de calcul.
         
         Args:
             function_string: Code Python de la fonction
+            fiche_code: Code de la fiche (clé du cache de fonctions)
             
         Returns:
             True si le chargement réussit, False sinon
         """
         try:
-            self._function_loader = FunctionLoader(function_string)
+            self._function_loader = FunctionLoader(function_string, fiche_code=fiche_code)
             self._current_function_string = function_string
             print(f"✅ Fonction chargée: {self._function_loader.function_name}")
             return True
@@ -250,8 +371,27 @@ class CalculationEngine:
                 error_message="Aucune fonction de calcul chargée"
             )
         
+        return self._evaluate(self._function_loader, parameters)
+    
+    def _evaluate(
+        self,
+        loader: FunctionLoader,
+        parameters: Dict[str, Any],
+        clean: bool = True,
+    ) -> CalculationResult:
+        """
+        Valide, nettoie les paramètres et exécute la fonction d'une fiche.
+        
+        Args:
+            loader: Fonction de la fiche
+            parameters: Dict des valeurs des paramètres
+            clean: Convertit les saisies (sinon valeurs passées telles quelles)
+            
+        Returns:
+            CalculationResult avec les valeurs calculées
+        """
         # Validation des arguments
-        is_valid, missing = self._function_loader.validate_args(parameters)
+        is_valid, missing = loader.validate_args(parameters)
         if not is_valid:
             return CalculationResult(
                 success=False,
@@ -260,10 +400,10 @@ class CalculationEngine:
             )
         
         # Nettoyage des paramètres (conversion des types)
-        clean_params = self._clean_parameters(parameters)
+        clean_params = self._clean_parameters(parameters) if clean else parameters
         
         try:
-            result = self._function_loader.call_with_dict(clean_params)
+            result = loader.call_with_dict(clean_params)
             cumacs = float(result)
             euros = cumacs * self.CUMAC_TO_EURO_RATE
             
@@ -281,6 +421,263 @@ class CalculationEngine:
                 error_message=str(e)
             )
     
+    def calculate_batch(self, fiche_code: str, rows: Dict[str, Any]) -> BatchCalculationResult:
+        """
+        Calcule une fiche pour un lot d'opérations (devis de portefeuille).
+        
+        Les fonctions purement arithmétiques sont évaluées en une seule fois
+        sur des tableaux NumPy; les autres sont appelées ligne par ligne.
+        
+        Args:
+            fiche_code: Code de la fiche (ex: "BAR-TH-104")
+            rows: Table en colonnes {paramètre: liste de valeurs}; une valeur
+                scalaire est répétée sur toutes les lignes
+            
+        Returns:
+            BatchCalculationResult (une entrée par ligne)
+            
+        Raises:
+            ValueError: Si la fiche est introuvable ou si les colonnes
+                n'ont pas la même longueur
+        """
+        from .config_loader import config_loader
+        
+        config = config_loader.load_fiche_config(fiche_code)
+        if config is None:
+            raise ValueError(f"Fiche introuvable: {fiche_code}")
+        return self.evaluate_batch(config.string_function, rows, fiche_code=fiche_code)
+    
+    def evaluate_batch(
+        self,
+        function_string: str,
+        rows: Dict[str, Any],
+        fiche_code: str = "",
+        clean: bool = True,
+    ) -> BatchCalculationResult:
+        """
+        Évalue un code de calcul sur une table en colonnes (voir calculate_batch).
+        
+        Args:
+            function_string: Code Python de la fonction
+            rows: Table en colonnes {paramètre: liste de valeurs}
+            fiche_code: Code de la fiche (clé du cache de fonctions)
+            clean: Convertit les saisies (Oui/Non, nombres en texte); False pour
+                des valeurs déjà typées comme celles du simulateur (set_param),
+                passées telles quelles à la fonction
+            
+        Returns:
+            BatchCalculationResult (une entrée par ligne)
+        """
+        loader = FunctionLoader(function_string, fiche_code=fiche_code)
+        columns, size = self._normalize_columns(rows)
+        
+        if not clean and not self._already_clean(columns):
+            # Les calculs vectorisés convertiraient les valeurs en texte
+            return self._calculate_rows(loader, columns, size, clean=False)
+        
+        if np is not None and loader.closed_form is not None:
+            # Tables de correspondance précompilées (fiche_compiler)
+            result = self._calculate_closed_form(loader, columns, size)
+            if result is not None:
+                return result
+        
+        if np is not None and is_pure_arithmetic(function_string):
+            result = self._calculate_vectorized(loader, columns, size)
+            if result is not None:
+                return result
+        
+        return self._calculate_rows(loader, columns, size)
+    
+    def _normalize_columns(self, rows: Dict[str, Any]) -> tuple:
+        """
+        Convertit les colonnes en listes de même longueur.
+        
+        Returns:
+            Tuple (colonnes, nombre de lignes)
+        """
+        lengths = {
+            len(values) for values in rows.values()
+            if not isinstance(values, (str, bytes)) and hasattr(values, "__len__")
+        }
+        if len(lengths) > 1:
+            raise ValueError(f"Colonnes de longueurs différentes: {sorted(lengths)}")
+        size = lengths.pop() if lengths else 1
+        
+        columns = {}
+        for name, values in rows.items():
+            if isinstance(values, (str, bytes)) or not hasattr(values, "__len__"):
+                columns[name] = [values] * size
+            elif np is not None and isinstance(values, np.ndarray):
+                columns[name] = values
+            else:
+                columns[name] = list(values)
+        return columns, size
+    
+    def _already_clean(self, columns: Dict[str, Any]) -> bool:
+        """Indique si la conversion des saisies laisse toutes les valeurs inchangées."""
+        for values in columns.values():
+            if np is not None and isinstance(values, np.ndarray) and values.dtype.kind in "biuf":
+                continue
+            try:
+                distinct = set(values)
+            except TypeError:
+                return False
+            for value in distinct:
+                cleaned = self._clean_value(value)
+                if cleaned is None or type(cleaned) is not type(value):
+                    return False
+        return True
+    
+    def _numeric_column(self, values: Any) -> Optional[Any]:
+        """
+        Convertit une colonne en tableau float64.
+        
+        Returns:
+            np.ndarray, ou None si une valeur est vide ou non numérique
+        """
+        if isinstance(values, np.ndarray) and values.dtype.kind in "biuf":
+            return values.astype(np.float64, copy=False)
+        try:
+            # Colonne déjà numérique: conversion directe
+            return np.asarray(values, dtype=np.float64)
+        except (ValueError, TypeError):
+            pass
+        clean = [self._clean_value(value) for value in values]
+        if any(value is None or isinstance(value, (str, dict)) for value in clean):
+            return None
+        return np.asarray(clean, dtype=np.float64)
+    
+    def _calculate_closed_form(
+        self,
+        loader: FunctionLoader,
+        columns: Dict[str, Any],
+        size: int,
+    ) -> Optional[BatchCalculationResult]:
+        """
+        Évalue un lot avec la forme close de la fonction (tables indexées).
+        
+        Returns:
+            BatchCalculationResult, ou None si les entrées ne s'y prêtent pas
+        """
+        closed_form = loader.closed_form
+        numeric_columns, key_columns = {}, {}
+        for name in closed_form.params:
+            if name in columns:
+                values = columns[name]
+            else:
+                default = loader.signature.parameters[name].default
+                if default is inspect.Parameter.empty:
+                    return None
+                values = [default] * size
+            
+            if name in closed_form.numeric_params:
+                numeric_columns[name] = self._numeric_column(values)
+                if numeric_columns[name] is None:
+                    return None
+            if name in closed_form.key_params:
+                if isinstance(values, np.ndarray):
+                    values = values.tolist()
+                # Peu de valeurs distinctes: chacune n'est nettoyée qu'une fois
+                try:
+                    cleaned = {value: self._clean_value(value) for value in set(values)}
+                except TypeError:
+                    return None
+                if any(value is None for value in cleaned.values()):
+                    return None
+                key_columns[name] = [cleaned[value] for value in values]
+        
+        try:
+            cumacs, unknown = closed_form.evaluate_columns(numeric_columns, key_columns, size)
+        except Exception as e:
+            print(f"⚠️ Évaluation en forme close impossible, calcul ligne par ligne: {e}")
+            return None
+        
+        valid = np.isfinite(cumacs) & ~unknown
+        errors = {}
+        for i in np.flatnonzero(~valid):
+            errors[int(i)] = (
+                "Valeur non prévue par les tables de la fiche" if unknown[i]
+                else "Division par zéro ou résultat non numérique"
+            )
+        cumacs[~valid] = 0.0
+        
+        return BatchCalculationResult(
+            cumacs=cumacs,
+            euros=cumacs * self.CUMAC_TO_EURO_RATE,
+            success=valid.tolist(),
+            errors=errors,
+            vectorized=True,
+        )
+    
+    def _calculate_vectorized(
+        self,
+        loader: FunctionLoader,
+        columns: Dict[str, List[Any]],
+        size: int,
+    ) -> Optional[BatchCalculationResult]:
+        """
+        Évalue la fonction une seule fois sur des colonnes NumPy.
+        
+        Returns:
+            BatchCalculationResult, ou None si les entrées ne s'y prêtent pas
+            (valeurs vides ou non numériques, paramètres manquants)
+        """
+        arrays = {}
+        for name, values in columns.items():
+            arrays[name] = self._numeric_column(values)
+            if arrays[name] is None:
+                return None
+        
+        if any(name not in arrays for name in loader.get_required_parameters()):
+            return None
+        
+        try:
+            with np.errstate(all="ignore"):
+                cumacs = np.broadcast_to(
+                    np.asarray(loader.call_with_dict(arrays), dtype=np.float64),
+                    (size,),
+                ).copy()
+        except Exception as e:
+            print(f"⚠️ Évaluation vectorisée impossible, calcul ligne par ligne: {e}")
+            return None
+        
+        # Division par zéro, dépassement...: erreurs par ligne comme en scalaire
+        valid = np.isfinite(cumacs)
+        errors = {int(i): "Division par zéro ou résultat non numérique" for i in np.flatnonzero(~valid)}
+        cumacs[~valid] = 0.0
+        
+        return BatchCalculationResult(
+            cumacs=cumacs,
+            euros=cumacs * self.CUMAC_TO_EURO_RATE,
+            success=valid.tolist(),
+            errors=errors,
+            vectorized=True,
+        )
+    
+    def _calculate_rows(
+        self,
+        loader: FunctionLoader,
+        columns: Dict[str, List[Any]],
+        size: int,
+        clean: bool = True,
+    ) -> BatchCalculationResult:
+        """Évalue la fonction ligne par ligne (fonctions non vectorisables)."""
+        cumacs, euros, success, errors = [], [], [], {}
+        
+        for i in range(size):
+            result = self._evaluate(loader, {name: values[i] for name, values in columns.items()}, clean)
+            cumacs.append(result.cumacs)
+            euros.append(result.euros)
+            success.append(result.success)
+            if not result.success:
+                errors[i] = result.error_message
+        
+        if np is not None:
+            cumacs = np.asarray(cumacs, dtype=np.float64)
+            euros = np.asarray(euros, dtype=np.float64)
+        
+        return BatchCalculationResult(cumacs=cumacs, euros=euros, success=success, errors=errors)
+    
     def _clean_parameters(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
         """
         Nettoie et convertit les paramètres pour le calcul.
@@ -293,30 +690,39 @@ class CalculationEngine:
         """
         clean = {}
         for key, value in parameters.items():
+            value = self._clean_value(value)
             # Ignorer les valeurs vides ou les dicts (non remplis)
-            if value == "" or value is None or isinstance(value, dict):
-                continue
-            
-            # Conversion booléenne
-            if value == "Oui":
-                clean[key] = True
-            elif value == "Non":
-                clean[key] = False
-            else:
-                # Tentative de conversion numérique
-                try:
-                    if isinstance(value, str):
-                        if '.' in value or ',' in value:
-                            clean[key] = float(value.replace(',', '.'))
-                        else:
-                            clean[key] = int(value)
-                    else:
-                        clean[key] = value
-                except (ValueError, TypeError):
-                    clean[key] = value
+            if value is not None:
+                clean[key] = value
         
         return clean
     
+    def _clean_value(self, value: Any) -> Any:
+        """
+        Convertit une valeur saisie (Oui/Non, nombre en texte).
+        
+        Returns:
+            Valeur convertie, ou None si elle est vide ou non remplie
+        """
+        if isinstance(value, dict) or value is None or (isinstance(value, str) and value == ""):
+            return None
+        
+        # Conversion booléenne
+        if value == "Oui":
+            return True
+        if value == "Non":
+            return False
+        
+        # Tentative de conversion numérique
+        try:
+            if isinstance(value, str):
+                if '.' in value or ',' in value:
+                    return float(value.replace(',', '.'))
+                return int(value)
+        except (ValueError, TypeError):
+            pass
+        return value
+    
     def extract_parameters_from_code(self, function_string: str) -> Dict[str, str]:
         """
         Extrait les noms des paramètres d'une fonction à partir de son code.
@@ -0,0 +1,414 @@
+"""
+Snapshot complet du catalogue (bundles des fiches, secteurs, typologies,
+départements, zones climatiques) dans un seul fichier versionné.
+
+Le fichier est mappé en mémoire (mmap): les workers d'une même machine
+partagent les pages du cache système au lieu de garder chacun une copie.
+Il est livré dans l'image Docker ou téléchargé une fois au démarrage, puis
+remplacé atomiquement lorsqu'une nouvelle version est publiée dans le bucket.
+Les fiches évincées après republication sont aussi publiées dans le bucket
+(evictions.json) pour que toutes les instances et tous les workers les évincent.
+
+Format:
+    MAGIC | longueur de l'en-tête (8 octets, big-endian) | en-tête JSON | bundles
+L'en-tête contient les données du catalogue et l'index {code: [offset, taille]}
+des bundles (offsets relatifs à la fin de l'en-tête).
+"""
+
+import os
+import json
+import mmap
+import time
+import asyncio
+import hashlib
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional
+
+from .supabase_client import (
+    read_file_from_bucket,
+    get_file_validators,
+    upload_file_to_bucket,
+    BUCKET_NAME,
+)
+from .fiche_bundle import unpack_bundle
+
+
+SNAPSHOT_MAGIC = b"RDECAT01"
+SNAPSHOT_FORMAT_VERSION = 1
+
+# Emplacement local du snapshot (copié dans l'image par COPY . .)
+CATALOG_SNAPSHOT_PATH = os.getenv("CATALOG_SNAPSHOT_PATH", "data/catalog_snapshot.bin")
+# Emplacement du snapshot publié dans le bucket fiches-operations
+CATALOG_SNAPSHOT_FOLDER = "_catalog"
+CATALOG_SNAPSHOT_OBJECT = f"{CATALOG_SNAPSHOT_FOLDER}/catalog_snapshot.bin"
+# Intervalle de vérification d'une nouvelle version (secondes, 0 = désactivé)
+CATALOG_SNAPSHOT_REFRESH = float(os.getenv("CATALOG_SNAPSHOT_REFRESH", "600"))
+# Fiches évincées du snapshot courant, partagées entre instances: {"version", "codes"}
+CATALOG_EVICTIONS_OBJECT = f"{CATALOG_SNAPSHOT_FOLDER}/evictions.json"
+# Intervalle de prise en compte des évictions des autres instances (secondes, 0 = désactivé)
+CATALOG_EVICTIONS_REFRESH = float(os.getenv("CATALOG_EVICTIONS_REFRESH", "30"))
+
+
+class CatalogSnapshot:
+    """Snapshot du catalogue ouvert en lecture seule (mmap)."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mm[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f"Snapshot invalide: {path}")
+
+        start = len(SNAPSHOT_MAGIC)
+        header_size = int.from_bytes(self._mm[start:start + 8], "big")
+        self._data_offset = start + 8 + header_size
+        header = json.loads(self._mm[start + 8:self._data_offset].decode("utf-8"))
+
+        if header.get("format") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Format de snapshot non supporté: {header.get('format')}")
+
+        self.path = path
+        self.version: str = header["version"]
+        self.created_at: str = header.get("created_at", "")
+        self._header = header
+        self._index: Dict[str, List[int]] = header["index"]
+        self._fiche_files: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, fiche_code: str) -> bool:
+        return fiche_code in self._index
+
+    def fiche_codes(self) -> List[str]:
+        """Codes des fiches présentes dans le snapshot."""
+        return sorted(self._index.keys())
+
+    def fiche_files(self, fiche_code: str) -> Optional[Dict[str, Any]]:
+        """
+        Retourne le contenu du bundle d'une fiche (décodé une seule fois).
+
+        Args:
+            fiche_code: Code de la fiche (ex: "BAR-TH-101")
+
+        Returns:
+            Dict {clé: contenu} ou None si la fiche est absente
+        """
+        with self._lock:
+            files = self._fiche_files.get(fiche_code)
+        if files is not None:
+            return files
+
+        location = self._index.get(fiche_code)
+        if location is None:
+            return None
+
+        offset, size = location
+        start = self._data_offset + offset
+        files = unpack_bundle(self._mm[start:start + size])
+        if files is not None:
+            with self._lock:
+                self._fiche_files[fiche_code] = files
+        return files
+
+    @property
+    def sectors(self) -> List[Dict[str, Any]]:
+        return self._header.get("sectors", [])
+
+    def typologies(self, sector: str = "") -> Optional[List[Dict[str, Any]]]:
+        """Typologies d'un secteur (toutes si vide), None si absentes du snapshot."""
+        return self._header.get("typologies", {}).get(sector)
+
+    def fiches(self, prefix: str) -> Dict[str, str]:
+        """Fiches {code: description} dont le code commence par prefix."""
+        return {
+            code: description
+            for code, description in self._header.get("fiches", {}).items()
+            if code.startswith(prefix)
+        }
+
+    @property
+    def departements(self) -> Dict[str, str]:
+        return self._header.get("departements", {})
+
+    @property
+    def zones_climatiques(self) -> Dict[str, str]:
+        return self._header.get("zones_climatiques", {})
+
+
+def build_snapshot(
+    path: str,
+    bundles: Dict[str, bytes],
+    sectors: List[Dict[str, Any]],
+    typologies: Dict[str, List[Dict[str, Any]]],
+    fiches: Dict[str, str],
+    departements: Dict[str, str],
+    zones_climatiques: Dict[str, str],
+) -> str:
+    """
+    Écrit un snapshot du catalogue (écriture atomique).
+
+    Args:
+        path: Fichier de destination
+        bundles: Dict {code fiche: bundle.json.gz}
+        sectors: Liste des secteurs (format load_sectors)
+        typologies: Dict {secteur: typologies} ("" pour toutes)
+        fiches: Dict {code fiche: description}
+        departements: DEPARTEMENTS_FRANCE
+        zones_climatiques: ZONES_CLIMATIQUES
+
+    Returns:
+        Version (hash du contenu) du snapshot
+    """
+    index = {}
+    offset = 0
+    digest = hashlib.sha256()
+    for code in sorted(bundles):
+        index[code] = [offset, len(bundles[code])]
+        offset += len(bundles[code])
+        digest.update(code.encode("utf-8"))
+        digest.update(bundles[code])
+
+    catalog = {
+        "sectors": sectors,
+        "typologies": typologies,
+        "fiches": fiches,
+        "departements": departements,
+        "zones_climatiques": zones_climatiques,
+    }
+    digest.update(json.dumps(catalog, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    version = digest.hexdigest()[:16]
+
+    header = json.dumps({
+        "format": SNAPSHOT_FORMAT_VERSION,
+        "version": version,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "index": index,
+        **catalog,
+    }, ensure_ascii=False).encode("utf-8")
+
+    content = bytearray(SNAPSHOT_MAGIC)
+    content += len(header).to_bytes(8, "big")
+    content += header
+    for code in sorted(bundles):
+        content += bundles[code]
+
+    _write_atomic(path, bytes(content))
+    return version
+
+
+def _write_atomic(path: str, content: bytes):
+    """Écrit un fichier via un fichier temporaire puis os.replace."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class CatalogSnapshotStore:
+    """
+    Détient le snapshot courant et le remplace atomiquement.
+    Les lecteurs récupèrent une référence via `current`: un ancien snapshot
+    reste valide tant qu'il est référencé (le mmap est libéré ensuite).
+    """
+
+    def __init__(self, path: str = CATALOG_SNAPSHOT_PATH):
+        self.path = path
+        self._current: Optional[CatalogSnapshot] = None
+        self._etag: Optional[str] = None
+        # Fiches republiées depuis la mise en service du snapshot courant
+        self._evicted: set = set()
+        self._evictions_etag: Optional[str] = None
+        self._lock = threading.Lock()
+        self._boot_lock = threading.Lock()
+        self._booted = False
+
+    @property
+    def current(self) -> Optional[CatalogSnapshot]:
+        return self._current
+
+    def serves(self, fiche_code: str) -> Optional[CatalogSnapshot]:
+        """Snapshot courant s'il contient la fiche et qu'elle n'a pas été évincée."""
+        snapshot = self._current
+        if snapshot is None or fiche_code not in snapshot or fiche_code in self._evicted:
+            return None
+        return snapshot
+
+    def evict(self, fiche_code: str = "") -> int:
+        """
+        Évince une fiche du snapshot courant (toutes si vide) après sa
+        republication: elle est servie par le cache partagé, revalidé par
+        ETag, jusqu'au prochain snapshot.
+
+        L'éviction est publiée dans le bucket: les autres workers et instances
+        l'appliquent à leur prochaine vérification (CATALOG_EVICTIONS_REFRESH).
+
+        Returns:
+            Nombre de fiches évincées dans ce processus
+        """
+        with self._lock:
+            snapshot = self._current
+            if snapshot is None:
+                return 0
+            codes = [fiche_code] if fiche_code else snapshot.fiche_codes()
+            codes = [code for code in codes if code in snapshot and code not in self._evicted]
+            self._evicted.update(codes)
+
+        if codes:
+            self._publish_evictions(snapshot.version, codes)
+        return len(codes)
+
+    def _publish_evictions(self, version: str, codes: List[str]):
+        """Ajoute des fiches à la liste des évictions partagée du snapshot."""
+        record = read_file_from_bucket(BUCKET_NAME, CATALOG_EVICTIONS_OBJECT, "json")
+        if not isinstance(record, dict) or record.get("version") != version:
+            # Évictions d'un snapshot précédent: sans objet pour celui-ci
+            record = {"version": version, "codes": []}
+        record["codes"] = sorted(set(record.get("codes") or []) | set(codes))
+
+        content = json.dumps(record, ensure_ascii=False).encode("utf-8")
+        if not upload_file_to_bucket(
+            BUCKET_NAME, CATALOG_EVICTIONS_OBJECT, content, "application/json", upsert=True
+        ):
+            print("⚠️ Éviction non publiée: seules les fiches de ce processus sont évincées")
+
+    def poll_evictions(self) -> int:
+        """
+        Applique les évictions publiées par les autres workers et instances.
+
+        Returns:
+            Nombre de fiches nouvellement évincées
+        """
+        validators = get_file_validators(BUCKET_NAME, CATALOG_SNAPSHOT_FOLDER)
+        return self._sync_evictions(validators) if validators else 0
+
+    def _sync_evictions(self, validators: Dict[str, str]) -> int:
+        """Télécharge la liste des évictions si son ETag a changé et l'applique."""
+        etag = validators.get(os.path.basename(CATALOG_EVICTIONS_OBJECT))
+        if not etag or etag == self._evictions_etag:
+            return 0
+
+        record = read_file_from_bucket(BUCKET_NAME, CATALOG_EVICTIONS_OBJECT, "json")
+        if not isinstance(record, dict):
+            return 0
+
+        with self._lock:
+            self._evictions_etag = etag
+            snapshot = self._current
+            if snapshot is None or record.get("version") != snapshot.version:
+                return 0
+            codes = [
+                code for code in record.get("codes") or []
+                if code in snapshot and code not in self._evicted
+            ]
+            self._evicted.update(codes)
+
+        if codes:
+            print(f"🔄 Snapshot catalogue: {len(codes)} fiche(s) évincée(s) par une autre instance")
+        return len(codes)
+
+    def boot(self) -> Optional[CatalogSnapshot]:
+        """
+        Ouvre le snapshot local, ou le télécharge s'il est absent.
+        Idempotent: seul le premier appel agit.
+        """
+        # Les tâches de démarrage attendent la fin du premier chargement
+        with self._boot_lock:
+            if self._booted:
+                return self._current
+            self._booted = True
+
+            if not os.path.exists(self.path):
+                self.refresh()
+                return self._current
+
+            try:
+                self._swap(CatalogSnapshot(self.path))
+            except Exception as e:
+                print(f"❌ Snapshot catalogue illisible ({self.path}): {e}")
+            return self._current
+
+    def refresh(self) -> bool:
+        """
+        Télécharge le snapshot publié s'il a changé et le met en service,
+        puis applique les évictions publiées (même listing).
+
+        Returns:
+            True si un nouveau snapshot a été chargé
+        """
+        validators = get_file_validators(BUCKET_NAME, CATALOG_SNAPSHOT_FOLDER) or {}
+        swapped = self._refresh_snapshot(validators)
+        self._sync_evictions(validators)
+        return swapped
+
+    def _refresh_snapshot(self, validators: Dict[str, str]) -> bool:
+        """Télécharge et met en service le snapshot si son ETag a changé."""
+        etag = validators.get(os.path.basename(CATALOG_SNAPSHOT_OBJECT))
+        if not etag or etag == self._etag:
+            return False
+
+        raw = read_file_from_bucket(BUCKET_NAME, CATALOG_SNAPSHOT_OBJECT, "bytes")
+        if not raw:
+            return False
+
+        # Écriture dans un fichier distinct puis remplacement du fichier courant
+        try:
+            candidate_path = f"{self.path}.{os.getpid()}.new"
+            _write_atomic(candidate_path, raw)
+            candidate = CatalogSnapshot(candidate_path)
+        except Exception as e:
+            print(f"❌ Snapshot catalogue téléchargé invalide: {e}")
+            return False
+
+        self._etag = etag
+        if self._current is not None and self._current.version == candidate.version:
+            os.remove(candidate_path)
+            return False
+
+        os.replace(candidate_path, self.path)
+        candidate.path = self.path
+        self._swap(candidate)
+        return True
+
+    def _swap(self, snapshot: CatalogSnapshot):
+        """Met en service un snapshot (remplacement atomique de la référence)."""
+        with self._lock:
+            self._current = snapshot
+            self._evicted = set()
+            # Les évictions déjà lues peuvent viser ce snapshot: relecture
+            self._evictions_etag = None
+        print(f"✅ Snapshot catalogue {snapshot.version}: {len(snapshot.fiche_codes())} fiche(s)")
+
+
+# Instance singleton
+catalog_snapshots = CatalogSnapshotStore()
+
+
+async def refresh_catalog_snapshot():
+    """
+    Tâche de fond (lifespan): charge le snapshot au démarrage puis
+    vérifie périodiquement si une nouvelle version ou de nouvelles
+    évictions ont été publiées.
+    """
+    await asyncio.to_thread(catalog_snapshots.boot)
+    intervals = [i for i in (CATALOG_SNAPSHOT_REFRESH, CATALOG_EVICTIONS_REFRESH) if i > 0]
+    if not intervals:
+        return
+
+    last_refresh = time.monotonic()
+    while True:
+        try:
+            if CATALOG_SNAPSHOT_REFRESH > 0 and time.monotonic() - last_refresh >= CATALOG_SNAPSHOT_REFRESH:
+                last_refresh = time.monotonic()
+                await asyncio.to_thread(catalog_snapshots.refresh)
+            elif CATALOG_EVICTIONS_REFRESH > 0:
+                await asyncio.to_thread(catalog_snapshots.poll_evictions)
+        except Exception as e:
+            print(f"⚠️ Rafraîchissement du snapshot catalogue impossible: {e}")
+        await asyncio.sleep(min(intervals))
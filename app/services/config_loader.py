@@ -3,10 +3,34 @@ Service de chargement des fichiers de configuration depuis Supabase.
 Gère le chargement dynamique des fiches, secteurs, typologies et configurations de simulation.
 """
 
+import asyncio
+import copy
 import json
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Set
 from dataclasses import dataclass
-from .supabase_client import get_supabase_client, read_file_from_bucket, BUCKET_NAME
+from .supabase_client import (
+    get_supabase_client,
+    read_file_from_bucket,
+    read_file_from_bucket_async,
+    read_files_from_bucket_async,
+    get_file_validators,
+    get_file_validators_async,
+    BUCKET_NAME,
+)
+from .fiche_cache import FicheConfigCache
+from .fiche_bundle import (
+    BUNDLE_FILE_NAME,
+    bundle_is_current,
+    bundle_path,
+    legacy_files,
+    unpack_bundle,
+)
+from .catalog_snapshot import catalog_snapshots
+
+
+# Fiches dont le dossier ne contient pas de bundle (d'après le dernier listing):
+# leurs fichiers historiques sont lus directement, sans tenter le bundle
+_fiches_without_bundle: Set[str] = set()
 
 
 @dataclass
@@ -20,6 +44,28 @@ class FicheConfig:
     string_function: str                     # Code de calcul
 
 
+def option_value(mapping: Any, option: Any) -> Any:
+    """
+    Valeur passée à la fonction de calcul pour une option de select.
+    
+    Args:
+        mapping: Entrée de variables_mapping du label (dict option → valeur ou liste)
+        option: Option affichée choisie par l'utilisateur
+        
+    Returns:
+        Valeur mappée, Oui/Non convertis en booléens, sans autre conversion
+    """
+    value = option
+    if isinstance(mapping, dict) and option in mapping:
+        value = mapping[option]
+    
+    if value == "Oui":
+        return True
+    if value == "Non":
+        return False
+    return value
+
+
 class ConfigLoader:
     """Service de chargement des configurations."""
     
@@ -41,6 +87,11 @@ class ConfigLoader:
             {"label": "Transport", "icon": "bus", "value": "Transport", "abbr": "TRA"},
         ]
         
+        # Snapshot du catalogue (aucun appel réseau)
+        snapshot = catalog_snapshots.current
+        if snapshot and snapshot.sectors:
+            return copy.deepcopy(snapshot.sectors)
+        
         # Tentative de chargement depuis Supabase
         client = get_supabase_client()
         if client:
@@ -86,6 +137,13 @@ class ConfigLoader:
             'Chaleur': "thermometer",
         }
         
+        # Snapshot du catalogue (aucun appel réseau)
+        snapshot = catalog_snapshots.current
+        if snapshot:
+            typologies = snapshot.typologies(sector)
+            if typologies:
+                return copy.deepcopy(typologies)
+        
         # Tentative de chargement depuis Supabase
         client = get_supabase_client()
         if client:
@@ -148,6 +206,13 @@ class ConfigLoader:
         """
         prefix = f"{sector_abbr}-{typology_abbr}-"
         
+        # Snapshot du catalogue (aucun appel réseau)
+        snapshot = catalog_snapshots.current
+        if snapshot:
+            fiches = snapshot.fiches(prefix)
+            if fiches:
+                return fiches
+        
         # Tentative de chargement depuis Supabase table
         client = get_supabase_client()
         if client:
@@ -170,7 +235,10 @@ class ConfigLoader:
     @staticmethod
     def load_fiche_config(fiche_code: str) -> Optional[FicheConfig]:
         """
-        Charge la configuration complète d'une fiche depuis Supabase Storage.
+        Retourne la configuration complète d'une fiche.
+        Servie depuis le snapshot du catalogue s'il la contient, sinon depuis
+        le cache partagé; Supabase Storage n'est sollicité qu'au premier
+        chargement ou lorsque la fiche a été republiée.
         
         Args:
             fiche_code: Code de la fiche (ex: "BAR-TH-101")
@@ -178,51 +246,204 @@ class ConfigLoader:
         Returns:
             FicheConfig ou None si erreur
         """
-        base_path = fiche_code
+        fiche_code = fiche_code.strip()
+        config = ConfigLoader._snapshot_fiche_config(fiche_code)
+        if config is not None:
+            return config
+        return fiche_config_cache.get(fiche_code)
+    
+    @staticmethod
+    async def load_fiche_config_async(fiche_code: str) -> Optional[FicheConfig]:
+        """
+        Version asynchrone de load_fiche_config, à utiliser dans les event handlers.
+        En cas d'absence dans le cache, les fichiers sont téléchargés en parallèle.
         
-        try:
-            # Chargement des 4 fichiers de configuration
-            function_param_values = read_file_from_bucket(
-                BUCKET_NAME,
-                f"{base_path}/function_param_values_labeled.json",
-                "json"
-            )
+        Args:
+            fiche_code: Code de la fiche (ex: "BAR-TH-101")
             
-            variables_mapping = read_file_from_bucket(
-                BUCKET_NAME,
-                f"{base_path}/variables_mapping.json",
-                "json"
-            )
+        Returns:
+            FicheConfig ou None si erreur
+        """
+        fiche_code = fiche_code.strip()
+        config = ConfigLoader._snapshot_fiche_config(fiche_code)
+        if config is not None:
+            return config
+        return await fiche_config_cache.aget(fiche_code)
+    
+    @staticmethod
+    def _snapshot_fiche_config(fiche_code: str) -> Optional[FicheConfig]:
+        """Configuration d'une fiche servie depuis le snapshot du catalogue (sauf si republiée)."""
+        snapshot = catalog_snapshots.serves(fiche_code)
+        if snapshot is None:
+            return None
+        files = snapshot.fiche_files(fiche_code)
+        return ConfigLoader._build_fiche_config(fiche_code, files) if files else None
+    
+    @staticmethod
+    def fetch_fiche_config(fiche_code: str) -> Optional[FicheConfig]:
+        """
+        Télécharge la configuration d'une fiche depuis Supabase Storage (sans cache).
+        
+        Le listing du dossier indique si le bundle (bundle.json.gz) existe et
+        s'il correspond encore aux 4 fichiers historiques; sinon ces derniers
+        sont lus un par un.
+        
+        Args:
+            fiche_code: Code de la fiche (ex: "BAR-TH-101")
             
-            variables_matching = read_file_from_bucket(
-                BUCKET_NAME,
-                f"{base_path}/variables_matching.json",
-                "json"
-            )
+        Returns:
+            FicheConfig ou None si erreur
+        """
+        try:
+            validators = get_file_validators(BUCKET_NAME, fiche_code)
+            raw = None
+            if validators is None or BUNDLE_FILE_NAME in validators:
+                raw = read_file_from_bucket(BUCKET_NAME, bundle_path(fiche_code), "bytes")
+            files = ConfigLoader._bundle_files(fiche_code, raw, validators)
             
-            string_function = read_file_from_bucket(
-                BUCKET_NAME,
-                f"{base_path}/string_function.txt",
-                "txt"
-            )
+            if files is None:
+                files = {
+                    key: read_file_from_bucket(BUCKET_NAME, path, file_type)
+                    for key, (path, file_type) in legacy_files(fiche_code).items()
+                }
+            
+            return ConfigLoader._build_fiche_config(fiche_code, files)
+                
+        except Exception as e:
+            print(f"❌ Erreur chargement config {fiche_code}: {e}")
+            return None
+    
+    @staticmethod
+    async def fetch_fiche_config_async(fiche_code: str) -> Optional[FicheConfig]:
+        """
+        Version asynchrone de fetch_fiche_config: le listing est lancé en même
+        temps que le bundle, ou que les fichiers historiques pour une fiche
+        déjà connue sans bundle.
+        
+        Args:
+            fiche_code: Code de la fiche (ex: "BAR-TH-101")
             
-            # Vérification que tous les fichiers ont été chargés
-            if all([function_param_values, variables_mapping, variables_matching, string_function]):
-                return FicheConfig(
-                    code=fiche_code,
-                    description="",
-                    function_param_values=function_param_values,
-                    variables_mapping=variables_mapping,
-                    variables_matching=variables_matching,
-                    string_function=string_function
+        Returns:
+            FicheConfig ou None si erreur
+        """
+        try:
+            if fiche_code in _fiches_without_bundle:
+                validators, files = await asyncio.gather(
+                    get_file_validators_async(BUCKET_NAME, fiche_code),
+                    read_files_from_bucket_async(BUCKET_NAME, legacy_files(fiche_code)),
                 )
+                ConfigLoader._note_bundle(fiche_code, validators)
             else:
-                print(f"❌ Fichiers manquants pour {fiche_code}")
-                return None
-                
+                validators, raw = await asyncio.gather(
+                    get_file_validators_async(BUCKET_NAME, fiche_code),
+                    read_file_from_bucket_async(BUCKET_NAME, bundle_path(fiche_code), "bytes"),
+                )
+                files = ConfigLoader._bundle_files(fiche_code, raw, validators)
+                if files is None:
+                    files = await read_files_from_bucket_async(BUCKET_NAME, legacy_files(fiche_code))
         except Exception as e:
             print(f"❌ Erreur chargement config {fiche_code}: {e}")
             return None
+        
+        return ConfigLoader._build_fiche_config(fiche_code, files)
+    
+    @staticmethod
+    def _note_bundle(fiche_code: str, validators: Optional[Dict[str, str]]):
+        """Mémorise, d'après le listing, si le dossier de la fiche contient un bundle."""
+        if validators is None:
+            return
+        if BUNDLE_FILE_NAME in validators:
+            _fiches_without_bundle.discard(fiche_code)
+        else:
+            _fiches_without_bundle.add(fiche_code)
+    
+    @staticmethod
+    def _bundle_files(
+        fiche_code: str,
+        raw: Optional[bytes],
+        validators: Optional[Dict[str, str]],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Retourne le contenu du bundle s'il est utilisable, None pour lire
+        les fichiers historiques (bundle absent, invalide ou périmé).
+        Sans listing, le bundle est utilisé sans vérification.
+        """
+        ConfigLoader._note_bundle(fiche_code, validators)
+        if validators is not None and BUNDLE_FILE_NAME not in validators:
+            print(f"ℹ️ Pas de bundle pour {fiche_code}, lecture des fichiers séparés")
+            return None
+        
+        files = unpack_bundle(raw) if raw else None
+        if files is None:
+            print(f"ℹ️ Bundle indisponible pour {fiche_code}, lecture des fichiers séparés")
+            return None
+        
+        if validators is not None and not bundle_is_current(files, validators):
+            print(
+                f"⚠️ Bundle périmé pour {fiche_code} (fichiers republiés depuis "
+                f"pack_fiche_bundles), lecture des fichiers séparés"
+            )
+            return None
+        
+        return files
+    
+    @staticmethod
+    def _build_fiche_config(fiche_code: str, files: Dict[str, Any]) -> Optional[FicheConfig]:
+        """
+        Construit la FicheConfig à partir du contenu des fichiers.
+        Seul string_function est obligatoire: les autres fichiers sont
+        optionnels et remplacés par un dict vide s'ils sont absents.
+        """
+        if not files.get("string_function"):
+            print(f"❌ string_function.txt manquant pour {fiche_code}")
+            return None
+        
+        return FicheConfig(
+            code=fiche_code,
+            description="",
+            function_param_values=files.get("function_param_values") or {},
+            variables_mapping=files.get("variables_mapping") or {},
+            variables_matching=files.get("variables_matching") or {},
+            string_function=files["string_function"]
+        )
+    
+    @staticmethod
+    def fetch_fiche_validators(fiche_code: str) -> Optional[Dict[str, str]]:
+        """
+        Retourne les ETag des fichiers d'une fiche (revalidation du cache).
+        
+        Args:
+            fiche_code: Code de la fiche
+            
+        Returns:
+            Dict {fichier: etag} ou None si indisponible
+        """
+        return get_file_validators(BUCKET_NAME, fiche_code)
+    
+    @staticmethod
+    async def fetch_fiche_validators_async(fiche_code: str) -> Optional[Dict[str, str]]:
+        """Version asynchrone de fetch_fiche_validators."""
+        return await get_file_validators_async(BUCKET_NAME, fiche_code)
+    
+    @staticmethod
+    def invalidate_fiche_config(fiche_code: str = "") -> int:
+        """
+        Invalide la configuration en cache d'une fiche (toutes si vide).
+        À appeler après republication d'une fiche dans le bucket: la fiche est
+        aussi évincée du snapshot du catalogue, qui la servirait sinon sans
+        revalidation jusqu'à la publication d'un nouveau snapshot. L'éviction
+        est publiée dans le bucket pour les autres workers et instances.
+        
+        Args:
+            fiche_code: Code de la fiche
+            
+        Returns:
+            Nombre d'entrées invalidées
+        """
+        fiche_code = fiche_code.strip()
+        count = fiche_config_cache.invalidate(fiche_code) + catalog_snapshots.evict(fiche_code)
+        print(f"🔄 Cache fiches invalidé: {fiche_code or 'toutes'} ({count} entrée(s))")
+        return count
     
     @staticmethod
     def get_departments() -> Dict[str, str]:
@@ -337,5 +558,13 @@ class ConfigLoader:
         }
 
 
+# Cache partagé des configurations de fiches
+fiche_config_cache = FicheConfigCache(
+    loader=ConfigLoader.fetch_fiche_config,
+    validator=ConfigLoader.fetch_fiche_validators,
+    async_loader=ConfigLoader.fetch_fiche_config_async,
+    async_validator=ConfigLoader.fetch_fiche_validators_async,
+)
+
 # Instance singleton
 config_loader = ConfigLoader()
@@ -0,0 +1,99 @@
+"""
+Jetons de téléchargement signés pour les routes HTTP de l'API (exports).
+
+Un état Reflex émet un jeton de courte durée pour l'utilisateur connecté;
+le navigateur télécharge ensuite directement la route /export/... avec ce
+jeton, sans passer par le websocket. Le jeton est signé (HMAC-SHA256) et
+porte sa portée, l'utilisateur et l'expiration: aucune donnée côté serveur.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from typing import Any, Dict, Optional
+
+
+# Secret de signature (partagé par toutes les instances du backend)
+DOWNLOAD_TOKEN_SECRET = os.getenv("DOWNLOAD_TOKEN_SECRET", "")
+# Durée de validité d'un jeton (secondes)
+DOWNLOAD_TOKEN_TTL = int(os.getenv("DOWNLOAD_TOKEN_TTL", "300"))
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class DownloadTokens:
+    """
+    Émission et vérification des jetons de téléchargement.
+
+    Args:
+        secret: Clé HMAC (aléatoire par processus si vide)
+        ttl: Durée de validité par défaut (secondes)
+    """
+
+    def __init__(self, secret: str = DOWNLOAD_TOKEN_SECRET, ttl: int = DOWNLOAD_TOKEN_TTL):
+        if not secret:
+            print("⚠️ DOWNLOAD_TOKEN_SECRET non défini: jetons valides sur ce processus uniquement")
+            secret = secrets.token_hex(32)
+        self._key = secret.encode("utf-8")
+        self.ttl = ttl
+
+    def _sign(self, payload: bytes) -> str:
+        return _b64encode(hmac.new(self._key, payload, hashlib.sha256).digest())
+
+    def create(self, scope: str, user_id: str, ttl: Optional[int] = None, **claims: Any) -> str:
+        """
+        Émet un jeton.
+
+        Args:
+            scope: Usage autorisé (ex: "export")
+            user_id: Utilisateur dont les données peuvent être lues
+                ("anon:<client_token>" pour un visiteur non connecté)
+            ttl: Durée de validité (secondes, défaut self.ttl)
+            **claims: Paramètres signés avec le jeton (format, filtres...)
+
+        Returns:
+            Jeton "payload.signature" (base64url)
+        """
+        payload = {
+            **claims,
+            "scope": scope,
+            "sub": user_id,
+            "exp": int(time.time()) + (ttl or self.ttl),
+        }
+        encoded = _b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        return f"{encoded}.{self._sign(encoded.encode('ascii'))}"
+
+    def verify(self, token: str, scope: str) -> Optional[Dict[str, Any]]:
+        """
+        Vérifie un jeton.
+
+        Returns:
+            Contenu du jeton (sub, exp, claims) ou None s'il est invalide,
+            expiré ou émis pour une autre portée
+        """
+        try:
+            encoded, signature = token.split(".", 1)
+            if not hmac.compare_digest(signature, self._sign(encoded.encode("ascii"))):
+                return None
+            payload = json.loads(_b64decode(encoded))
+        except (ValueError, UnicodeError):
+            return None
+        if not isinstance(payload, dict) or payload.get("scope") != scope or not payload.get("sub"):
+            return None
+        if int(payload.get("exp", 0)) < time.time():
+            return None
+        return payload
+
+
+# Instance singleton
+download_tokens = DownloadTokens()
@@ -0,0 +1,299 @@
+"""
+Exécution des fonctions de fiches dans un pool de processus dédiés.
+Le code des fiches (exec) ne tourne plus dans la boucle d'événements Reflex:
+un calcul lent ou pathologique n'occupe qu'un worker, limité en temps CPU,
+en mémoire et en durée, et les calculs lourds se répartissent sur les cœurs.
+"""
+
+import os
+import signal
+import asyncio
+import threading
+import weakref
+import multiprocessing
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Plateformes sans rlimit (Windows)
+    resource = None
+
+
+# "inline" (dans le processus courant) ou "pool" (processus dédiés)
+FICHE_EXECUTION_BACKEND = os.getenv("FICHE_EXECUTION_BACKEND", "inline")
+FICHE_POOL_WORKERS = int(os.getenv("FICHE_POOL_WORKERS", str(os.cpu_count() or 2)))
+# Limites par appel: temps CPU (s), durée totale (s), mémoire par worker (Mo)
+FICHE_CPU_LIMIT = float(os.getenv("FICHE_CPU_LIMIT", "2"))
+FICHE_CALL_TIMEOUT = float(os.getenv("FICHE_CALL_TIMEOUT", "5"))
+FICHE_MEMORY_LIMIT_MB = int(os.getenv("FICHE_MEMORY_LIMIT_MB", "1024"))
+
+
+class FicheExecutionError(RuntimeError):
+    """Échec de l'exécution d'une fonction de fiche dans le pool."""
+
+
+class FicheTimeoutError(FicheExecutionError):
+    """Dépassement du temps CPU ou de la durée autorisés."""
+
+
+def use_execution_pool() -> bool:
+    """Indique si les calculs doivent être envoyés au pool de processus."""
+    return FICHE_EXECUTION_BACKEND == "pool"
+
+
+# ==================== Côté worker ====================
+
+# Limites appliquées dans le worker courant (messages d'erreur)
+_worker_limits = {"cpu": FICHE_CPU_LIMIT, "memory_mb": FICHE_MEMORY_LIMIT_MB}
+
+
+def _cpu_limit_exceeded(signum, frame):
+    raise FicheTimeoutError(f"Temps CPU dépassé ({_worker_limits['cpu']}s)")
+
+
+def _init_worker(memory_limit_mb: int):
+    """Initialisation d'un worker: limite mémoire et gestion du timer CPU."""
+    _worker_limits["memory_mb"] = memory_limit_mb
+    if resource is not None and memory_limit_mb > 0:
+        limit = memory_limit_mb * 1024 * 1024
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ValueError, OSError) as e:
+            print(f"⚠️ Limite mémoire non appliquée: {e}")
+    if hasattr(signal, "setitimer"):
+        signal.signal(signal.SIGPROF, _cpu_limit_exceeded)
+
+
+def _call_in_worker(code_string: str, fiche_code: str, args: Dict[str, Any], cpu_limit: float) -> Any:
+    """Exécute un appel sous limite de temps CPU (fonction compilée mise en cache)."""
+    from .function_loader import FunctionLoader
+
+    loader = FunctionLoader(code_string, fiche_code=fiche_code)
+    if cpu_limit > 0 and hasattr(signal, "setitimer"):
+        _worker_limits["cpu"] = cpu_limit
+        signal.setitimer(signal.ITIMER_PROF, cpu_limit)
+    try:
+        return loader.call_with_dict(args)
+    except MemoryError:
+        raise FicheExecutionError(f"Mémoire dépassée ({_worker_limits['memory_mb']} Mo)")
+    finally:
+        if hasattr(signal, "setitimer"):
+            signal.setitimer(signal.ITIMER_PROF, 0)
+
+
+def _worker_call_many(
+    code_string: str,
+    fiche_code: str,
+    rows: List[Dict[str, Any]],
+    cpu_limit: float,
+) -> List[tuple]:
+    """Exécute un lot d'appels; chaque ligne renvoie (succès, résultat, erreur)."""
+    outcomes = []
+    for args in rows:
+        try:
+            outcomes.append((True, _call_in_worker(code_string, fiche_code, args, cpu_limit), ""))
+        except Exception as e:
+            outcomes.append((False, None, str(e)))
+    return outcomes
+
+
+def _worker_ready() -> int:
+    """Tâche vide servant à démarrer les workers."""
+    return os.getpid()
+
+
+# ==================== Côté application ====================
+
+class ExecutionPool:
+    """
+    Pool de processus pré-démarrés exécutant les fonctions des fiches.
+
+    Args:
+        workers: Nombre de processus
+        cpu_limit: Temps CPU maximal par appel (secondes)
+        timeout: Durée maximale d'un appel (secondes)
+        memory_limit_mb: Mémoire virtuelle maximale par worker (Mo)
+    """
+
+    def __init__(
+        self,
+        workers: int = FICHE_POOL_WORKERS,
+        cpu_limit: float = FICHE_CPU_LIMIT,
+        timeout: float = FICHE_CALL_TIMEOUT,
+        memory_limit_mb: int = FICHE_MEMORY_LIMIT_MB,
+    ):
+        self.workers = max(1, workers)
+        self.cpu_limit = cpu_limit
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Pools terminés après un dépassement de durée (appels voisins à relancer)
+        self._timed_out: "weakref.WeakSet[ProcessPoolExecutor]" = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Crée le pool et démarre tous les workers (pré-fork)."""
+        with self._lock:
+            if self._executor is None:
+                # forkserver: les workers ne sont pas forkés depuis le serveur multi-thread
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else None)
+                executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(self.memory_limit_mb,),
+                )
+                # Soumissions simultanées: chaque worker est démarré immédiatement
+                for future in [executor.submit(_worker_ready) for _ in range(self.workers)]:
+                    future.result()
+                print(f"✅ Pool d'exécution des fiches démarré: {self.workers} worker(s)")
+                self._executor = executor
+            return self._executor
+
+    def start(self):
+        """Démarre le pool (à appeler au démarrage pour éviter le coût au premier calcul)."""
+        self._get_executor()
+
+    def _reset(self, executor: ProcessPoolExecutor, timed_out: bool = False):
+        """
+        Termine un pool bloqué (worker dépassant la durée autorisée) ;
+        un nouveau pool est créé au prochain appel.
+        """
+        with self._lock:
+            if timed_out:
+                self._timed_out.add(executor)
+            if self._executor is not executor:
+                return
+            self._executor = None
+        for process in list(getattr(executor, "_processes", {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+        print("⚠️ Pool d'exécution des fiches redémarré")
+
+    def _result(self, executor: ProcessPoolExecutor, future, timeout: float, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Attend le résultat de fn(*args) soumis au pool. Le pool ne permet pas
+        de terminer un seul worker: un dépassement de durée les termine tous.
+        Seul l'appel fautif échoue; les appels voisins interrompus (annulés ou
+        dont le worker a été terminé) sont relancés une fois sur le nouveau pool.
+        """
+        retried = False
+        while True:
+            try:
+                return future.result(timeout=timeout)
+            except FutureTimeoutError:
+                self._reset(executor, timed_out=True)
+                raise FicheTimeoutError(f"Calcul interrompu après {timeout}s")
+            except (BrokenProcessPool, CancelledError):
+                if retried or executor not in self._timed_out:
+                    self._reset(executor)
+                    raise FicheExecutionError("Worker de calcul arrêté (mémoire ou plantage)")
+            retried = True
+            executor = self._get_executor()
+            future = executor.submit(fn, *args)
+
+    def call(
+        self,
+        code_string: str,
+        args: Dict[str, Any],
+        fiche_code: str = "",
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """
+        Exécute la fonction d'une fiche dans un worker (appel bloquant).
+
+        Args:
+            code_string: Code Python de la fonction
+            args: Arguments nommés
+            fiche_code: Code de la fiche (clé du cache de fonctions du worker)
+            timeout: Durée maximale (FICHE_CALL_TIMEOUT par défaut)
+
+        Returns:
+            Résultat de la fonction
+
+        Raises:
+            FicheTimeoutError: Si le temps CPU ou la durée sont dépassés
+            FicheExecutionError: Si le worker s'arrête
+        """
+        call = (_call_in_worker, code_string, fiche_code, args, self.cpu_limit)
+        executor = self._get_executor()
+        return self._result(executor, executor.submit(*call), timeout or self.timeout, *call)
+
+    def call_many(
+        self,
+        code_string: str,
+        rows: List[Dict[str, Any]],
+        fiche_code: str = "",
+        timeout: Optional[float] = None,
+    ) -> List[tuple]:
+        """
+        Exécute un lot d'appels réparti sur tous les workers.
+
+        Args:
+            code_string: Code Python de la fonction
+            rows: Liste des arguments nommés, un dict par appel
+            fiche_code: Code de la fiche
+            timeout: Durée maximale par appel (le lot dispose de timeout × taille des parts)
+
+        Returns:
+            Liste de tuples (succès, résultat, erreur), dans l'ordre des lignes;
+            les lignes d'une part interrompue sont en échec, les autres parts
+            sont conservées
+        """
+        if not rows:
+            return []
+        executor = self._get_executor()
+        part_size = -(-len(rows) // self.workers)
+        calls = [
+            (_worker_call_many, code_string, fiche_code, rows[i:i + part_size], self.cpu_limit)
+            for i in range(0, len(rows), part_size)
+        ]
+        futures = [executor.submit(*call) for call in calls]
+        part_timeout = (timeout or self.timeout) * part_size
+        outcomes = []
+        for future, call in zip(futures, calls):
+            try:
+                outcomes.extend(self._result(executor, future, part_timeout, *call))
+            except FicheExecutionError as e:
+                outcomes.extend((False, None, str(e)) for _ in call[3])
+        return outcomes
+
+    async def acall(
+        self,
+        code_string: str,
+        args: Dict[str, Any],
+        fiche_code: str = "",
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """Version asynchrone de call (n'occupe pas la boucle d'événements)."""
+        return await asyncio.to_thread(self.call, code_string, args, fiche_code, timeout)
+
+    async def acall_many(
+        self,
+        code_string: str,
+        rows: List[Dict[str, Any]],
+        fiche_code: str = "",
+        timeout: Optional[float] = None,
+    ) -> List[tuple]:
+        """Version asynchrone de call_many."""
+        return await asyncio.to_thread(self.call_many, code_string, rows, fiche_code, timeout)
+
+    def shutdown(self):
+        """Arrête les workers."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Instance singleton
+execution_pool = ExecutionPool()
+
+
+async def start_execution_pool():
+    """Tâche de démarrage (lifespan): pré-démarre les workers si le pool est activé."""
+    if use_execution_pool():
+        await asyncio.to_thread(execution_pool.start)
@@ -0,0 +1,131 @@
+"""
+Format « bundle » d'une fiche: un seul objet Storage par fiche.
+Regroupe les quatre fichiers historiques (param values, mapping, matching,
+code de calcul) dans un JSON compressé, avec un hash de contenu et les
+validateurs (ETag) des fichiers historiques à partir desquels il a été construit.
+"""
+
+import gzip
+import json
+import hashlib
+from typing import Any, Dict, Optional
+
+
+# Nom de l'objet dans le dossier de la fiche (ex: BAR-TH-101/bundle.json.gz)
+BUNDLE_FILE_NAME = "bundle.json.gz"
+BUNDLE_FORMAT_VERSION = 1
+BUNDLE_CONTENT_TYPE = "application/gzip"
+
+# Fichiers historiques: clé du bundle → (nom de fichier, type)
+LEGACY_FILES = {
+    "function_param_values": ("function_param_values_labeled.json", "json"),
+    "variables_mapping": ("variables_mapping.json", "json"),
+    "variables_matching": ("variables_matching.json", "json"),
+    "string_function": ("string_function.txt", "txt"),
+}
+
+
+def bundle_path(fiche_code: str) -> str:
+    """Chemin du bundle d'une fiche dans le bucket."""
+    return f"{fiche_code}/{BUNDLE_FILE_NAME}"
+
+
+def legacy_files(fiche_code: str) -> Dict[str, tuple]:
+    """Chemins des fichiers historiques d'une fiche: {clé: (chemin, type)}."""
+    return {
+        key: (f"{fiche_code}/{file_name}", file_type)
+        for key, (file_name, file_type) in LEGACY_FILES.items()
+    }
+
+
+def source_validators(validators: Dict[str, str]) -> Dict[str, str]:
+    """Extrait d'un listing {fichier: validateur} ceux des fichiers historiques."""
+    names = [file_name for file_name, _ in LEGACY_FILES.values()]
+    return {name: validators[name] for name in names if name in validators}
+
+
+def bundle_is_current(files: Dict[str, Any], validators: Dict[str, str]) -> bool:
+    """
+    Indique si un bundle décodé correspond encore aux fichiers historiques.
+
+    Un fichier historique republié sans reconstruire le bundle change d'ETag:
+    le bundle est alors périmé. Un bundle sans validateurs enregistrés
+    (construit avant leur ajout) ne peut pas être vérifié et est considéré périmé.
+
+    Args:
+        files: Contenu retourné par unpack_bundle
+        validators: Listing courant du dossier de la fiche
+    """
+    sources = files.get("sources")
+    return bool(sources) and sources == source_validators(validators)
+
+
+def content_hash(files: Dict[str, Any]) -> str:
+    """Hash SHA-256 canonique du contenu d'une fiche."""
+    canonical = json.dumps(
+        {key: files.get(key) for key in LEGACY_FILES},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def pack_bundle(
+    fiche_code: str,
+    files: Dict[str, Any],
+    sources: Optional[Dict[str, str]] = None,
+) -> bytes:
+    """
+    Construit le bundle compressé d'une fiche.
+
+    Args:
+        fiche_code: Code de la fiche (ex: "BAR-TH-101")
+        files: Dict {clé: contenu} avec les clés de LEGACY_FILES
+        sources: Validateurs des fichiers historiques lus (voir source_validators)
+
+    Returns:
+        Contenu gzip du bundle
+    """
+    if not files.get("string_function"):
+        raise ValueError(f"string_function manquant pour {fiche_code}")
+
+    payload = {
+        "version": BUNDLE_FORMAT_VERSION,
+        "code": fiche_code,
+        "function_param_values": files.get("function_param_values") or {},
+        "variables_mapping": files.get("variables_mapping") or {},
+        "variables_matching": files.get("variables_matching") or {},
+        "string_function": files["string_function"],
+        "sources": sources or {},
+    }
+    payload["content_hash"] = content_hash(payload)
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    # mtime=0: un même contenu produit toujours les mêmes octets
+    return gzip.compress(raw, mtime=0)
+
+
+def unpack_bundle(raw: bytes) -> Optional[Dict[str, Any]]:
+    """
+    Décode un bundle et vérifie sa version et son hash.
+
+    Args:
+        raw: Contenu gzip téléchargé
+
+    Returns:
+        Dict {clé: contenu} ou None si le bundle est invalide
+    """
+    try:
+        payload = json.loads(gzip.decompress(raw).decode("utf-8"))
+    except Exception as e:
+        print(f"❌ Bundle illisible: {e}")
+        return None
+
+    if payload.get("version") != BUNDLE_FORMAT_VERSION:
+        print(f"⚠️ Version de bundle non supportée: {payload.get('version')}")
+        return None
+    if payload.get("content_hash") != content_hash(payload):
+        print(f"❌ Bundle corrompu pour {payload.get('code')}: hash invalide")
+        return None
+
+    return payload
@@ -0,0 +1,250 @@
+"""
+Cache in-process des configurations de fiches (FicheConfig).
+Évite les téléchargements répétés depuis Supabase Storage: une fiche
+chaude est servie sans aucun appel réseau pendant le TTL, puis revalidée
+par un simple listing du dossier (ETag / last-modified des fichiers).
+"""
+
+import os
+import time
+import asyncio
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+# Durée de validité d'une entrée avant revalidation (secondes)
+FICHE_CACHE_TTL = float(os.getenv("FICHE_CACHE_TTL", "300"))
+
+
+@dataclass
+class CacheEntry:
+    """Entrée du cache: configuration parsée et validateurs associés."""
+    config: Any
+    validators: Dict[str, str] = field(default_factory=dict)
+    fetched_at: float = 0.0
+
+
+class FicheConfigCache:
+    """
+    Cache partagé des configurations de fiches.
+
+    Args:
+        loader: Callable(fiche_code) -> FicheConfig ou None (accès réseau)
+        validator: Callable(fiche_code) -> Dict[fichier, etag] ou None
+        ttl: Durée de validité avant revalidation (secondes)
+        async_loader: Équivalent asynchrone de loader (optionnel)
+        async_validator: Équivalent asynchrone de validator (optionnel)
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], Any],
+        validator: Optional[Callable[[str], Optional[Dict[str, str]]]] = None,
+        ttl: float = FICHE_CACHE_TTL,
+        async_loader: Optional[Callable[[str], Awaitable[Any]]] = None,
+        async_validator: Optional[Callable[[str], Awaitable[Optional[Dict[str, str]]]]] = None,
+    ):
+        self._loader = loader
+        self._validator = validator
+        self._async_loader = async_loader
+        self._async_validator = async_validator
+        self.ttl = ttl
+        self._entries: Dict[str, CacheEntry] = {}
+        self._lock = threading.Lock()
+        self._fiche_locks: Dict[str, threading.Lock] = {}
+        self._async_locks: Dict[str, asyncio.Lock] = {}
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+
+    def _fiche_lock(self, fiche_code: str) -> threading.Lock:
+        """Verrou par fiche: un seul chargement simultané par code."""
+        with self._lock:
+            lock = self._fiche_locks.get(fiche_code)
+            if lock is None:
+                lock = self._fiche_locks[fiche_code] = threading.Lock()
+            return lock
+
+    def _fresh_entry(self, fiche_code: str) -> Optional[CacheEntry]:
+        """Retourne l'entrée si elle est encore dans son TTL."""
+        with self._lock:
+            entry = self._entries.get(fiche_code)
+            if entry and time.monotonic() - entry.fetched_at < self.ttl:
+                self.hits += 1
+                return entry
+        return None
+
+    def _async_fiche_lock(self, fiche_code: str) -> asyncio.Lock:
+        """Verrou asynchrone par fiche (coalesce les chargements concurrents)."""
+        with self._lock:
+            lock = self._async_locks.get(fiche_code)
+            if lock is None:
+                lock = self._async_locks[fiche_code] = asyncio.Lock()
+            return lock
+
+    def _stale_entry(self, fiche_code: str) -> Optional[CacheEntry]:
+        """Retourne l'entrée expirée éventuelle (candidate à la revalidation)."""
+        with self._lock:
+            return self._entries.get(fiche_code)
+
+    def _revalidated(self, stale: Optional[CacheEntry], validators: Optional[Dict[str, str]]) -> bool:
+        """
+        Prolonge l'entrée si les fichiers n'ont pas changé.
+        Si la revalidation est impossible (réseau), l'entrée est aussi conservée.
+        """
+        if stale is None:
+            return False
+        if validators is None or (validators and validators == stale.validators):
+            self.revalidations += 1
+            stale.fetched_at = time.monotonic()
+            return True
+        return False
+
+    def _store(
+        self,
+        fiche_code: str,
+        config: Any,
+        validators: Optional[Dict[str, str]],
+        stale: Optional[CacheEntry],
+    ) -> Optional[Any]:
+        """Enregistre le résultat d'un chargement (les échecs ne sont pas mis en cache)."""
+        if config is None:
+            # Conserver l'ancienne version si le rechargement échoue
+            return stale.config if stale else None
+        self.put(fiche_code, config, validators or {})
+        return config
+
+    def get(self, fiche_code: str) -> Optional[Any]:
+        """
+        Retourne la configuration d'une fiche (cache, revalidation ou chargement).
+
+        Args:
+            fiche_code: Code de la fiche (ex: "BAR-TH-101")
+
+        Returns:
+            FicheConfig ou None si la fiche est introuvable
+        """
+        entry = self._fresh_entry(fiche_code)
+        if entry:
+            return entry.config
+
+        with self._fiche_lock(fiche_code):
+            # Un autre thread a pu recharger la fiche pendant l'attente
+            entry = self._fresh_entry(fiche_code)
+            if entry:
+                return entry.config
+
+            stale = self._stale_entry(fiche_code)
+            validators = self._validate(fiche_code)
+            if self._revalidated(stale, validators):
+                return stale.config
+
+            self.misses += 1
+            config = self._loader(fiche_code)
+            return self._store(fiche_code, config, validators, stale)
+
+    async def aget(self, fiche_code: str) -> Optional[Any]:
+        """
+        Version asynchrone de get: le réseau n'est jamais appelé
+        depuis la boucle d'événements.
+
+        Args:
+            fiche_code: Code de la fiche (ex: "BAR-TH-101")
+
+        Returns:
+            FicheConfig ou None si la fiche est introuvable
+        """
+        entry = self._fresh_entry(fiche_code)
+        if entry:
+            return entry.config
+
+        async with self._async_fiche_lock(fiche_code):
+            entry = self._fresh_entry(fiche_code)
+            if entry:
+                return entry.config
+
+            stale = self._stale_entry(fiche_code)
+            if stale is None:
+                # Premier chargement: listing et téléchargements en parallèle
+                self.misses += 1
+                validators, config = await asyncio.gather(
+                    self._avalidate(fiche_code),
+                    self._aload(fiche_code),
+                )
+                return self._store(fiche_code, config, validators, stale)
+
+            validators = await self._avalidate(fiche_code)
+            if self._revalidated(stale, validators):
+                return stale.config
+
+            self.misses += 1
+            config = await self._aload(fiche_code)
+            return self._store(fiche_code, config, validators, stale)
+
+    async def _aload(self, fiche_code: str) -> Optional[Any]:
+        """Charge une fiche sans bloquer la boucle d'événements."""
+        if self._async_loader is not None:
+            return await self._async_loader(fiche_code)
+        return await asyncio.to_thread(self._loader, fiche_code)
+
+    def _validate(self, fiche_code: str) -> Optional[Dict[str, str]]:
+        """Récupère les validateurs courants (None si indisponibles)."""
+        if self._validator is None:
+            return None
+        try:
+            return self._validator(fiche_code)
+        except Exception as e:
+            print(f"⚠️ Revalidation impossible pour {fiche_code}: {e}")
+            return None
+
+    async def _avalidate(self, fiche_code: str) -> Optional[Dict[str, str]]:
+        """Version asynchrone de _validate."""
+        try:
+            if self._async_validator is not None:
+                return await self._async_validator(fiche_code)
+            if self._validator is not None:
+                return await asyncio.to_thread(self._validator, fiche_code)
+        except Exception as e:
+            print(f"⚠️ Revalidation impossible pour {fiche_code}: {e}")
+        return None
+
+    def put(self, fiche_code: str, config: Any, validators: Optional[Dict[str, str]] = None):
+        """Insère ou remplace la configuration d'une fiche."""
+        with self._lock:
+            self._entries[fiche_code] = CacheEntry(
+                config=config,
+                validators=validators or {},
+                fetched_at=time.monotonic(),
+            )
+
+    def invalidate(self, fiche_code: str = "") -> int:
+        """
+        Invalide une fiche (ou tout le cache si vide), par exemple
+        après republication dans le bucket fiches-operations.
+
+        Returns:
+            Nombre d'entrées supprimées
+        """
+        with self._lock:
+            if not fiche_code:
+                count = len(self._entries)
+                self._entries.clear()
+                return count
+            return 1 if self._entries.pop(fiche_code, None) else 0
+
+    def cached_codes(self) -> list:
+        """Liste des fiches actuellement en cache."""
+        with self._lock:
+            return sorted(self._entries.keys())
+
+    def stats(self) -> Dict[str, Any]:
+        """Retourne les statistiques du cache."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "revalidations": self.revalidations,
+                "misses": self.misses,
+            }
@@ -0,0 +1,315 @@
+"""
+Compilation « forme close » des fonctions de fiches.
+
+La plupart des string_function.txt sont des tables de correspondance
+(dicts par zone climatique, usage, puissance...) suivies d'un produit:
+
+    def calcul(zone, usage, surface):
+        coef_zone = {"H1": 1.2, "H2": 1.0, "H3": 0.8}
+        forfait = {"Maison": {"H1": 1500, ...}, ...}
+        return coef_zone[zone] * forfait[usage][zone] * surface
+
+Le compilateur reconnaît ce motif sur l'AST et produit:
+  - un évaluateur scalaire spécialisé (tables construites une seule fois
+    au lieu d'être recréées à chaque appel);
+  - un évaluateur vectorisé où chaque table devient un tableau NumPy indexé
+    par des codes entiers (un lot entier est évalué sans boucle Python).
+Les fonctions non reconnues ne sont pas compilées (exec classique).
+"""
+
+import ast
+import itertools
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Évaluateur scalaire uniquement
+    np = None
+
+
+_ARITHMETIC_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.USub, ast.UAdd)
+_KEY_TYPES = (str, int, float, bool)
+
+
+@dataclass
+class LookupTable:
+    """Table de correspondance convertie en tableau dense."""
+    name: str
+    depth: int
+    data: Dict[Any, Any]
+    keys: List[List[Any]]  # Clés de chaque dimension, dans l'ordre
+    values: Any = None      # np.ndarray (NaN pour les combinaisons absentes)
+
+    def __post_init__(self):
+        self._indexes = [{key: i for i, key in enumerate(keys)} for keys in self.keys]
+        if np is not None:
+            self.values = np.full([len(keys) for keys in self.keys], np.nan)
+            for combination in itertools.product(*(range(len(keys)) for keys in self.keys)):
+                value = self.data
+                for dimension, position in enumerate(combination):
+                    if not isinstance(value, dict) or self.keys[dimension][position] not in value:
+                        value = None
+                        break
+                    value = value[self.keys[dimension][position]]
+                if value is not None:
+                    self.values[combination] = value
+
+    def encode(self, dimension: int, column: Any) -> Any:
+        """Codes entiers d'une colonne de clés (-1 pour une clé inconnue)."""
+        index = self._indexes[dimension]
+        codes = {value: index.get(value, -1) for value in set(column)}
+        return np.fromiter(map(codes.__getitem__, column), dtype=np.int64, count=len(column))
+
+
+@dataclass
+class Lookup:
+    """Accès table[p1][p2]... dans l'expression (p = paramètres de la fonction)."""
+    table: LookupTable
+    params: Tuple[str, ...]
+
+
+@dataclass
+class ClosedForm:
+    """Fonction de fiche compilée en forme close."""
+    name: str
+    params: List[str]
+    numeric_params: List[str]  # Paramètres utilisés dans les calculs
+    key_params: List[str]      # Paramètres utilisés comme clés de table
+    lookups: List[Lookup]
+    scalar: Any                # Évaluateur scalaire (même signature que l'original)
+    vector: Any = None         # Évaluateur vectorisé (paramètres + tables résolues)
+
+    def evaluate_columns(
+        self,
+        numeric_columns: Dict[str, Any],
+        key_columns: Dict[str, Any],
+        size: int,
+    ) -> Tuple[Any, Any]:
+        """
+        Évalue un lot en colonnes.
+
+        Args:
+            numeric_columns: {paramètre de numeric_params: tableau float64}
+            key_columns: {paramètre de key_params: séquence de clés}
+            size: Nombre de lignes
+
+        Returns:
+            Tuple (résultats float64, masque des lignes dont une clé est inconnue)
+        """
+        missing = np.zeros(size, dtype=bool)
+        arguments = {}
+        for name in self.numeric_params:
+            arguments[name] = np.asarray(numeric_columns[name], dtype=np.float64)
+
+        for position, lookup in enumerate(self.lookups):
+            codes = []
+            for dimension, param in enumerate(lookup.params):
+                code = lookup.table.encode(dimension, key_columns[param])
+                missing |= code < 0
+                codes.append(np.where(code < 0, 0, code))
+            values = lookup.table.values[tuple(codes)]
+            # NaN: combinaison absente d'une table irrégulière
+            missing |= np.isnan(values)
+            arguments[f"__lookup_{position}"] = values
+
+        with np.errstate(all="ignore"):
+            result = np.broadcast_to(
+                np.asarray(self.vector(**arguments), dtype=np.float64), (size,)
+            ).copy()
+        return result, missing
+
+
+class _Rejected(Exception):
+    """Construction non reconnue: la fonction reste exécutée telle quelle."""
+
+
+def _literal_table(node: ast.AST) -> Tuple[Dict[Any, Any], int]:
+    """Évalue un dict littéral (clés constantes, valeurs numériques ou dicts imbriqués)."""
+    if not isinstance(node, ast.Dict) or not node.keys:
+        raise _Rejected()
+    data, depths = {}, set()
+    for key_node, value_node in zip(node.keys, node.values):
+        if not isinstance(key_node, ast.Constant) or not isinstance(key_node.value, _KEY_TYPES):
+            raise _Rejected()
+        if isinstance(value_node, ast.Dict):
+            value, depth = _literal_table(value_node)
+            depths.add(depth + 1)
+        elif (
+            isinstance(value_node, ast.Constant)
+            and isinstance(value_node.value, (int, float))
+            and not isinstance(value_node.value, bool)
+        ):
+            value = value_node.value
+            depths.add(1)
+        else:
+            raise _Rejected()
+        data[key_node.value] = value
+    if len(depths) != 1:
+        raise _Rejected()
+    return data, depths.pop()
+
+
+class _Analyzer:
+    """Vérifie le motif (tables + expressions arithmétiques) et collecte les accès."""
+
+    def __init__(self, params: List[str]):
+        self.params = set(params)
+        self.locals = set()
+        self.tables: Dict[str, LookupTable] = {}
+        self.lookups: List[Lookup] = []
+        self.numeric_params = set()
+        self.key_params = set()
+
+    def table(self, name: str, node: ast.Dict):
+        if name in self.params or name in self.locals or name in self.tables:
+            raise _Rejected()
+        data, depth = _literal_table(node)
+        keys = [[] for _ in range(depth)]
+        level = [data]
+        for dimension in range(depth):
+            following = []
+            for mapping in level:
+                for key, value in mapping.items():
+                    if key not in keys[dimension]:
+                        keys[dimension].append(key)
+                    following.append(value)
+            level = following
+        self.tables[name] = LookupTable(name=name, depth=depth, data=data, keys=keys)
+
+    def expression(self, node: ast.AST) -> ast.AST:
+        """Retourne l'expression vectorisée (accès aux tables remplacés)."""
+        if isinstance(node, ast.Constant):
+            if not isinstance(node.value, (int, float)) or isinstance(node.value, bool):
+                raise _Rejected()
+            return node
+        if isinstance(node, ast.Name):
+            if node.id in self.params:
+                self.numeric_params.add(node.id)
+                return node
+            if node.id in self.locals:
+                return node
+            raise _Rejected()
+        if isinstance(node, ast.BinOp) and isinstance(node.op, _ARITHMETIC_OPERATORS):
+            return ast.BinOp(left=self.expression(node.left), op=node.op, right=self.expression(node.right))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, _ARITHMETIC_OPERATORS):
+            return ast.UnaryOp(op=node.op, operand=self.expression(node.operand))
+        if isinstance(node, ast.Subscript):
+            return self.lookup(node)
+        raise _Rejected()
+
+    def lookup(self, node: ast.Subscript) -> ast.AST:
+        keys = []
+        while isinstance(node, ast.Subscript):
+            key = node.slice
+            if not isinstance(key, ast.Name) or key.id not in self.params:
+                raise _Rejected()
+            keys.insert(0, key.id)
+            node = node.value
+        if not isinstance(node, ast.Name) or node.id not in self.tables:
+            raise _Rejected()
+        table = self.tables[node.id]
+        if len(keys) != table.depth:
+            raise _Rejected()
+        self.key_params.update(keys)
+        self.lookups.append(Lookup(table=table, params=tuple(keys)))
+        return ast.Name(id=f"__lookup_{len(self.lookups) - 1}", ctx=ast.Load())
+
+
+def compile_closed_form(code_string: str) -> Optional[ClosedForm]:
+    """
+    Compile une fonction de fiche en forme close si elle suit le motif
+    « tables de correspondance + expression arithmétique ».
+
+    Args:
+        code_string: Code source de la fonction
+
+    Returns:
+        ClosedForm, ou None si la fonction doit être exécutée telle quelle
+    """
+    try:
+        tree = ast.parse(code_string)
+    except SyntaxError:
+        return None
+
+    if len(tree.body) != 1 or not isinstance(tree.body[0], ast.FunctionDef):
+        return None
+    func = tree.body[0]
+    if func.decorator_list or func.args.vararg or func.args.kwarg or func.args.kwonlyargs:
+        return None
+
+    params = [arg.arg for arg in func.args.posonlyargs + func.args.args]
+    analyzer = _Analyzer(params)
+    body = func.body
+    if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant):
+        body = body[1:]
+    if not body or not isinstance(body[-1], ast.Return) or body[-1].value is None:
+        return None
+
+    try:
+        scalar_body, vector_body = [], []
+        for statement in body[:-1]:
+            if not (
+                isinstance(statement, ast.Assign)
+                and len(statement.targets) == 1
+                and isinstance(statement.targets[0], ast.Name)
+            ):
+                raise _Rejected()
+            target = statement.targets[0].id
+            if isinstance(statement.value, ast.Dict):
+                # Table hissée hors de la fonction
+                analyzer.table(target, statement.value)
+                continue
+            if target in analyzer.params or target in analyzer.tables:
+                raise _Rejected()
+            vector_body.append(ast.Assign(
+                targets=[ast.Name(id=target, ctx=ast.Store())],
+                value=analyzer.expression(statement.value),
+            ))
+            scalar_body.append(statement)
+            analyzer.locals.add(target)
+        vector_body.append(ast.Return(value=analyzer.expression(body[-1].value)))
+        scalar_body.append(body[-1])
+    except _Rejected:
+        return None
+
+    # Évaluateur scalaire: même signature, tables liées une seule fois
+    scalar_def = ast.FunctionDef(
+        name=func.name,
+        args=func.args,
+        body=scalar_body,
+        decorator_list=[],
+        returns=None,
+    )
+    scalar_namespace = {name: table.data for name, table in analyzer.tables.items()}
+    exec(compile(ast.fix_missing_locations(ast.Module(body=[scalar_def], type_ignores=[])), "<fiche>", "exec"), scalar_namespace)
+
+    closed_form = ClosedForm(
+        name=func.name,
+        params=params,
+        numeric_params=sorted(analyzer.numeric_params),
+        key_params=sorted(analyzer.key_params),
+        lookups=analyzer.lookups,
+        scalar=scalar_namespace[func.name],
+    )
+
+    if np is not None:
+        vector_args = closed_form.numeric_params + [f"__lookup_{i}" for i in range(len(analyzer.lookups))]
+        vector_def = ast.FunctionDef(
+            name=f"{func.name}_vectorized",
+            args=ast.arguments(
+                posonlyargs=[],
+                args=[ast.arg(arg=name) for name in vector_args],
+                kwonlyargs=[],
+                kw_defaults=[],
+                defaults=[],
+            ),
+            body=vector_body,
+            decorator_list=[],
+            returns=None,
+        )
+        vector_namespace = {}
+        exec(compile(ast.fix_missing_locations(ast.Module(body=[vector_def], type_ignores=[])), "<fiche>", "exec"), vector_namespace)
+        closed_form.vector = vector_namespace[vector_def.name]
+
+    return closed_form
@@ -0,0 +1,125 @@
+"""
+Cache process-wide des fonctions de calcul compilées.
+Évite de refaire ast.parse, exec et inspect.signature à chaque simulation
+pour une même fiche (clé: code fiche + hash du code source).
+"""
+
+import os
+import hashlib
+import inspect
+import threading
+import types
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Any, Optional, Tuple
+
+
+# Nombre maximum de fonctions conservées en mémoire (éviction LRU)
+FUNCTION_CACHE_MAX_SIZE = int(os.getenv("FUNCTION_CACHE_MAX_SIZE", "256"))
+
+
+@dataclass(frozen=True)
+class CompiledFunction:
+    """Fonction de fiche compilée, partagée entre toutes les sessions."""
+    name: str
+    function: types.FunctionType
+    signature: inspect.Signature
+    source_hash: str
+    closed_form: Optional[Any] = None  # Forme close (fiche_compiler), si reconnue
+
+
+def hash_source(code_string: str) -> str:
+    """Retourne le hash SHA-256 du code source d'une fonction."""
+    return hashlib.sha256(code_string.encode("utf-8")).hexdigest()
+
+
+class FunctionCache:
+    """
+    Cache LRU thread-safe des fonctions compilées.
+
+    La clé combine le code de la fiche, le hash du code source et un
+    espace de noms (chaque FunctionLoader exécute le code avec ses
+    propres globals, les objets fonction ne sont donc pas interchangeables).
+    """
+
+    def __init__(self, max_size: int = FUNCTION_CACHE_MAX_SIZE):
+        self.max_size = max(1, max_size)
+        self._entries: "OrderedDict[Tuple[str, str, str], CompiledFunction]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compile(
+        self,
+        code_string: str,
+        compiler: Callable[[], CompiledFunction],
+        fiche_code: str = "",
+        namespace: str = "default",
+    ) -> CompiledFunction:
+        """
+        Retourne la fonction compilée depuis le cache, ou la compile.
+
+        Args:
+            code_string: Code source de la fonction
+            compiler: Callable réalisant le parsing/exec en cas d'absence
+            fiche_code: Code de la fiche (ex: "BAR-TH-104")
+            namespace: Identifiant du contexte d'exécution
+
+        Returns:
+            CompiledFunction partagée
+        """
+        key = (fiche_code, hash_source(code_string), namespace)
+
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+
+        # Compilation hors verrou: les erreurs remontent à l'appelant
+        compiled = compiler()
+
+        with self._lock:
+            # Une autre session a pu compiler la même fonction entre-temps
+            existing = self._entries.get(key)
+            if existing is not None:
+                self._entries.move_to_end(key)
+                return existing
+            self._entries[key] = compiled
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+        return compiled
+
+    def invalidate(self, fiche_code: str = "") -> int:
+        """
+        Supprime les fonctions d'une fiche (ou tout le cache si vide).
+
+        Returns:
+            Nombre d'entrées supprimées
+        """
+        with self._lock:
+            if not fiche_code:
+                count = len(self._entries)
+                self._entries.clear()
+                return count
+            keys = [key for key in self._entries if key[0] == fiche_code]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """Retourne les statistiques du cache."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Instance singleton
+function_cache = FunctionCache()
@@ -8,6 +8,9 @@ import ast
 import types
 from typing import Any, Dict
 
+from .function_cache import CompiledFunction, function_cache, hash_source
+from .fiche_compiler import compile_closed_form
+
 
 class FunctionLoader:
     """
@@ -21,17 +24,53 @@ class FunctionLoader:
         signature (inspect.Signature): La signature de la fonction.
     """
     
-    def __init__(self, code_string: str):
+    def __init__(self, code_string: str, fiche_code: str = ""):
         """
         Initialise le FunctionLoader avec une chaîne de code.
 
+        La fonction compilée est partagée via le cache process-wide:
+        un même code source n'est parsé et exécuté qu'une seule fois.
+
         Args:
             code_string (str): Code Python contenant au moins une fonction.
+            fiche_code (str): Code de la fiche associée (clé du cache).
         """
         self.code_string = code_string
+        compiled = function_cache.get_or_compile(
+            code_string,
+            self._compile,
+            fiche_code=fiche_code,
+            namespace="function_loader",
+        )
+        self.function_name = compiled.name
+        self.function = compiled.function
+        self.signature = compiled.signature
+        self.closed_form = compiled.closed_form
+
+    def _compile(self) -> CompiledFunction:
+        """
+        Parse, exécute le code et construit la signature de la fonction.
+
+        Returns:
+            CompiledFunction: La fonction compilée à mettre en cache.
+        """
         self.function_name = self._extract_function_name()
-        self.function = self._load_function()
-        self.signature = inspect.signature(self.function)
+        function = self._load_function()
+
+        # Forme close (tables + produit): évaluateur spécialisé, sinon exec classique
+        try:
+            closed_form = compile_closed_form(self.code_string)
+        except Exception as e:
+            print(f"⚠️ Compilation en forme close impossible: {e}")
+            closed_form = None
+
+        return CompiledFunction(
+            name=self.function_name,
+            function=closed_form.scalar if closed_form else function,
+            signature=inspect.signature(function),
+            source_hash=hash_source(self.code_string),
+            closed_form=closed_form,
+        )
 
     def _extract_function_name(self) -> str:
         """
@@ -185,19 +224,20 @@ def extract_parameters_from_code(code_string: str) -> Dict[str, str]:
     return {}
 
 
-def safe_execute_function(code_string: str, args: Dict[str, Any]) -> tuple:
+def safe_execute_function(code_string: str, args: Dict[str, Any], fiche_code: str = "") -> tuple:
     """
     Exécute une fonction de manière sécurisée.
     
     Args:
         code_string (str): Le code de la fonction.
         args (dict): Les arguments à passer à la fonction.
+        fiche_code (str): Code de la fiche (clé du cache de fonctions).
     
     Returns:
         tuple: (success: bool, result: Any, error: str)
     """
     try:
-        loader = FunctionLoader(code_string)
+        loader = FunctionLoader(code_string, fiche_code=fiche_code)
         
         # Valider les arguments
         is_valid, missing, extra = loader.validate_args(args)
@@ -205,8 +245,13 @@ def safe_execute_function(code_string: str, args: Dict[str, Any]) -> tuple:
         if not is_valid:
             return False, None, f"Arguments manquants: {', '.join(missing)}"
         
-        # Exécuter la fonction
-        result = loader.call_with_dict(args)
+        # Exécuter la fonction (pool de processus si activé)
+        from .execution_pool import execution_pool, use_execution_pool
+        
+        if use_execution_pool():
+            result = execution_pool.call(code_string, args, fiche_code=fiche_code)
+        else:
+            result = loader.call_with_dict(args)
         return True, result, ""
         
     except ValueError as e:
@@ -0,0 +1,232 @@
+"""
+Cache des rapports PDF, servis par la route /export/reports/{empreinte}.pdf.
+
+Une simulation enregistrée ne change plus: son rapport est identifié par une
+empreinte (SHA-256) de la ligne complète et de la version du gabarit
+(REPORT_TEMPLATE_VERSION). Un téléchargement répété sert le fichier déjà
+produit, sans rendu reportlab. Le rapport de la simulation en cours (date de
+création = date de l'export) passe par le même répertoire, sans le bucket.
+
+Deux niveaux:
+    - disque local (PDF_CACHE_DIR), taille bornée, éviction des rapports les
+      moins récemment servis (date de modification, mise à jour à chaque accès);
+    - bucket Supabase Storage (PDF_CACHE_BUCKET, optionnel), partagé par les
+      instances et conservé entre les déploiements.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from .download_tokens import download_tokens
+from .pdf_report import REPORT_TEMPLATE_VERSION, report_timestamp
+from .pdf_worker import pdf_workers
+from .supabase_client import read_file_from_bucket, upload_file_to_bucket
+
+
+# Répertoire local des rapports
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(tempfile.gettempdir(), "rde_pdf_cache"))
+# Taille maximale du répertoire local (Mo)
+PDF_CACHE_MAX_MB = float(os.getenv("PDF_CACHE_MAX_MB", "200"))
+# Bucket Supabase Storage des rapports (vide = niveau désactivé)
+PDF_CACHE_BUCKET = os.getenv("PDF_CACHE_BUCKET", "")
+# Dossier des rapports dans le bucket
+PDF_CACHE_FOLDER = "_reports"
+
+
+def report_key(record: Dict[str, Any]) -> str:
+    """Empreinte du rapport d'une simulation (ligne complète + version du gabarit)."""
+    canonical = json.dumps(record, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{REPORT_TEMPLATE_VERSION}\n{canonical}".encode("utf-8")).hexdigest()
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def report_download_url(key: str, user_id: str, filename: str, shared: bool = True) -> str:
+    """URL de téléchargement d'un rapport en cache (jeton signé de courte durée)."""
+    token = download_tokens.create("report", user_id, report=key, filename=filename, shared=shared)
+    return f"/export/reports/{key}.pdf?token={token}"
+
+
+class PdfCache:
+    """
+    Rapports PDF adressés par leur empreinte.
+
+    Args:
+        directory: Répertoire local
+        max_bytes: Taille maximale du répertoire local
+        bucket: Bucket Supabase Storage (vide = désactivé)
+    """
+
+    def __init__(
+        self,
+        directory: str = PDF_CACHE_DIR,
+        max_bytes: int = int(PDF_CACHE_MAX_MB * 1024 * 1024),
+        bucket: str = PDF_CACHE_BUCKET,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.bucket = bucket
+        self._lock = threading.Lock()
+        # Empreinte -> taille, du moins au plus récemment servi (chargé au premier accès)
+        self._entries: Optional["OrderedDict[str, int]"] = None
+        self._total = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def _index(self) -> "OrderedDict[str, int]":
+        """Index du répertoire local, relu depuis le disque au premier accès."""
+        if self._entries is None:
+            os.makedirs(self.directory, exist_ok=True)
+            found = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".pdf") and entry.is_file():
+                    stat = entry.stat()
+                    found.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+            self._entries = OrderedDict((key, size) for _, key, size in sorted(found))
+            self._total = sum(self._entries.values())
+        return self._entries
+
+    def _forget(self, key: str):
+        size = self._index().pop(key, None)
+        if size is not None:
+            self._total -= size
+
+    def _touch_local(self, key: str) -> bool:
+        """Marque un rapport local comme servi (False s'il est absent)."""
+        with self._lock:
+            entries = self._index()
+            if key not in entries:
+                return False
+            try:
+                os.utime(self._path(key))
+            except FileNotFoundError:  # Évincé par un autre processus
+                self._forget(key)
+                return False
+            entries.move_to_end(key)
+            return True
+
+    def _write_local(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            entries = self._index()
+            try:
+                fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, self._path(key))
+            except OSError as e:
+                print(f"⚠️ Cache PDF: écriture impossible ({e})")
+                return
+            self._forget(key)
+            entries[key] = len(data)
+            self._total += len(data)
+
+            # Éviction des rapports les moins récemment servis
+            while self._total > self.max_bytes and len(entries) > 1:
+                old_key, size = entries.popitem(last=False)
+                self._total -= size
+                try:
+                    os.remove(self._path(old_key))
+                except FileNotFoundError:
+                    pass
+
+    def _bucket_path(self, key: str) -> str:
+        return f"{PDF_CACHE_FOLDER}/{key[:2]}/{key}.pdf"
+
+    def _upload(self, key: str, data: bytes):
+        upload_file_to_bucket(self.bucket, self._bucket_path(key), data, "application/pdf", upsert=True)
+
+    def local_path(self, key: str, shared: bool = True) -> Optional[str]:
+        """
+        Fichier local d'un rapport, rapatrié du bucket si besoin (appel bloquant).
+
+        Args:
+            key: Empreinte du rapport
+            shared: Chercher aussi dans le bucket
+
+        Returns:
+            Chemin du fichier ou None s'il n'est pas en cache
+        """
+        if self._touch_local(key):
+            return self._path(key)
+        if shared and self.bucket:
+            data = read_file_from_bucket(self.bucket, self._bucket_path(key), file_type="binary")
+            if data:
+                self._write_local(key, data)
+                if self._touch_local(key):
+                    return self._path(key)
+        return None
+
+    def put(self, key: str, data: bytes, shared: bool = True):
+        """Enregistre un rapport (disque, puis bucket en arrière-plan si shared)."""
+        self._write_local(key, data)
+        if shared and self.bucket:
+            threading.Thread(target=self._upload, args=(key, data), daemon=True).start()
+
+    async def ensure_report(self, record: Dict[str, Any], shared: bool = True) -> str:
+        """
+        Rend le rapport d'une simulation s'il n'est pas déjà en cache (pool de
+        rendu, voir pdf_worker.py). Le fichier est ensuite servi par la route
+        /export/reports/{empreinte}.pdf.
+
+        Args:
+            record: Ligne complète de la simulation; sa date created_at est
+                la date de simulation affichée dans le rapport
+            shared: Publier aussi le rapport dans le bucket (simulations
+                enregistrées uniquement)
+
+        Returns:
+            Empreinte du rapport
+
+        Raises:
+            ReportUnavailableError: Si reportlab n'est pas installé (et le rapport absent du cache)
+        """
+        key = report_key(record)
+        if await asyncio.to_thread(self.local_path, key, shared):
+            self.hits += 1
+            return key
+
+        self.misses += 1
+        data = await pdf_workers.render(record, report_timestamp(record))
+        await asyncio.to_thread(self.put, key, data, shared)
+        return key
+
+    async def read_report(self, record: Dict[str, Any], shared: bool = True) -> bytes:
+        """Octets du rapport d'une simulation (rendu s'il n'est pas en cache)."""
+        path = await asyncio.to_thread(self.local_path, await self.ensure_report(record, shared), shared)
+        if path is not None:
+            try:
+                return await asyncio.to_thread(_read_file, path)
+            except FileNotFoundError:
+                pass
+        # Évincé entre-temps (cache plus petit que les rapports demandés)
+        return await pdf_workers.render(record, report_timestamp(record))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._index()
+            return {
+                "entries": len(entries),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bucket": self.bucket or None,
+            }
+
+
+# Instance singleton
+pdf_cache = PdfCache()
@@ -0,0 +1,356 @@
+"""
+Rendu des rapports PDF de simulation (reportlab).
+
+Feuilles de style, styles de tableaux et mise en page sont construits une
+seule fois au chargement du module; chaque rendu n'assemble que les
+flowables du document. SimulationState.export_pdf (simulation en cours) et
+DashboardState.download_simulation_pdf (simulation enregistrée) passent tous
+deux par render_simulation_report avec un enregistrement au format de la
+table simulations. Les dossiers de plusieurs simulations (render_dossier)
+assemblent une page de synthèse et les rapports déjà rendus (pypdf).
+"""
+
+import io
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from xml.sax.saxutils import escape
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from .simulation_repository import decode_input_data
+
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.lib.units import cm
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+except ImportError:  # Export PDF indisponible
+    colors = None
+
+try:
+    from pypdf import PdfWriter
+except ImportError:  # Dossier PDF indisponible (rapports groupés en ZIP)
+    PdfWriter = None
+
+
+# Version du gabarit: à incrémenter à chaque changement du rendu
+REPORT_TEMPLATE_VERSION = "2"
+
+# Fuseau horaire des dates affichées (created_at est enregistré en UTC)
+REPORT_TIMEZONE = os.getenv("REPORT_TIMEZONE", "Europe/Paris")
+
+# Prix unitaire rappelé dans la note de bas de page
+_UNIT_PRICE_NOTE = "0,0065 €/kWh cumac"
+# Longueur maximale de la description dans le tableau des détails
+_MAX_DESCRIPTION = 50
+# Longueur maximale du nom d'une simulation dans le tableau de synthèse
+_MAX_SUMMARY_NAME = 40
+
+
+class ReportUnavailableError(RuntimeError):
+    """reportlab (ou pypdf pour un dossier) n'est pas installé."""
+
+
+if colors is not None:
+    _SAMPLE_STYLES = getSampleStyleSheet()
+
+    STYLES = {
+        "title": ParagraphStyle(
+            "CustomTitle",
+            parent=_SAMPLE_STYLES["Heading1"],
+            fontSize=24,
+            spaceAfter=30,
+            alignment=TA_CENTER,
+            textColor=colors.HexColor("#1a365d"),
+        ),
+        "subtitle": ParagraphStyle(
+            "CustomSubtitle",
+            parent=_SAMPLE_STYLES["Normal"],
+            fontSize=12,
+            spaceAfter=20,
+            alignment=TA_CENTER,
+            textColor=colors.HexColor("#718096"),
+        ),
+        "heading": ParagraphStyle(
+            "CustomHeading",
+            parent=_SAMPLE_STYLES["Heading2"],
+            fontSize=14,
+            spaceBefore=20,
+            spaceAfter=10,
+            textColor=colors.HexColor("#2d3748"),
+        ),
+        "footer": ParagraphStyle(
+            "Footer",
+            parent=_SAMPLE_STYLES["Normal"],
+            fontSize=8,
+            textColor=colors.HexColor("#718096"),
+            alignment=TA_CENTER,
+        ),
+    }
+
+    RESULTS_TABLE_STYLE = TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#22c55e")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, 0), 12),
+        ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
+        ("TOPPADDING", (0, 0), (-1, 0), 12),
+        ("BACKGROUND", (0, 1), (-1, -1), colors.HexColor("#f0fdf4")),
+        ("FONTSIZE", (0, 1), (-1, -1), 14),
+        ("FONTNAME", (0, 1), (-1, -1), "Helvetica-Bold"),
+        ("BOTTOMPADDING", (0, 1), (-1, -1), 15),
+        ("TOPPADDING", (0, 1), (-1, -1), 15),
+        ("GRID", (0, 0), (-1, -1), 1, colors.HexColor("#86efac")),
+    ])
+
+    DETAILS_TABLE_STYLE = TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#5a7a91")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("ALIGN", (0, 0), (0, -1), "LEFT"),
+        ("ALIGN", (1, 0), (1, -1), "LEFT"),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, -1), 10),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
+        ("TOPPADDING", (0, 0), (-1, -1), 8),
+        ("BACKGROUND", (0, 1), (0, -1), colors.HexColor("#f1f5f9")),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#cbd5e1")),
+    ])
+
+    SUMMARY_TABLE_STYLE = TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#5a7a91")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, -1), 8),
+        ("ALIGN", (3, 0), (-1, -1), "RIGHT"),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
+        ("TOPPADDING", (0, 0), (-1, -1), 5),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -2), [colors.white, colors.HexColor("#f1f5f9")]),
+        ("BACKGROUND", (0, -1), (-1, -1), colors.HexColor("#f0fdf4")),
+        ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#cbd5e1")),
+    ])
+
+    # Gabarit de page commun (A4, marges de 2 cm)
+    PAGE_TEMPLATE = {
+        "pagesize": A4,
+        "rightMargin": 2 * cm,
+        "leftMargin": 2 * cm,
+        "topMargin": 2 * cm,
+        "bottomMargin": 2 * cm,
+    }
+
+    _RESULTS_WIDTHS = [8 * cm, 8 * cm]
+    _DETAILS_WIDTHS = [6 * cm, 10 * cm]
+    _SUMMARY_WIDTHS = [5.5 * cm, 2.8 * cm, 1.7 * cm, 3.2 * cm, 2.8 * cm]
+
+
+# ==================== Flowables ====================
+
+def paragraph(text: Any, style: str) -> "Paragraph":
+    """Paragraphe d'un texte brut (caractères de balisage échappés)."""
+    return Paragraph(escape(str(text)), STYLES[style])
+
+
+def heading(text: str) -> "Paragraph":
+    return paragraph(text, "heading")
+
+
+def results_table(result_euros: float, result_cumacs: float) -> "Table":
+    """Tableau des résultats principaux (prime et volume)."""
+    table = Table(
+        [
+            ["Indicateur", "Valeur"],
+            ["Prime CEE estimée", format_euros(result_euros)],
+            ["Volume CEE", f"{result_cumacs:,.0f} kWh cumac".replace(",", " ")],
+        ],
+        colWidths=_RESULTS_WIDTHS,
+    )
+    table.setStyle(RESULTS_TABLE_STYLE)
+    return table
+
+
+def details_table(rows: List[List[Any]]) -> "Table":
+    """Tableau Paramètre / Valeur."""
+    table = Table([["Paramètre", "Valeur"]] + rows, colWidths=_DETAILS_WIDTHS)
+    table.setStyle(DETAILS_TABLE_STYLE)
+    return table
+
+
+def summary_table(records: List[Dict[str, Any]]) -> "Table":
+    """Tableau de synthèse d'un dossier: une ligne par simulation, puis le total."""
+    rows = [["Simulation", "Fiche", "Dépt.", "Volume (kWh cumac)", "Prime"]]
+    total_euros = total_cumacs = 0.0
+    for record in records:
+        euros = float(record.get("result_euros") or 0)
+        cumacs = float(record.get("result_cumacs") or 0)
+        total_euros += euros
+        total_cumacs += cumacs
+        rows.append([
+            (record.get("name") or "Simulation")[:_MAX_SUMMARY_NAME],
+            record.get("fiche_code") or "-",
+            record.get("department") or "-",
+            format_cumacs(cumacs),
+            format_euros(euros),
+        ])
+    rows.append([f"Total ({len(records)} simulations)", "", "", format_cumacs(total_cumacs), format_euros(total_euros)])
+
+    table = Table(rows, colWidths=_SUMMARY_WIDTHS, repeatRows=1)
+    table.setStyle(SUMMARY_TABLE_STYLE)
+    return table
+
+
+def format_euros(value: float) -> str:
+    return f"{value:,.2f} €".replace(",", " ")
+
+
+def format_cumacs(value: float) -> str:
+    return f"{value:,.0f}".replace(",", " ")
+
+
+# ==================== Rendu ====================
+
+def report_filename(record: Dict[str, Any], timestamp: Optional[datetime] = None) -> str:
+    """Nom de fichier du rapport (nom de la simulation assaini, horodatage optionnel)."""
+    safe_name = "".join(
+        c if c.isalnum() or c in (" ", "-", "_") else "_"
+        for c in (record.get("name") or "simulation")
+    )[:30].replace(" ", "_")
+    suffix = f"_{timestamp.strftime('%Y%m%d_%H%M%S')}" if timestamp else ""
+    return f"simulation_{safe_name}{suffix}.pdf"
+
+
+def report_timestamp(record: Dict[str, Any]) -> datetime:
+    """
+    Date de la simulation affichée dans le rapport: sa date de création, en
+    heure locale (REPORT_TIMEZONE). Le rapport ne porte pas sa date de rendu,
+    pour que le même enregistrement donne toujours le même document (cache,
+    voir pdf_cache.py). Maintenant si elle est absente ou illisible.
+    """
+    try:
+        timestamp = datetime.fromisoformat(str(record["created_at"]))
+    except (KeyError, ValueError):
+        return datetime.now()
+    if timestamp.tzinfo is None:
+        return timestamp
+    try:
+        return timestamp.astimezone(ZoneInfo(REPORT_TIMEZONE))
+    except ZoneInfoNotFoundError:
+        return timestamp.astimezone()
+
+
+def build_story(record: Dict[str, Any], simulated_at: datetime) -> List[Any]:
+    """Flowables du rapport d'une simulation."""
+    description = record.get("fiche_description") or "-"
+    if len(description) > _MAX_DESCRIPTION:
+        description = description[:_MAX_DESCRIPTION] + "..."
+
+    story = [
+        paragraph("Rapport de Simulation CEE", "title"),
+        paragraph(record.get("name") or "Simulation", "subtitle"),
+        paragraph(f"Simulation du {simulated_at.strftime('%d/%m/%Y à %H:%M')}", "subtitle"),
+        Spacer(1, 20),
+
+        heading("Résultats de la simulation"),
+        results_table(float(record.get("result_euros") or 0), float(record.get("result_cumacs") or 0)),
+        Spacer(1, 20),
+
+        heading("Détails de l'opération"),
+        details_table([
+            ["Fiche d'opération", record.get("fiche_code") or "-"],
+            ["Description", description],
+            ["Secteur", record.get("sector") or "-"],
+            ["Typologie", record.get("typology") or "-"],
+            ["Type de bénéficiaire", record.get("beneficiary_type") or "-"],
+        ]),
+        Spacer(1, 20),
+
+        heading("Localisation et date"),
+        details_table([
+            ["Département", record.get("department") or "-"],
+            ["Zone climatique", record.get("zone_climatique") or "-"],
+            ["Date de signature", record.get("date_signature") or "-"],
+        ]),
+        Spacer(1, 20),
+    ]
+
+    # Paramètres de calcul (si disponibles)
+    params = decode_input_data(record.get("input_data"))
+    if params:
+        story += [
+            heading("Paramètres de calcul"),
+            details_table([[key.replace("_", " ").title(), str(value)] for key, value in params.items()]),
+            Spacer(1, 20),
+        ]
+
+    story += [
+        Spacer(1, 30),
+        paragraph(
+            "Ce document est une estimation indicative. Le montant réel de la prime CEE peut varier "
+            "en fonction des conditions du marché et des critères d'éligibilité. "
+            f"Prix unitaire utilisé : {_UNIT_PRICE_NOTE}.",
+            "footer",
+        ),
+        paragraph("Document généré par RDE Consulting", "footer"),
+    ]
+    return story
+
+
+def render_simulation_report(record: Dict[str, Any], simulated_at: Optional[datetime] = None) -> bytes:
+    """
+    Rapport PDF d'une simulation.
+
+    Args:
+        record: Simulation au format de la table simulations (input_data en
+            JSON texte ou dict)
+        simulated_at: Date de la simulation affichée dans le rapport (défaut: maintenant)
+
+    Returns:
+        Octets du PDF
+
+    Raises:
+        ReportUnavailableError: Si reportlab n'est pas installé
+    """
+    if colors is None:
+        raise ReportUnavailableError("Module PDF non disponible. Installez: pip install reportlab")
+
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, **PAGE_TEMPLATE).build(build_story(record, simulated_at or datetime.now()))
+    return buffer.getvalue()
+
+
+def render_dossier(records: List[Dict[str, Any]], reports: List[bytes], generated_at: datetime) -> bytes:
+    """
+    Dossier de plusieurs simulations: page de synthèse puis le rapport de
+    chacune (un signet par simulation).
+
+    Args:
+        records: Simulations, dans l'ordre du dossier
+        reports: Rapport PDF déjà rendu de chaque simulation (même ordre)
+        generated_at: Date affichée sur la page de synthèse
+
+    Raises:
+        ReportUnavailableError: Si reportlab ou pypdf n'est pas installé
+    """
+    if colors is None or PdfWriter is None:
+        raise ReportUnavailableError("Dossier PDF non disponible. Installez: pip install reportlab pypdf")
+
+    summary = io.BytesIO()
+    SimpleDocTemplate(summary, **PAGE_TEMPLATE).build([
+        paragraph("Dossier de simulations CEE", "title"),
+        paragraph(f"Généré le {generated_at.strftime('%d/%m/%Y à %H:%M')}", "subtitle"),
+        Spacer(1, 10),
+        heading("Synthèse"),
+        summary_table(records),
+    ])
+
+    writer = PdfWriter()
+    writer.append(io.BytesIO(summary.getvalue()), outline_item="Synthèse")
+    for record, report in zip(records, reports):
+        writer.append(io.BytesIO(report), outline_item=record.get("name") or "Simulation")
+
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
@@ -0,0 +1,90 @@
+"""
+Rendu des rapports PDF hors de la boucle d'événements.
+
+La mise en page reportlab est du calcul Python pur (elle garde le GIL): les
+rapports sont rendus dans un pool de processus, démarré au premier rendu.
+Les processus sont lancés en "spawn" (pas de fork d'un serveur déjà multi-
+thread) et importent le module de rendu une fois à leur démarrage.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from .pdf_report import render_simulation_report
+
+
+# Nombre de processus de rendu (0 = rendu dans un thread du processus courant)
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+
+
+class PdfWorkerPool:
+    """
+    Pool de processus de rendu des rapports.
+
+    Args:
+        workers: Nombre de processus (0 = thread du processus courant)
+    """
+
+    def __init__(self, workers: int = PDF_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                print(f"✅ Pool de rendu PDF démarré ({self.workers} processus)")
+            return self._executor
+
+    def _reset(self, executor: ProcessPoolExecutor):
+        """Abandonne un pool cassé (processus tué): le prochain rendu en recrée un."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Exécute fn(*args) dans le pool (fonction de module et arguments
+        sérialisables par pickle).
+        """
+        if self.workers <= 0:
+            return await asyncio.to_thread(fn, *args)
+
+        executor = self._get_executor()
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            print("⚠️ Pool de rendu PDF interrompu, redémarrage au prochain rendu")
+            self._reset(executor)
+            raise
+
+    async def render(self, record: Dict[str, Any], simulated_at: Optional[datetime] = None) -> bytes:
+        """
+        Rapport PDF d'une simulation (voir render_simulation_report).
+
+        Raises:
+            ReportUnavailableError: Si reportlab n'est pas installé
+        """
+        return await self.run(render_simulation_report, record, simulated_at)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Instance singleton
+pdf_workers = PdfWorkerPool()
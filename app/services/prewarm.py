@@ -0,0 +1,145 @@
+"""
+Préchargement des fiches au démarrage du backend.
+Remplit le cache des configurations (et des fonctions compilées) en
+arrière-plan pour que le premier utilisateur après un déploiement ne
+paie pas les téléchargements à froid. L'état sert au health check /ping.
+"""
+
+import os
+import time
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from .supabase_client import list_bucket_contents, BUCKET_NAME
+from .config_loader import config_loader
+from .catalog_snapshot import catalog_snapshots
+
+
+# Fiches à précharger: "all" (toutes), "" (aucune) ou liste "BAR-TH-104,BAR-EN-101"
+FICHE_PREWARM = os.getenv("FICHE_PREWARM", "all")
+# Délai maximal avant de déclarer le backend prêt (secondes)
+FICHE_PREWARM_TIMEOUT = float(os.getenv("FICHE_PREWARM_TIMEOUT", "25"))
+# Nombre de fiches chargées simultanément
+FICHE_PREWARM_CONCURRENCY = int(os.getenv("FICHE_PREWARM_CONCURRENCY", "8"))
+
+
+class PrewarmStatus:
+    """État du préchargement, exposé par le health check."""
+
+    def __init__(self):
+        self.state = "pending"  # pending, running, ready, timeout
+        self.total = 0
+        self.loaded = 0
+        self.failed: List[str] = []
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def is_ready(self) -> bool:
+        """Prêt lorsque le préchargement est terminé ou a expiré."""
+        return self.state in ("ready", "timeout")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Représentation JSON de l'état."""
+        duration = None
+        if self.started_at is not None:
+            duration = round((self.finished_at or time.monotonic()) - self.started_at, 2)
+        return {
+            "status": self.state,
+            "total": self.total,
+            "loaded": self.loaded,
+            "failed": self.failed,
+            "duration": duration,
+        }
+
+
+# Instance singleton
+prewarm_status = PrewarmStatus()
+
+
+def list_catalog_fiche_codes() -> List[str]:
+    """
+    Retourne les codes des fiches publiées dans le bucket
+    et référencées dans FICHE_NAMES_MAPPING.
+    """
+    from ..data.variables import FICHE_NAMES_MAPPING
+
+    contents = list_bucket_contents(BUCKET_NAME, "", limit=1000)
+    codes = [
+        item.get("name", "")
+        for item in contents
+        if item.get("name", "") in FICHE_NAMES_MAPPING
+    ]
+    return sorted(codes)
+
+
+def _select_fiche_codes(available: List[str]) -> List[str]:
+    """Applique la sélection FICHE_PREWARM aux fiches disponibles."""
+    selection = FICHE_PREWARM.strip()
+    if not selection:
+        return []
+    if selection.lower() == "all":
+        return available
+    requested = [code.strip() for code in selection.split(",") if code.strip()]
+    return [code for code in requested if code in available]
+
+
+async def _prewarm_fiche(code: str, semaphore: asyncio.Semaphore):
+    """Charge une fiche dans le cache et compile sa fonction de calcul."""
+    from .function_loader import FunctionLoader
+
+    async with semaphore:
+        config = await config_loader.load_fiche_config_async(code)
+        if config is None:
+            prewarm_status.failed.append(code)
+            return
+        try:
+            FunctionLoader(config.string_function, fiche_code=code)
+        except Exception as e:
+            print(f"⚠️ Préchargement: fonction invalide pour {code}: {e}")
+        prewarm_status.loaded += 1
+
+
+async def _prewarm():
+    """Liste le catalogue puis précharge les fiches sélectionnées."""
+    # Le snapshot du catalogue, s'il existe, évite le listing du bucket
+    snapshot = await asyncio.to_thread(catalog_snapshots.boot)
+    if snapshot is not None:
+        available = snapshot.fiche_codes()
+    else:
+        available = await asyncio.to_thread(list_catalog_fiche_codes)
+    codes = _select_fiche_codes(available)
+    prewarm_status.total = len(codes)
+    print(f"🔥 Préchargement de {len(codes)} fiche(s) sur {len(available)}")
+
+    semaphore = asyncio.Semaphore(max(1, FICHE_PREWARM_CONCURRENCY))
+    await asyncio.gather(
+        *(_prewarm_fiche(code, semaphore) for code in codes),
+        return_exceptions=True,
+    )
+
+
+async def prewarm_fiche_catalog():
+    """
+    Tâche de démarrage (lifespan) préchargeant le catalogue des fiches.
+
+    Le backend est déclaré prêt dès la fin du préchargement ou à
+    l'expiration de FICHE_PREWARM_TIMEOUT; dans ce dernier cas le
+    chargement se poursuit en arrière-plan.
+    """
+    prewarm_status.state = "running"
+    prewarm_status.started_at = time.monotonic()
+
+    task = asyncio.create_task(_prewarm())
+    done, _ = await asyncio.wait({task}, timeout=FICHE_PREWARM_TIMEOUT)
+
+    prewarm_status.finished_at = time.monotonic()
+    if task in done:
+        prewarm_status.state = "ready"
+        if task.exception():
+            print(f"⚠️ Préchargement interrompu: {task.exception()}")
+        print(f"✅ Préchargement terminé: {prewarm_status.to_dict()}")
+    else:
+        prewarm_status.state = "timeout"
+        print(f"⚠️ Préchargement non terminé après {FICHE_PREWARM_TIMEOUT}s, poursuite en arrière-plan")
+        await task
@@ -0,0 +1,78 @@
+"""
+Rapports groupés de plusieurs simulations enregistrées.
+
+Les rapports individuels sont rendus en parallèle par le pool de processus
+(pdf_cache.ensure_report, un par simulation) puis livrés:
+    - en dossier PDF: page de synthèse + rapports fusionnés (pypdf, optionnel),
+      rendu lui aussi dans le pool puis servi par /export/reports/{empreinte}.pdf;
+    - en archive ZIP diffusée par /export/reports/dossier.zip, qui relit les
+      rapports en cache au fil de l'envoi.
+"""
+
+import asyncio
+import os
+import zipfile
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List
+
+from .download_tokens import download_tokens
+from .pdf_cache import pdf_cache, report_key
+from .pdf_report import PdfWriter, colors, render_dossier, report_filename
+from .pdf_worker import pdf_workers
+from .simulation_export import ChunkSink
+from .simulation_repository import simulation_repository
+
+
+# Nombre maximum de simulations dans un rapport groupé
+BULK_REPORT_MAX = int(os.getenv("BULK_REPORT_MAX", "100"))
+
+
+def dossier_available() -> bool:
+    """Le dossier PDF fusionné est disponible (reportlab et pypdf installés)."""
+    return colors is not None and PdfWriter is not None
+
+
+def bundle_entry_name(index: int, record: Dict[str, Any]) -> str:
+    """Nom d'un rapport dans l'archive (préfixé par sa position: noms uniques)."""
+    return f"{index:03d}_{report_filename(record)}"
+
+
+def fetch_records(user_id: str, simulation_ids: List[str]) -> List[Dict[str, Any]]:
+    """Lignes complètes des simulations sélectionnées (appel bloquant)."""
+    return simulation_repository.fetch_simulations(user_id, simulation_ids[:BULK_REPORT_MAX])
+
+
+async def build_dossier(records: List[Dict[str, Any]]) -> str:
+    """
+    Dossier PDF des simulations (rapports déjà en cache ou rendus au besoin).
+
+    Returns:
+        Empreinte du dossier dans le cache PDF (hors bucket)
+
+    Raises:
+        ReportUnavailableError: Si reportlab ou pypdf n'est pas installé
+    """
+    reports = await asyncio.gather(*(pdf_cache.read_report(record) for record in records))
+    generated_at = datetime.now()
+    key = report_key({"dossier": [record.get("id") for record in records], "generated_at": generated_at.isoformat()})
+    data = await pdf_workers.run(render_dossier, records, list(reports), generated_at)
+    await asyncio.to_thread(pdf_cache.put, key, data, False)
+    return key
+
+
+def bundle_download_url(user_id: str, simulation_ids: List[str]) -> str:
+    """URL de l'archive ZIP des rapports (jeton signé portant la sélection)."""
+    token = download_tokens.create("bundle", user_id, ids=simulation_ids[:BULK_REPORT_MAX])
+    return f"/export/reports/dossier.zip?token={token}"
+
+
+async def iter_bundle(user_id: str, simulation_ids: List[str]) -> AsyncIterator[bytes]:
+    """Archive ZIP des rapports, envoyée rapport par rapport."""
+    records = await asyncio.to_thread(fetch_records, user_id, simulation_ids)
+    sink = ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for index, record in enumerate(records, start=1):
+            archive.writestr(bundle_entry_name(index, record), await pdf_cache.read_report(record))
+            yield sink.drain()
+    yield sink.drain()
+    print(f"📦 Archive des rapports: {len(records)} simulation(s)")
@@ -0,0 +1,233 @@
+"""
+Export de l'historique des simulations en CSV ou XLSX, produit en flux.
+
+Les lignes sont lues par lots (keyset, voir SimulationRepository.iter_simulations)
+et écrites au fur et à mesure: la mémoire utilisée ne dépend pas de la taille
+de l'historique. Les paramètres de chaque simulation (input_data) deviennent
+des colonnes, dont la liste est connue avant la première ligne
+(SimulationRepository.fetch_input_keys).
+
+Le XLSX est écrit sans dépendance: archive zip diffusée (zipfile accepte une
+sortie non positionnable) contenant une feuille en chaînes « inline ».
+"""
+
+import csv
+import io
+import json
+import os
+import re
+import zipfile
+from typing import Any, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from .simulation_repository import SimulationFilters, decode_input_data, simulation_repository
+
+
+# Lignes lues par requête Supabase (sous le plafond max-rows de PostgREST, 1000)
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+# Lignes écrites entre deux envois au client
+EXPORT_CHUNK_ROWS = 500
+
+# Colonnes fixes (colonne de la table, en-tête)
+EXPORT_COLUMNS: List[Tuple[str, str]] = [
+    ("id", "ID"),
+    ("name", "Nom"),
+    ("created_at", "Créée le"),
+    ("date_signature", "Date de signature"),
+    ("department", "Département"),
+    ("sector", "Secteur"),
+    ("typology", "Typologie"),
+    ("fiche_code", "Fiche"),
+    ("fiche_description", "Description"),
+    ("beneficiary_type", "Bénéficiaire"),
+    ("result_cumacs", "Résultat (kWh cumac)"),
+    ("result_euros", "Résultat (€)"),
+]
+
+# Formats disponibles et type MIME
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+class SimulationExport:
+    """
+    Lignes d'un export: colonnes fixes, propriétaire (export de tous les
+    utilisateurs) puis un paramètre par colonne.
+
+    Args:
+        user_id: Propriétaire des simulations (None = tous les utilisateurs)
+        filters: Filtres de l'historique
+    """
+
+    def __init__(self, user_id: Optional[str], filters: Optional[SimulationFilters] = None):
+        self.user_id = user_id
+        self.filters = filters or SimulationFilters()
+        self.input_keys = simulation_repository.fetch_input_keys(user_id)
+        self.columns = list(EXPORT_COLUMNS)
+        if user_id is None:
+            self.columns.insert(1, ("user_id", "Utilisateur"))
+
+    def header(self) -> List[str]:
+        return [label for _, label in self.columns] + self.input_keys
+
+    def rows(self) -> Iterator[List[Any]]:
+        """Valeurs de chaque simulation, dans l'ordre de header()."""
+        for row in simulation_repository.iter_simulations(
+            self.user_id, self.filters, batch_size=EXPORT_BATCH_SIZE, projection="export",
+        ):
+            params = decode_input_data(row.get("input_data"))
+            yield [row.get(column) for column, _ in self.columns] + [
+                _param_value(params.get(key)) for key in self.input_keys
+            ]
+
+
+def _param_value(value: Any) -> Any:
+    """Valeur d'un paramètre dans une cellule (listes et objets en JSON)."""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def iter_csv(export: SimulationExport) -> Iterator[bytes]:
+    """CSV (séparateur ;, UTF-8 avec BOM pour Excel) par blocs de lignes."""
+    buffer = io.StringIO()
+    buffer.write("\ufeff")
+    writer = csv.writer(buffer, delimiter=";")
+    writer.writerow(export.header())
+
+    count = 0
+    for values in export.rows():
+        writer.writerow(["" if value is None else value for value in values])
+        count += 1
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+    print(f"📦 Export CSV: {count} simulation(s)")
+
+
+# ==================== XLSX ====================
+
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Simulations" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    # Style 1: en-tête en gras
+    "xl/styles.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+        '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    ),
+}
+
+# Caractères interdits en XML 1.0
+_INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+
+class ChunkSink:
+    """Sortie non positionnable de zipfile: accumule les octets à envoyer."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _xlsx_cell(value: Any, style: str = "") -> str:
+    if value is None or value == "":
+        return "<c/>"
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f"<c{style}><v>{value!r}</v></c>"
+    text = escape(_INVALID_XML.sub("", str(value)))
+    return f'<c t="inlineStr"{style}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values: List[Any], style: str = "") -> str:
+    return "<row>" + "".join(_xlsx_cell(value, style) for value in values) + "</row>"
+
+
+def iter_xlsx(export: SimulationExport) -> Iterator[bytes]:
+    """Classeur XLSX d'une feuille, envoyé par blocs de lignes."""
+    sink = ChunkSink()
+    count = 0
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, content)
+
+        with archive.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b'<sheetData>'
+            )
+            sheet.write(_xlsx_row(export.header(), ' s="1"').encode("utf-8"))
+
+            rows: List[str] = []
+            for values in export.rows():
+                rows.append(_xlsx_row(values))
+                count += 1
+                if len(rows) >= EXPORT_CHUNK_ROWS:
+                    sheet.write("".join(rows).encode("utf-8"))
+                    rows.clear()
+                    yield sink.drain()
+            sheet.write("".join(rows).encode("utf-8"))
+            sheet.write(b"</sheetData></worksheet>")
+
+    yield sink.drain()
+    print(f"📦 Export XLSX: {count} simulation(s)")
+
+
+def stream_export(export: SimulationExport, fmt: str) -> Iterator[bytes]:
+    """Flux d'octets de l'export dans le format demandé (csv ou xlsx)."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format d'export inconnu: {fmt}")
+    return iter_csv(export) if fmt == "csv" else iter_xlsx(export)
@@ -0,0 +1,239 @@
+"""
+Index en mémoire de l'historique complet d'un utilisateur.
+
+Construit une seule fois par historique chargé (projection "list"):
+  - dates de création converties en timestamps (epoch);
+  - texte de recherche normalisé (minuscules, sans accents) par ligne et
+    index inversé de trigrammes, construit à la première recherche;
+  - permutation triée par colonne, calculée au premier tri sur cette colonne.
+Filtrer, trier et paginer deviennent des opérations sur ces tableaux:
+le résultat d'un filtre est mémorisé, le passage d'une page à l'autre
+n'est plus qu'un découpage de liste.
+"""
+
+import threading
+from array import array
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from .simulation_repository import (
+    SEARCH_COLUMNS,
+    SORT_COLUMNS,
+    SimulationFilters,
+    fold_text,
+    search_terms,
+)
+
+
+# Combinaisons (filtres, tri) mémorisées par index
+_MAX_CACHED_VIEWS = 16
+
+
+def _epoch(value: Any) -> float:
+    """Timestamp d'une date ISO (UTC si sans fuseau), 0 si absente ou invalide."""
+    if not value:
+        return 0.0
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return 0.0
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _day_epoch(value: str, next_day: bool = False) -> Optional[float]:
+    """Timestamp de minuit (UTC) d'une date AAAA-MM-JJ, ou du lendemain."""
+    try:
+        day = date.fromisoformat(value[:10])
+    except ValueError:
+        return None
+    if next_day:
+        day += timedelta(days=1)
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp()
+
+
+def _id_key(value: Any) -> Tuple[int, Any]:
+    """Clé de départage comparable quel que soit le type de l'id."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value)
+    return (1, str(value))
+
+
+def normalize_text(value: Any) -> str:
+    """Normalisation du texte (tri et recherche): minuscules, sans accents."""
+    return fold_text(value)
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SimulationIndex:
+    """
+    Index d'un historique de simulations.
+
+    Args:
+        rows: Lignes de l'historique complet (projection "list")
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.rows = rows
+        self.created_at = array("d", (_epoch(row.get("created_at")) for row in rows))
+        self.search_text = [
+            " ".join(normalize_text(row.get(column)) for column in SEARCH_COLUMNS)
+            for row in rows
+        ]
+        self.sectors = [row.get("sector") for row in rows]
+        self.typologies = [row.get("typology") for row in rows]
+        self._trigrams: Optional[Dict[str, array]] = None
+        self._orders: Dict[str, List[int]] = {}
+        self._views: Dict[Tuple, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _trigram_index(self) -> Dict[str, array]:
+        """Index inversé {trigramme: positions croissantes} (construit une fois)."""
+        if self._trigrams is None:
+            index: Dict[str, array] = {}
+            for position, text in enumerate(self.search_text):
+                for trigram in _trigrams(text):
+                    postings = index.get(trigram)
+                    if postings is None:
+                        postings = index[trigram] = array("I")
+                    postings.append(position)
+            self._trigrams = index
+        return self._trigrams
+
+    def search(self, search: str, candidates: Optional[List[int]] = None) -> List[int]:
+        """
+        Positions dont le texte contient chacun des mots recherchés.
+        Les mots de 3 caractères ou plus passent par l'index de trigrammes
+        (intersection des listes les plus courtes), puis sont vérifiés.
+
+        Args:
+            search: Texte saisi
+            candidates: Positions déjà retenues par les autres filtres
+        """
+        terms = search_terms(search)
+        if not terms:
+            return list(range(len(self.rows))) if candidates is None else candidates
+
+        index = self._trigram_index()
+        selected = None
+        for term in terms:
+            if len(term) < 3:
+                continue
+            postings = sorted((index.get(t, ()) for t in _trigrams(term)), key=len)
+            found = set(postings[0]) if postings else set()
+            for other in postings[1:3]:
+                if not found:
+                    break
+                found.intersection_update(other)
+            selected = found if selected is None else selected & found
+            if not selected:
+                return []
+
+        if candidates is not None:
+            positions = candidates if selected is None else [i for i in candidates if i in selected]
+        else:
+            positions = range(len(self.rows)) if selected is None else sorted(selected)
+
+        search_text = self.search_text
+        return [i for i in positions if all(term in search_text[i] for term in terms)]
+
+    def _sort_keys(self, column: str) -> List[Tuple]:
+        """Clés de tri d'une colonne de la table (départage par id)."""
+        ids = [_id_key(row.get("id")) for row in self.rows]
+        if column == "created_at":
+            values = self.created_at
+        elif column in ("result_euros", "result_cumacs"):
+            values = [float(row.get(column) or 0) for row in self.rows]
+        else:
+            values = [normalize_text(row.get(column)) for row in self.rows]
+        return list(zip(values, ids))
+
+    def order(self, sort_column: str) -> List[int]:
+        """Permutation croissante des lignes pour une colonne (calculée une fois)."""
+        column = SORT_COLUMNS.get(sort_column, "created_at")
+        order = self._orders.get(column)
+        if order is None:
+            keys = self._sort_keys(column)
+            order = sorted(range(len(self.rows)), key=keys.__getitem__)
+            with self._lock:
+                self._orders[column] = order
+        return order
+
+    def matches(self, filters: SimulationFilters) -> Optional[bytearray]:
+        """Masque des lignes correspondant aux filtres (None = toutes)."""
+        candidates = None  # Positions retenues, réduites filtre après filtre
+
+        def narrow(predicate):
+            nonlocal candidates
+            positions = range(len(self.rows)) if candidates is None else candidates
+            candidates = [i for i in positions if predicate(i)]
+
+        created_at = self.created_at
+        if filters.date_start:
+            start = _day_epoch(filters.date_start)
+            if start is not None:
+                narrow(lambda i: created_at[i] >= start)
+        if filters.date_end:
+            end = _day_epoch(filters.date_end, next_day=True)
+            if end is not None:
+                narrow(lambda i: created_at[i] < end)
+        if filters.sector:
+            narrow(lambda i: self.sectors[i] == filters.sector)
+        if filters.typology:
+            narrow(lambda i: self.typologies[i] == filters.typology)
+        if search_terms(filters.search):
+            candidates = self.search(filters.search, candidates)
+
+        if candidates is None:
+            return None
+        mask = bytearray(len(self.rows))
+        for i in candidates:
+            mask[i] = 1
+        return mask
+
+    def view(self, filters: SimulationFilters, sort_column: str, descending: bool) -> List[int]:
+        """Positions des lignes filtrées, dans l'ordre demandé (mémorisées)."""
+        key = (
+            filters.date_start, filters.date_end, filters.sector, filters.typology,
+            filters.search.strip(), SORT_COLUMNS.get(sort_column, "created_at"), descending,
+        )
+        with self._lock:
+            view = self._views.get(key)
+        if view is not None:
+            return view
+
+        order = self.order(sort_column)
+        if descending:
+            order = order[::-1]
+        mask = self.matches(filters)
+        view = order if mask is None else [i for i in order if mask[i]]
+
+        with self._lock:
+            if len(self._views) >= _MAX_CACHED_VIEWS:
+                self._views.pop(next(iter(self._views)))
+            self._views[key] = view
+        return view
+
+    def page(
+        self,
+        filters: SimulationFilters,
+        sort_column: str,
+        descending: bool,
+        offset: int,
+        page_size: int,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Page de l'historique.
+
+        Returns:
+            Tuple (lignes de la page, nombre total de lignes filtrées)
+        """
+        view = self.view(filters, sort_column, descending)
+        return [self.rows[i] for i in view[offset:offset + page_size]], len(view)
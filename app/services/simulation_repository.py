@@ -0,0 +1,574 @@
+"""
+Accès paginé à l'historique des simulations (table `simulations`).
+
+Filtres, tri et pagination sont exécutés par Supabase: chaque interaction
+ne récupère qu'une page. La pagination se fait par clé (keyset): la page
+suivante est demandée « après » la dernière ligne affichée (colonne de tri
++ id), ce qui reste rapide quel que soit le numéro de page. Un accès direct
+à une page dont la clé n'est pas connue retombe sur un offset.
+"""
+
+import json
+import os
+import unicodedata
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+
+# Mode de comptage PostgREST: exact, planned (statistiques) ou estimated
+SIMULATIONS_COUNT_MODE = os.getenv("SIMULATIONS_COUNT_MODE", "exact")
+
+# Colonnes triables de l'interface -> colonnes de la table
+SORT_COLUMNS = {
+    "created_at": "created_at",
+    "signature_date": "date_signature",
+    "name": "name",
+    "sector": "sector",
+    "typology": "typology",
+    "result_euros": "result_euros",
+    "result_cumacs": "result_cumacs",
+}
+
+# Projections: colonnes récupérées selon l'usage. input_data (JSON des
+# paramètres, potentiellement volumineux) n'est lu qu'avec "detail".
+COLUMN_SETS = {
+    # Listes et tableaux
+    "list": (
+        "id,name,created_at,date_signature,department,sector,typology,"
+        "fiche_code,fiche_description,beneficiary_type,result_cumacs,result_euros"
+    ),
+    # Indicateurs et listes de filtres
+    "kpi": "created_at,result_euros,result_cumacs,sector,typology,fiche_code",
+    # Ligne complète (PDF, vue détaillée)
+    "detail": "*",
+    # Exports (colonnes de "list" + propriétaire et paramètres)
+    "export": (
+        "id,user_id,name,created_at,date_signature,department,sector,typology,"
+        "fiche_code,fiche_description,beneficiary_type,result_cumacs,result_euros,input_data"
+    ),
+    # Noms des paramètres (repli de simulation_input_keys)
+    "input": "id,created_at,input_data",
+}
+
+
+def columns_for(projection: str) -> str:
+    """Colonnes d'une projection nommée (list, kpi, detail, export ou input)."""
+    if projection not in COLUMN_SETS:
+        raise ValueError(f"Projection inconnue: {projection}")
+    return COLUMN_SETS[projection]
+
+
+# Colonnes parcourues par la recherche textuelle
+SEARCH_COLUMNS = ["name", "fiche_code", "fiche_description", "department"]
+# "indexed": colonnes search_text / search_tsv (migration simulation_search),
+# "ilike": recherche directe sur SEARCH_COLUMNS (base sans la migration)
+SIMULATIONS_SEARCH_MODE = os.getenv("SIMULATIONS_SEARCH_MODE", "indexed")
+# Nombre maximum de mots pris en compte dans une recherche
+MAX_SEARCH_TERMS = 5
+
+# Ligatures non décomposées par NFKD (unaccent les remplace aussi)
+_LIGATURES = str.maketrans({"œ": "oe", "Œ": "oe", "æ": "ae", "Æ": "ae"})
+
+
+def fold_text(value: Any) -> str:
+    """Texte sans accents ni majuscules (équivalent Python de unaccent + lower)."""
+    text = unicodedata.normalize("NFKD", str(value or "").translate(_LIGATURES))
+    return "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def search_terms(search: str) -> List[str]:
+    """Mots normalisés d'une recherche (caractères de motif retirés)."""
+    words = fold_text(search).replace("*", " ").replace("%", " ").split()
+    # Mots d'une lettre ("à") ignorés s'il y a d'autres mots
+    return ([word for word in words if len(word) > 1] or words)[:MAX_SEARCH_TERMS]
+
+
+@dataclass
+class SimulationFilters:
+    """Filtres de l'historique (valeurs vides = pas de filtre)."""
+    date_start: str = ""
+    date_end: str = ""
+    sector: str = ""
+    typology: str = ""
+    search: str = ""
+
+
+@dataclass
+class SimulationPage:
+    """Page de résultats."""
+    rows: List[Dict[str, Any]]
+    has_more: bool
+    total: Optional[int] = None               # None si non compté
+    last_key: Optional[List[Any]] = None      # Clé (valeur de tri, id) de la dernière ligne
+    error: str = ""
+
+
+@dataclass
+class SimulationKpis:
+    """Indicateurs de l'historique d'un utilisateur (fonction SQL simulation_kpis)."""
+    total_count: int = 0
+    total_euros: float = 0.0
+    total_cumacs: float = 0.0
+    average_euros: float = 0.0
+    this_month_count: int = 0
+    last_created_at: str = ""
+    # Ventilations: [{key, count, euros, cumacs}]
+    by_sector: List[Dict[str, Any]] = field(default_factory=list)
+    by_typology: List[Dict[str, Any]] = field(default_factory=list)
+    by_month: List[Dict[str, Any]] = field(default_factory=list)
+    by_fiche: List[Dict[str, Any]] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SimulationKpis":
+        return cls(
+            total_count=int(data.get("total_count") or 0),
+            total_euros=float(data.get("total_euros") or 0),
+            total_cumacs=float(data.get("total_cumacs") or 0),
+            average_euros=float(data.get("average_euros") or 0),
+            this_month_count=int(data.get("this_month_count") or 0),
+            last_created_at=data.get("last_created_at") or "",
+            by_sector=data.get("by_sector") or [],
+            by_typology=data.get("by_typology") or [],
+            by_month=data.get("by_month") or [],
+            by_fiche=data.get("by_fiche") or [],
+        )
+
+
+def aggregate_kpis(rows: List[Dict[str, Any]]) -> SimulationKpis:
+    """
+    Calcule les indicateurs en Python à partir de la projection "kpi"
+    (repli si la fonction SQL simulation_kpis n'est pas déployée).
+    """
+    first_of_month = datetime.now().strftime("%Y-%m-01")
+    breakdowns = {"sector": {}, "typology": {}, "month": {}, "fiche": {}}
+    kpis = SimulationKpis()
+
+    for row in rows:
+        created_at = row.get("created_at") or ""
+        euros = float(row.get("result_euros") or 0)
+        cumacs = float(row.get("result_cumacs") or 0)
+        kpis.total_count += 1
+        kpis.total_euros += euros
+        kpis.total_cumacs += cumacs
+        # Les dates ISO se comparent comme des chaînes
+        if created_at[:10] >= first_of_month:
+            kpis.this_month_count += 1
+        kpis.last_created_at = max(kpis.last_created_at, created_at)
+
+        keys = {
+            "sector": row.get("sector") or "",
+            "typology": row.get("typology") or "",
+            "month": created_at[:7],
+            "fiche": row.get("fiche_code") or "",
+        }
+        for name, key in keys.items():
+            bucket = breakdowns[name].setdefault(key, {"key": key, "count": 0, "euros": 0.0, "cumacs": 0.0})
+            bucket["count"] += 1
+            bucket["euros"] += euros
+            bucket["cumacs"] += cumacs
+
+    kpis.average_euros = kpis.total_euros / kpis.total_count if kpis.total_count else 0.0
+    kpis.by_sector = [breakdowns["sector"][k] for k in sorted(breakdowns["sector"])]
+    kpis.by_typology = [breakdowns["typology"][k] for k in sorted(breakdowns["typology"])]
+    kpis.by_month = [breakdowns["month"][k] for k in sorted(breakdowns["month"])]
+    kpis.by_fiche = [breakdowns["fiche"][k] for k in sorted(breakdowns["fiche"])]
+    return kpis
+
+
+def decode_input_data(value: Any) -> Dict[str, Any]:
+    """Paramètres d'une simulation (input_data enregistré en JSON texte ou objet)."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value) if value else {}
+        except ValueError:
+            return {}
+    return value if isinstance(value, dict) else {}
+
+
+def _quote(value: Any) -> str:
+    """Valeur entre guillemets pour les filtres or=(...) de PostgREST."""
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def _next_day(value: str) -> Optional[str]:
+    """Lendemain d'une date AAAA-MM-JJ (borne de fin incluse), None si non parsable."""
+    try:
+        return (date.fromisoformat(value[:10]) + timedelta(days=1)).isoformat()
+    except ValueError:
+        return None
+
+
+class SimulationRepository:
+    """Requêtes paginées sur la table simulations."""
+
+    TABLE = "simulations"
+
+    def _get_client(self):
+        from .supabase_service import get_service_client
+        return get_service_client()
+
+    def _apply_filters(
+        self,
+        query,
+        user_id: str,
+        filters: SimulationFilters,
+        conditions: Optional[List[str]] = None,
+    ):
+        """
+        Ajoute les filtres à une requête PostgREST.
+
+        Args:
+            user_id: Propriétaire des simulations (None = tous, exports
+                administrateur uniquement)
+            conditions: Conditions logiques supplémentaires (ex: keyset),
+                combinées en un seul paramètre avec la recherche textuelle
+        """
+        if user_id is not None:
+            query = query.eq("user_id", user_id)
+
+        if filters.date_start:
+            query = query.gte("created_at", filters.date_start)
+        if filters.date_end:
+            end = _next_day(filters.date_end)
+            query = query.lt("created_at", end) if end else query.lte("created_at", filters.date_end)
+
+        if filters.sector:
+            query = query.eq("sector", filters.sector)
+        if filters.typology:
+            query = query.eq("typology", filters.typology)
+
+        conditions = self._search_conditions(filters.search) + list(conditions or [])
+
+        # Un seul paramètre logique: PostgREST n'en combine pas plusieurs
+        if len(conditions) == 1:
+            query = query.or_(conditions[0][3:-1])
+        elif conditions:
+            query = query.or_(f"and({','.join(conditions)})")
+        return query
+
+    @staticmethod
+    def _search_conditions(search: str) -> List[str]:
+        """
+        Conditions de recherche: chaque mot doit apparaître (sous-chaîne sans
+        accents via l'index trigramme, ou forme fléchie via le plein texte).
+        """
+        if SIMULATIONS_SEARCH_MODE != "indexed":
+            search = search.strip().replace("*", "").replace("%", "")
+            if not search:
+                return []
+            pattern = _quote(f"*{search}*")
+            return ["or(" + ",".join(f"{column}.ilike.{pattern}" for column in SEARCH_COLUMNS) + ")"]
+
+        return [
+            f"or(search_text.ilike.{_quote(f'*{term}*')},search_tsv.plfts(french).{_quote(term)})"
+            for term in search_terms(search)
+        ]
+
+    @staticmethod
+    def _after(column: str, descending: bool, key: List[Any]) -> str:
+        """
+        Condition keyset: lignes situées après la clé (valeur de tri, id).
+        NULL est classé comme la plus petite valeur, comme dans SimulationIndex
+        (NULLS FIRST en ordre croissant, NULLS LAST en décroissant: voir fetch_page).
+        """
+        value, row_id = key
+        op = "lt" if descending else "gt"
+        tie = f"id.{op}.{_quote(row_id)}"
+        if value is None:
+            if descending:
+                return f"or(and({column}.is.null,{tie}))"
+            return f"or({column}.not.is.null,and({column}.is.null,{tie}))"
+        after = f"{column}.{op}.{_quote(value)},and({column}.eq.{_quote(value)},{tie})"
+        return f"or({after},{column}.is.null)" if descending else f"or({after})"
+
+    def fetch_page(
+        self,
+        user_id: Optional[str],
+        filters: SimulationFilters,
+        sort_column: str = "created_at",
+        descending: bool = True,
+        page_size: int = 10,
+        after: Optional[List[Any]] = None,
+        offset: int = 0,
+        with_count: bool = False,
+        projection: str = "list",
+    ) -> SimulationPage:
+        """
+        Récupère une page de simulations.
+
+        Args:
+            user_id: Propriétaire des simulations
+            filters: Filtres à appliquer
+            sort_column: Colonne de tri (clé de SORT_COLUMNS)
+            descending: Tri décroissant
+            page_size: Nombre de lignes par page
+            after: Clé de la dernière ligne de la page précédente (keyset)
+            offset: Décalage utilisé si la clé n'est pas connue
+            with_count: Compte les lignes correspondant aux filtres
+            projection: Jeu de colonnes (COLUMN_SETS)
+
+        Returns:
+            SimulationPage
+        """
+        client = self._get_client()
+        if not client:
+            return SimulationPage(rows=[], has_more=False, error="Service indisponible")
+
+        column = SORT_COLUMNS.get(sort_column, "created_at")
+        count = SIMULATIONS_COUNT_MODE if with_count else None
+
+        try:
+            use_keyset = after is not None
+            conditions = [self._after(column, descending, after)] if use_keyset else []
+
+            query = client.table(self.TABLE).select(columns_for(projection), count=count)
+            query = self._apply_filters(query, user_id, filters, conditions)
+
+            # Place des NULL fixée explicitement: la condition keyset en dépend
+            query = query.order(column, desc=descending, nullsfirst=not descending)\
+                .order("id", desc=descending)
+            # Une ligne de plus pour savoir s'il existe une page suivante
+            if use_keyset:
+                query = query.limit(page_size + 1)
+            else:
+                query = query.range(offset, offset + page_size)
+
+            response = query.execute()
+        except Exception as e:
+            print(f"❌ Erreur chargement page de simulations: {e}")
+            return SimulationPage(rows=[], has_more=False, error=str(e))
+
+        rows = response.data or []
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        last_key = [rows[-1].get(column), rows[-1].get("id")] if rows else None
+
+        return SimulationPage(
+            rows=rows,
+            has_more=has_more,
+            total=getattr(response, "count", None) if with_count else None,
+            last_key=last_key,
+        )
+
+    def fetch_recent(self, user_id: str, limit: int = 50, projection: str = "list") -> List[Dict[str, Any]]:
+        """
+        Dernières simulations d'un utilisateur (plus récentes d'abord).
+
+        Args:
+            user_id: Propriétaire des simulations
+            limit: Nombre maximum de lignes (None = toutes, lues par lots
+                sous le plafond max-rows de PostgREST)
+            projection: Jeu de colonnes (COLUMN_SETS)
+
+        Returns:
+            Liste de dicts
+        """
+        client = self._get_client()
+        if not client:
+            return []
+        try:
+            if limit is None:
+                return list(self.iter_simulations(user_id, projection=projection))
+            return client.table(self.TABLE)\
+                .select(columns_for(projection))\
+                .eq("user_id", user_id)\
+                .order("created_at", desc=True)\
+                .order("id", desc=True)\
+                .limit(limit)\
+                .execute().data or []
+        except Exception as e:
+            print(f"❌ Erreur chargement des simulations: {e}")
+            return []
+
+    def fetch_summary(self, user_id: str) -> List[Dict[str, Any]]:
+        """
+        Projection "kpi" de toutes les simulations (KPIs et listes de filtres).
+
+        Returns:
+            Liste de dicts {created_at, result_euros, result_cumacs, sector, typology, fiche_code}
+        """
+        return self.fetch_recent(user_id, limit=None, projection="kpi")
+
+    def fetch_kpis(self, user_id: str) -> SimulationKpis:
+        """
+        Indicateurs de l'historique calculés par la base (une seule requête).
+
+        Args:
+            user_id: Propriétaire des simulations
+
+        Returns:
+            SimulationKpis (calcul local sur la projection "kpi" si la
+            fonction SQL est indisponible)
+        """
+        client = self._get_client()
+        if not client:
+            return SimulationKpis()
+        try:
+            response = client.rpc("simulation_kpis", {"p_user_id": user_id}).execute()
+            if isinstance(response.data, dict):
+                return SimulationKpis.from_dict(response.data)
+        except Exception as e:
+            print(f"⚠️ Fonction simulation_kpis indisponible, calcul local: {e}")
+        return aggregate_kpis(self.fetch_summary(user_id))
+
+    def fetch_simulation(self, user_id: str, simulation_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Ligne complète d'une simulation (y compris input_data), lue à la demande.
+
+        Args:
+            user_id: Propriétaire (vérifié dans la requête)
+            simulation_id: ID de la simulation
+
+        Returns:
+            Dict de la ligne ou None
+        """
+        client = self._get_client()
+        if not client:
+            return None
+        try:
+            response = client.table(self.TABLE)\
+                .select(columns_for("detail"))\
+                .eq("id", simulation_id)\
+                .eq("user_id", user_id)\
+                .limit(1)\
+                .execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"❌ Erreur chargement simulation {simulation_id}: {e}")
+            return None
+
+    def fetch_simulations(self, user_id: str, simulation_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Lignes complètes de plusieurs simulations en une requête (rapports groupés).
+
+        Args:
+            user_id: Propriétaire (vérifié dans la requête)
+            simulation_ids: IDs des simulations
+
+        Returns:
+            Lignes trouvées, dans l'ordre de simulation_ids
+        """
+        client = self._get_client()
+        if not client or not simulation_ids:
+            return []
+        try:
+            response = client.table(self.TABLE)\
+                .select(columns_for("detail"))\
+                .in_("id", simulation_ids)\
+                .eq("user_id", user_id)\
+                .execute()
+        except Exception as e:
+            print(f"❌ Erreur chargement de {len(simulation_ids)} simulation(s): {e}")
+            return []
+        rows = {row.get("id"): row for row in response.data or []}
+        return [rows[sim_id] for sim_id in simulation_ids if sim_id in rows]
+
+    def delete_simulation(self, user_id: str, simulation_id: str) -> bool:
+        """
+        Supprime une simulation (les agrégats user_simulation_stats sont
+        mis à jour par trigger).
+
+        Returns:
+            True si la suppression a réussi
+        """
+        client = self._get_client()
+        if not client:
+            return False
+        try:
+            client.table(self.TABLE)\
+                .delete()\
+                .eq("id", simulation_id)\
+                .eq("user_id", user_id)\
+                .execute()
+            return True
+        except Exception as e:
+            print(f"❌ Erreur suppression simulation {simulation_id}: {e}")
+            return False
+
+    def iter_simulations(
+        self,
+        user_id: Optional[str],
+        filters: Optional[SimulationFilters] = None,
+        batch_size: int = 500,
+        projection: str = "export",
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Parcourt tout l'historique par lots (keyset created_at desc, id desc):
+        un seul lot en mémoire à la fois, quelle que soit la taille.
+
+        PostgREST plafonne le nombre de lignes par réponse (max-rows, 1000 par
+        défaut sur Supabase): un lot tronqué ne signifie pas la fin de
+        l'historique. Le parcours continue jusqu'à un lot vide.
+
+        Args:
+            user_id: Propriétaire des simulations (None = tous les utilisateurs)
+            filters: Filtres de l'historique
+            batch_size: Lignes par requête (sous le plafond du serveur)
+            projection: Jeu de colonnes (COLUMN_SETS)
+
+        Raises:
+            RuntimeError: Si un lot ne peut pas être lu (export interrompu)
+        """
+        filters = filters or SimulationFilters()
+        after = None
+        while True:
+            page = self.fetch_page(
+                user_id, filters, "created_at", True, batch_size,
+                after=after, projection=projection,
+            )
+            if page.error:
+                raise RuntimeError(page.error)
+            if not page.rows:
+                return
+            yield from page.rows
+            after = page.last_key
+
+    def fetch_input_keys(self, user_id: Optional[str]) -> List[str]:
+        """
+        Noms de tous les paramètres (clés de input_data) de l'historique,
+        colonnes variables des exports.
+
+        Returns:
+            Liste triée (fonction SQL simulation_input_keys, ou parcours
+            de la projection "input" si elle n'est pas déployée)
+        """
+        client = self._get_client()
+        if not client:
+            return []
+        try:
+            response = client.rpc("simulation_input_keys", {"p_user_id": user_id}).execute()
+            if isinstance(response.data, list):
+                return sorted(str(key) for key in response.data)
+        except Exception as e:
+            print(f"⚠️ Fonction simulation_input_keys indisponible, parcours local: {e}")
+
+        keys = set()
+        for row in self.iter_simulations(user_id, projection="input"):
+            keys.update(decode_input_data(row.get("input_data")))
+        return sorted(keys)
+
+    def rebuild_stats(self, user_id: Optional[str] = None) -> Optional[int]:
+        """
+        Recalcule les agrégats user_simulation_stats depuis la table simulations.
+
+        Args:
+            user_id: Utilisateur à recalculer (tous si None)
+
+        Returns:
+            Nombre de compartiments écrits, None en cas d'erreur
+        """
+        client = self._get_client()
+        if not client:
+            return None
+        try:
+            response = client.rpc("rebuild_user_simulation_stats", {"p_user_id": user_id}).execute()
+            return int(response.data or 0)
+        except Exception as e:
+            print(f"❌ Erreur recalcul des agrégats: {e}")
+            return None
+
+
+# Instance singleton
+simulation_repository = SimulationRepository()
@@ -0,0 +1,330 @@
+"""
+Store in-process des simulations par utilisateur, partagé par DashboardState
+et UserState. KPIs, dernières simulations et pages de l'historique sont
+gardés côté serveur: passer de /dashboard à /profile ne relance pas de
+requête Supabase, et les états Reflex ne contiennent que ce qu'ils affichent.
+
+Invalidation versionnée: chaque enregistrement ou suppression incrémente la
+version de l'utilisateur. Un résultat obtenu pendant une invalidation (version
+changée entre le début et la fin de la requête) n'est pas mis en cache.
+Le TTL borne la durée de vie d'une entrée modifiée par une autre instance.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .simulation_repository import (
+    SimulationFilters,
+    SimulationKpis,
+    SimulationPage,
+    SORT_COLUMNS,
+    simulation_repository,
+)
+from .simulation_index import SimulationIndex
+
+
+# Durée de validité des données d'un utilisateur (secondes)
+SIMULATION_STORE_TTL = float(os.getenv("SIMULATION_STORE_TTL", "300"))
+# Nombre maximum d'utilisateurs gardés en mémoire (LRU)
+SIMULATION_STORE_MAX_USERS = int(os.getenv("SIMULATION_STORE_MAX_USERS", "1000"))
+# Pages d'historique gardées par utilisateur
+SIMULATION_STORE_MAX_PAGES = 32
+# Dernières simulations chargées pour le tableau de bord
+RECENT_LIMIT = 50
+# Historique entièrement indexé en mémoire jusqu'à cette taille (0 = jamais)
+SIMULATION_INDEX_MAX_ROWS = int(os.getenv("SIMULATION_INDEX_MAX_ROWS", "20000"))
+# Total des lignes indexées en mémoire, tous utilisateurs confondus (LRU)
+SIMULATION_STORE_MAX_INDEXED_ROWS = int(os.getenv("SIMULATION_STORE_MAX_INDEXED_ROWS", "200000"))
+# Constructions d'index simultanées (lecture de l'historique complet)
+SIMULATION_INDEX_BUILDERS = 2
+
+# Pool de threads des constructions d'index (hors des requêtes de l'utilisateur)
+_index_executor = ThreadPoolExecutor(
+    max_workers=SIMULATION_INDEX_BUILDERS,
+    thread_name_prefix="simulation-index",
+)
+
+
+@dataclass
+class UserEntry:
+    """Données en cache d'un utilisateur pour une version donnée."""
+    version: int
+    created_at: float
+    kpis: Optional[SimulationKpis] = None
+    recent: Optional[List[Dict[str, Any]]] = None
+    recent_complete: bool = False  # Historique entier (moins de lignes que demandé)
+    pages: "OrderedDict[Tuple, SimulationPage]" = field(default_factory=OrderedDict)
+    index: Optional[SimulationIndex] = None
+    index_failed: bool = False  # Pas d'index pour cette version (trop volumineux ou lecture incomplète)
+
+
+class SimulationStore:
+    """
+    Cache partagé des simulations par utilisateur.
+
+    Args:
+        ttl: Durée de validité d'une entrée (secondes)
+        max_users: Nombre maximum d'utilisateurs en cache
+        max_indexed_rows: Nombre maximum de lignes indexées, tous utilisateurs confondus
+    """
+
+    def __init__(
+        self,
+        ttl: float = SIMULATION_STORE_TTL,
+        max_users: int = SIMULATION_STORE_MAX_USERS,
+        max_indexed_rows: int = SIMULATION_STORE_MAX_INDEXED_ROWS,
+    ):
+        self.ttl = ttl
+        self.max_users = max_users
+        self.max_indexed_rows = max_indexed_rows
+        # Constructions d'index en cours {user_id: future}
+        self._builds: Dict[str, Future] = {}
+        self._entries: "OrderedDict[str, UserEntry]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ==================== Versions ====================
+
+    def version(self, user_id: str) -> int:
+        """Version courante des données d'un utilisateur."""
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def invalidate(self, user_id: str) -> int:
+        """
+        Invalide les données d'un utilisateur (après enregistrement ou suppression).
+
+        Returns:
+            Nouvelle version
+        """
+        with self._lock:
+            version = self._versions.get(user_id, 0) + 1
+            self._versions[user_id] = version
+            self._entries.pop(user_id, None)
+        print(f"🔄 Store simulations invalidé pour {user_id[:8]}... (v{version})")
+        return version
+
+    def _entry(self, user_id: str, version: int) -> Optional[UserEntry]:
+        """Entrée valide (bonne version, dans le TTL) ou None. Appelé sous verrou."""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if entry.version != version or time.monotonic() - entry.created_at >= self.ttl:
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return entry
+
+    def _store(self, user_id: str, version: int, update):
+        """Applique update(entry) si la version n'a pas changé pendant la requête."""
+        with self._lock:
+            if self._versions.get(user_id, 0) != version:
+                return
+            entry = self._entry(user_id, version)
+            if entry is None:
+                entry = self._entries[user_id] = UserEntry(version=version, created_at=time.monotonic())
+            update(entry)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+            self._trim_indexes(user_id)
+
+    def _trim_indexes(self, keep: str):
+        """
+        Libère les index des utilisateurs les moins récents tant que le total
+        des lignes indexées dépasse max_indexed_rows. Appelé sous verrou.
+        """
+        total = sum(len(entry.index) for entry in self._entries.values() if entry.index is not None)
+        for user_id, entry in self._entries.items():
+            if total <= self.max_indexed_rows:
+                break
+            if entry.index is not None and user_id != keep:
+                total -= len(entry.index)
+                entry.index = None
+
+    def _cached(self, user_id: str, read) -> Tuple[int, Any]:
+        """Retourne (version, read(entry)) — read renvoie None si absent."""
+        with self._lock:
+            version = self._versions.get(user_id, 0)
+            entry = self._entry(user_id, version)
+            value = read(entry) if entry is not None else None
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return version, value
+
+    # ==================== Lectures ====================
+
+    def kpis(self, user_id: str) -> SimulationKpis:
+        """KPIs de l'utilisateur (agrégats Supabase mis en cache)."""
+        version, kpis = self._cached(user_id, lambda entry: entry.kpis)
+        if kpis is not None:
+            return kpis
+
+        kpis = simulation_repository.fetch_kpis(user_id)
+        self._store(user_id, version, lambda entry: setattr(entry, "kpis", kpis))
+        return kpis
+
+    def recent(self, user_id: str, limit: int = RECENT_LIMIT) -> List[Dict[str, Any]]:
+        """Dernières simulations (projection "list"), plus récentes d'abord."""
+        version, rows = self._cached(
+            user_id,
+            lambda entry: entry.recent
+            if entry.recent is not None and (len(entry.recent) >= limit or entry.recent_complete)
+            else None,
+        )
+        if rows is None:
+            requested = max(limit, RECENT_LIMIT)
+            rows = simulation_repository.fetch_recent(user_id, limit=requested, projection="list")
+
+            def update(entry: UserEntry):
+                entry.recent = rows
+                entry.recent_complete = len(rows) < requested
+
+            self._store(user_id, version, update)
+        return rows[:limit]
+
+    def page(
+        self,
+        user_id: str,
+        filters: SimulationFilters,
+        sort_column: str = "created_at",
+        descending: bool = True,
+        page_size: int = 10,
+        after: Optional[List[Any]] = None,
+        offset: int = 0,
+        with_count: bool = False,
+    ) -> SimulationPage:
+        """
+        Page de l'historique (mêmes paramètres que SimulationRepository.fetch_page).
+        Un historique indexé est filtré, trié et paginé en mémoire (offset);
+        tant que l'index n'est pas prêt, les pages viennent de Supabase, et la
+        première page sans filtre triée par date est servie depuis les
+        dernières simulations déjà chargées par le tableau de bord.
+        """
+        index = self.index(user_id)
+        if index is not None:
+            rows, total = index.page(filters, sort_column, descending, offset, page_size)
+            column = SORT_COLUMNS.get(sort_column, "created_at")
+            return SimulationPage(
+                rows=rows,
+                has_more=offset + len(rows) < total,
+                total=total if with_count else None,
+                last_key=[rows[-1].get(column), rows[-1].get("id")] if rows else None,
+            )
+
+        key = (
+            filters.date_start, filters.date_end, filters.sector, filters.typology, filters.search,
+            SORT_COLUMNS.get(sort_column, "created_at"), descending, page_size,
+            tuple(after) if after else None, offset, with_count,
+        )
+        version, page = self._cached(user_id, lambda entry: entry.pages.get(key) or self._page_from_recent(entry, key))
+        if page is not None:
+            return page
+
+        page = simulation_repository.fetch_page(
+            user_id, filters, sort_column, descending, page_size, after, offset, with_count,
+        )
+        if page.error:
+            return page
+
+        def update(entry: UserEntry):
+            entry.pages[key] = page
+            while len(entry.pages) > SIMULATION_STORE_MAX_PAGES:
+                entry.pages.popitem(last=False)
+
+        self._store(user_id, version, update)
+        return page
+
+    def index(self, user_id: str) -> Optional[SimulationIndex]:
+        """
+        Index de l'historique complet, sans attendre: construit sur place si
+        les dernières simulations chargées couvrent déjà tout l'historique,
+        sinon en arrière-plan (les pages passent par Supabase en attendant).
+        Un échec est mémorisé jusqu'à la prochaine version ou la fin du TTL.
+
+        Returns:
+            SimulationIndex ou None (pas encore prêt, ou pas d'index)
+        """
+        if SIMULATION_INDEX_MAX_ROWS <= 0:
+            return None
+
+        with self._lock:
+            version = self._versions.get(user_id, 0)
+            entry = self._entry(user_id, version)
+            if entry is not None and entry.index is not None:
+                self.hits += 1
+                return entry.index
+            self.misses += 1
+            if entry is not None and entry.index_failed:
+                return None
+            if entry is None or entry.recent is None or not entry.recent_complete:
+                if user_id not in self._builds:
+                    self._builds[user_id] = _index_executor.submit(self._build_index, user_id, version)
+                return None
+            rows = entry.recent
+
+        return self._set_index(user_id, version, rows)
+
+    def _build_index(self, user_id: str, version: int):
+        """
+        Construction en arrière-plan: historique lu par lots (voir
+        SimulationRepository.iter_simulations) puis comparé au total des KPIs.
+        """
+        try:
+            total = self.kpis(user_id).total_count
+            rows = None
+            if total <= SIMULATION_INDEX_MAX_ROWS:
+                rows = simulation_repository.fetch_recent(user_id, limit=None, projection="list")
+                if len(rows) != total:
+                    print(f"⚠️ Historique lu partiellement ({len(rows)}/{total}), pas d'index")
+                    rows = None
+            if rows is None:
+                self._store(user_id, version, lambda entry: setattr(entry, "index_failed", True))
+            else:
+                self._set_index(user_id, version, rows)
+        except Exception as e:
+            print(f"❌ Erreur construction de l'index: {e}")
+            self._store(user_id, version, lambda entry: setattr(entry, "index_failed", True))
+        finally:
+            with self._lock:
+                self._builds.pop(user_id, None)
+
+    def _set_index(self, user_id: str, version: int, rows: List[Dict[str, Any]]) -> SimulationIndex:
+        index = SimulationIndex(rows)
+        self._store(user_id, version, lambda entry: setattr(entry, "index", index))
+        print(f"📦 Historique indexé: {len(index)} simulation(s)")
+        return index
+
+    @staticmethod
+    def _page_from_recent(entry: UserEntry, key: Tuple) -> Optional[SimulationPage]:
+        """Construit la première page par défaut à partir de entry.recent et entry.kpis."""
+        date_start, date_end, sector, typology, search, column, descending, page_size, after, offset, with_count = key
+        if any((date_start, date_end, sector, typology, search, after, offset)) \
+                or column != "created_at" or not descending:
+            return None
+        if entry.recent is None or entry.kpis is None:
+            return None
+        total = entry.kpis.total_count
+        if len(entry.recent) < min(page_size, total):
+            return None
+
+        # entry.recent suit le même ordre que la requête (created_at desc, id desc)
+        rows = entry.recent[:page_size]
+        return SimulationPage(
+            rows=rows,
+            has_more=total > page_size,
+            total=total if with_count else None,
+            last_key=[rows[-1].get("created_at"), rows[-1].get("id")] if rows else None,
+        )
+
+
+# Instance singleton
+simulation_store = SimulationStore()
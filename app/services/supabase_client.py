@@ -5,7 +5,9 @@ Gère la connexion au client Supabase et les opérations sur le storage.
 
 import os
 import json
-from typing import Any, Optional
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
@@ -15,10 +17,17 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 BUCKET_NAME = "fiches-operations"
+STORAGE_FETCH_WORKERS = int(os.getenv("STORAGE_FETCH_WORKERS", "8"))
 
 # Client Supabase global
 _supabase_client: Optional[Client] = None
 
+# Pool de threads pour les téléchargements Storage (client supabase synchrone)
+_storage_executor = ThreadPoolExecutor(
+    max_workers=STORAGE_FETCH_WORKERS,
+    thread_name_prefix="storage-fetch",
+)
+
 
 def get_supabase_client() -> Optional[Client]:
     """
@@ -83,13 +92,58 @@ def read_file_from_bucket(
         return None
 
 
-def list_bucket_contents(bucket_name: str, folder: str = "") -> list:
+async def read_file_from_bucket_async(
+    bucket_name: str,
+    file_path: str,
+    file_type: str = "txt",
+    encoding: str = "utf-8",
+) -> Optional[Any]:
+    """
+    Version asynchrone de read_file_from_bucket.
+    Le téléchargement s'exécute dans le pool de threads Storage
+    et ne bloque pas la boucle d'événements.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _storage_executor,
+        read_file_from_bucket,
+        bucket_name,
+        file_path,
+        file_type,
+        encoding,
+    )
+
+
+async def read_files_from_bucket_async(
+    bucket_name: str,
+    files: Dict[str, Tuple[str, str]],
+) -> Dict[str, Any]:
+    """
+    Télécharge plusieurs fichiers d'un bucket en parallèle.
+    
+    Args:
+        bucket_name: Nom du bucket
+        files: Dict {clé: (chemin_du_fichier, type_de_fichier)}
+        
+    Returns:
+        Dict {clé: contenu} (None pour les fichiers en erreur)
+    """
+    keys = list(files.keys())
+    results = await asyncio.gather(*(
+        read_file_from_bucket_async(bucket_name, files[key][0], files[key][1])
+        for key in keys
+    ))
+    return dict(zip(keys, results))
+
+
+def list_bucket_contents(bucket_name: str, folder: str = "", limit: int = 100) -> list:
     """
     Liste le contenu d'un bucket ou d'un dossier.
     
     Args:
         bucket_name: Nom du bucket
         folder: Dossier à lister (vide pour la racine)
+        limit: Nombre maximum d'entrées retournées
         
     Returns:
         Liste des fichiers/dossiers
@@ -99,18 +153,64 @@ def list_bucket_contents(bucket_name: str, folder: str = "") -> list:
         return []
     
     try:
-        contents = client.storage.from_(bucket_name).list(folder)
+        contents = client.storage.from_(bucket_name).list(folder, {"limit": limit})
         return contents
     except Exception as e:
         print(f"❌ Erreur listing bucket: {e}")
         return []
 
 
+def get_file_validators(bucket_name: str, folder: str) -> Optional[Dict[str, str]]:
+    """
+    Retourne les validateurs (ETag ou date de modification) des fichiers d'un dossier.
+    Un seul appel de listing suffit à savoir si un dossier a changé.
+    
+    Args:
+        bucket_name: Nom du bucket
+        folder: Dossier à inspecter
+        
+    Returns:
+        Dict {nom_fichier: validateur} ou None en cas d'erreur
+    """
+    client = get_supabase_client()
+    if client is None:
+        return None
+    
+    try:
+        contents = client.storage.from_(bucket_name).list(folder)
+    except Exception as e:
+        print(f"❌ Erreur listing {folder}: {e}")
+        return None
+    
+    validators = {}
+    for item in contents or []:
+        metadata = item.get("metadata") or {}
+        validators[item.get("name", "")] = str(
+            metadata.get("eTag")
+            or metadata.get("lastModified")
+            or item.get("updated_at")
+            or ""
+        )
+    return validators
+
+
+async def get_file_validators_async(bucket_name: str, folder: str) -> Optional[Dict[str, str]]:
+    """Version asynchrone de get_file_validators (pool de threads Storage)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _storage_executor,
+        get_file_validators,
+        bucket_name,
+        folder,
+    )
+
+
 def upload_file_to_bucket(
     bucket_name: str,
     file_path: str,
     file_content: bytes,
-    content_type: str = "application/octet-stream"
+    content_type: str = "application/octet-stream",
+    upsert: bool = False,
 ) -> bool:
     """
     Upload un fichier vers un bucket Supabase Storage.
@@ -120,6 +220,7 @@ def upload_file_to_bucket(
         file_path: Chemin de destination
         file_content: Contenu du fichier en bytes
         content_type: Type MIME du fichier
+        upsert: Remplace le fichier s'il existe déjà
         
     Returns:
         True si succès, False sinon
@@ -132,7 +233,7 @@ def upload_file_to_bucket(
         client.storage.from_(bucket_name).upload(
             file_path,
             file_content,
-            {"content-type": content_type}
+            {"content-type": content_type, "upsert": "true" if upsert else "false"}
         )
         print(f"✅ Fichier uploadé: {file_path}")
         return True
@@ -0,0 +1,293 @@
+"""
+Balayage de paramètres (sweep) et analyse de sensibilité d'une fiche.
+Énumère le produit cartésien des options des selects (variables_mapping)
+et de plages numériques, l'évalue par lots et mesure l'effet de chaque
+paramètre sur le montant de la prime.
+"""
+
+import os
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .calculation_engine import FunctionLoader, calculation_engine
+from .config_loader import FicheConfig, option_value
+
+
+# Nombre maximum de combinaisons évaluées par balayage
+SWEEP_MAX_POINTS = int(os.getenv("SWEEP_MAX_POINTS", "50000"))
+# Taille des lots envoyés au moteur de calcul (et à l'interface)
+SWEEP_CHUNK_SIZE = int(os.getenv("SWEEP_CHUNK_SIZE", "2000"))
+# Processus dédiés aux balayages (0 = calcul dans le processus courant)
+SWEEP_PROCESS_WORKERS = int(os.getenv("SWEEP_PROCESS_WORKERS", "0"))
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+@dataclass
+class SweepAxis:
+    """Paramètre balayé: valeurs passées à la fonction et libellés affichés."""
+    param_name: str
+    label: str
+    values: List[Any]
+    display: List[str]
+    kind: str = "select"  # select ou number
+
+
+@dataclass
+class SweepChunk:
+    """Lot de résultats d'un balayage (diffusable à l'interface)."""
+    start: int
+    total: int
+    rows: List[Dict[str, Any]]
+
+    @property
+    def done(self) -> int:
+        return self.start + len(self.rows)
+
+
+@dataclass
+class SweepResult:
+    """Résultat complet d'un balayage."""
+    axes: List[SweepAxis]
+    rows: List[Dict[str, Any]]
+    sensitivities: List[Dict[str, Any]]
+    errors: int = 0
+
+
+class SensitivityAccumulator:
+    """
+    Agrège les résultats au fil des lots: moyenne des cumacs pour chaque
+    valeur de chaque paramètre (effet marginal) et écart max - min.
+    """
+
+    def __init__(self, axes: List[SweepAxis]):
+        self.axes = axes
+        self._sums = [[0.0] * len(axis.values) for axis in axes]
+        self._counts = [[0] * len(axis.values) for axis in axes]
+        self.total = 0.0
+        self.count = 0
+
+    def add(self, indexes: Tuple[int, ...], cumacs: float):
+        for axis_position, value_index in enumerate(indexes):
+            self._sums[axis_position][value_index] += cumacs
+            self._counts[axis_position][value_index] += 1
+        self.total += cumacs
+        self.count += 1
+
+    def sensitivities(self) -> List[Dict[str, Any]]:
+        """
+        Sensibilités par paramètre, de la plus forte à la plus faible.
+
+        Returns:
+            Liste de dicts: param_name, label, values, mean_cumacs, spread,
+            relative_spread (écart rapporté à la moyenne globale)
+        """
+        overall = self.total / self.count if self.count else 0.0
+        result = []
+        for position, axis in enumerate(self.axes):
+            means = [
+                total / count if count else 0.0
+                for total, count in zip(self._sums[position], self._counts[position])
+            ]
+            spread = max(means) - min(means) if means else 0.0
+            result.append({
+                "param_name": axis.param_name,
+                "label": axis.label,
+                "values": axis.display,
+                "mean_cumacs": means,
+                "spread": spread,
+                "relative_spread": spread / overall if overall else 0.0,
+            })
+        return sorted(result, key=lambda item: item["spread"], reverse=True)
+
+
+def numeric_range(start: float, stop: float, steps: int) -> List[float]:
+    """Valeurs régulièrement espacées entre start et stop (inclus)."""
+    if steps <= 1 or start == stop:
+        return [float(start)]
+    step = (stop - start) / (steps - 1)
+    return [float(start + i * step) for i in range(steps)]
+
+
+def build_sweep_axes(
+    config: FicheConfig,
+    numeric_ranges: Optional[Dict[str, List[float]]] = None,
+    select_params: Optional[List[str]] = None,
+) -> List[SweepAxis]:
+    """
+    Construit les axes du balayage à partir de la configuration d'une fiche.
+
+    Args:
+        config: Configuration de la fiche
+        numeric_ranges: {paramètre numérique: valeurs à balayer}
+        select_params: Selects à balayer (tous si None)
+
+    Returns:
+        Liste des axes, dans l'ordre des paramètres de la fonction
+    """
+    loader = FunctionLoader(config.string_function, fiche_code=config.code)
+    param_to_label = {v: k for k, v in (config.variables_matching or {}).items()}
+    numeric_ranges = numeric_ranges or {}
+
+    axes = []
+    for param_name in loader.get_parameters():
+        label = param_to_label.get(param_name, param_name)
+        mapping = (config.variables_mapping or {}).get(label)
+
+        if isinstance(mapping, (dict, list)) and mapping:
+            if select_params is not None and param_name not in select_params:
+                continue
+            options = list(mapping.keys()) if isinstance(mapping, dict) else list(mapping)
+            # Mêmes valeurs que le simulateur (set_param)
+            values = [option_value(mapping, o) for o in options]
+            axes.append(SweepAxis(
+                param_name=param_name,
+                label=label,
+                values=values,
+                display=[str(o) for o in options],
+            ))
+        elif param_name in numeric_ranges:
+            values = list(numeric_ranges[param_name])
+            axes.append(SweepAxis(
+                param_name=param_name,
+                label=label,
+                values=values,
+                display=[f"{v:g}" for v in values],
+                kind="number",
+            ))
+    return axes
+
+
+def _evaluate_chunk(function_string: str, fiche_code: str, columns: Dict[str, Any]) -> tuple:
+    """
+    Évalue un lot (fonction de module: exécutable dans un processus séparé).
+    Les valeurs sont passées telles quelles, comme par execute_simulation.
+    """
+    result = calculation_engine.evaluate_batch(function_string, columns, fiche_code=fiche_code, clean=False)
+    return list(map(float, result.cumacs)), list(map(float, result.euros)), result.success
+
+
+def _get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """Pool de processus partagé (créé au premier balayage)."""
+    global _process_pool
+    if SWEEP_PROCESS_WORKERS <= 0:
+        return None
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=SWEEP_PROCESS_WORKERS)
+    return _process_pool
+
+
+def iter_sweep(
+    config: FicheConfig,
+    base_params: Dict[str, Any],
+    axes: List[SweepAxis],
+    accumulator: Optional[SensitivityAccumulator] = None,
+    chunk_size: int = SWEEP_CHUNK_SIZE,
+) -> Iterator[SweepChunk]:
+    """
+    Évalue le produit cartésien des axes, lot par lot.
+
+    Args:
+        config: Configuration de la fiche
+        base_params: Valeurs des paramètres non balayés
+        axes: Axes du balayage (build_sweep_axes)
+        accumulator: Agrégateur de sensibilités mis à jour à chaque lot
+        chunk_size: Nombre de combinaisons par lot
+
+    Yields:
+        SweepChunk: lignes {param_name: libellé affiché, ..., cumacs, euros, success}
+
+    Raises:
+        ValueError: Si le nombre de combinaisons dépasse SWEEP_MAX_POINTS
+    """
+    total = 1
+    for axis in axes:
+        total *= len(axis.values)
+    if total > SWEEP_MAX_POINTS:
+        raise ValueError(f"Trop de combinaisons ({total} > {SWEEP_MAX_POINTS})")
+
+    swept = {axis.param_name for axis in axes}
+    fixed = {name: value for name, value in base_params.items() if name not in swept}
+
+    combinations = itertools.product(*(range(len(axis.values)) for axis in axes))
+    pending = []
+    start = 0
+    while True:
+        batch = list(itertools.islice(combinations, max(1, chunk_size)))
+        if not batch:
+            break
+
+        columns = dict(fixed)
+        for position, axis in enumerate(axes):
+            columns[axis.param_name] = [axis.values[indexes[position]] for indexes in batch]
+
+        pool = _get_process_pool()
+        if pool is not None:
+            pending.append((start, batch, pool.submit(
+                _evaluate_chunk, config.string_function, config.code, columns
+            )))
+        else:
+            pending.append((start, batch, _evaluate_chunk(config.string_function, config.code, columns)))
+        start += len(batch)
+
+        # Avec un pool, les lots suivants sont soumis avant de collecter le premier
+        while pending and (pool is None or len(pending) > SWEEP_PROCESS_WORKERS):
+            yield _collect(pending.pop(0), axes, total, accumulator)
+
+    while pending:
+        yield _collect(pending.pop(0), axes, total, accumulator)
+
+
+def _collect(
+    item: tuple,
+    axes: List[SweepAxis],
+    total: int,
+    accumulator: Optional[SensitivityAccumulator],
+) -> SweepChunk:
+    """Transforme le résultat d'un lot en lignes affichables."""
+    start, batch, outcome = item
+    cumacs, euros, success = outcome.result() if hasattr(outcome, "result") else outcome
+
+    rows = []
+    for i, indexes in enumerate(batch):
+        row = {axis.param_name: axis.display[indexes[position]] for position, axis in enumerate(axes)}
+        row.update({"cumacs": cumacs[i], "euros": euros[i], "success": success[i]})
+        rows.append(row)
+        if accumulator is not None and success[i]:
+            accumulator.add(indexes, cumacs[i])
+
+    return SweepChunk(start=start, total=total, rows=rows)
+
+
+def run_sweep(
+    config: FicheConfig,
+    base_params: Dict[str, Any],
+    numeric_ranges: Optional[Dict[str, List[float]]] = None,
+    select_params: Optional[List[str]] = None,
+) -> SweepResult:
+    """
+    Balayage complet d'une fiche (grille de résultats et sensibilités).
+
+    Args:
+        config: Configuration de la fiche
+        base_params: Valeurs des paramètres non balayés
+        numeric_ranges: {paramètre numérique: valeurs à balayer}
+        select_params: Selects à balayer (tous si None)
+
+    Returns:
+        SweepResult
+    """
+    axes = build_sweep_axes(config, numeric_ranges, select_params)
+    accumulator = SensitivityAccumulator(axes)
+    rows = []
+    for chunk in iter_sweep(config, base_params, axes, accumulator):
+        rows.extend(chunk.rows)
+
+    return SweepResult(
+        axes=axes,
+        rows=rows,
+        sensitivities=accumulator.sensitivities(),
+        errors=sum(1 for row in rows if not row["success"]),
+    )
@@ -0,0 +1,271 @@
+"""
+Vérification locale des access tokens Supabase (JWT).
+
+AuthState.check_auth s'exécute à chaque chargement de page protégée: au lieu
+d'un aller-retour vers Supabase Auth (get_user), la signature et l'expiration
+du jeton sont vérifiées sur place:
+    - HS256 avec le secret JWT du projet (SUPABASE_JWT_SECRET);
+    - RS256 / ES256 avec les clés publiques JWKS du projet (PyJWT, optionnel).
+Les jetons vérifiés sont gardés peu de temps en mémoire. Seuls les jetons
+proches de l'expiration ou non vérifiables localement (pas de secret, clé
+inconnue) passent par le réseau (supabase_service.validate_token).
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .supabase_service import SUPABASE_URL, validate_token
+
+try:
+    import jwt
+except ImportError:  # Vérification JWKS indisponible (HS256 ou réseau uniquement)
+    jwt = None
+
+
+# Secret JWT du projet (Settings > API > JWT Secret; vide = pas de vérification HS256)
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET", "")
+# Clés publiques des jetons signés en RS256 / ES256
+SUPABASE_JWKS_URL = os.getenv(
+    "SUPABASE_JWKS_URL",
+    f"{SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json" if SUPABASE_URL else "",
+)
+# Audience des access tokens des utilisateurs connectés
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+# Durée de conservation d'un jeton vérifié (secondes)
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "60"))
+# Marge avant expiration en deçà de laquelle le jeton est revérifié par le réseau (secondes)
+TOKEN_EXPIRY_MARGIN = float(os.getenv("TOKEN_EXPIRY_MARGIN", "60"))
+# Nombre maximum de jetons gardés en mémoire
+TOKEN_CACHE_SIZE = 4096
+
+_ASYMMETRIC_ALGORITHMS = ("RS256", "ES256")
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def _result(valid: bool, source: str, claims: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> Dict[str, Any]:
+    """Résultat d'une vérification (même format quelle que soit la source)."""
+    claims = claims or {}
+    metadata = claims.get("user_metadata") or {}
+    return {
+        "valid": valid,
+        "user_id": claims.get("sub", "") if valid else "",
+        "email": claims.get("email", "") if valid else "",
+        "full_name": metadata.get("full_name", "") if valid else "",
+        "exp": claims.get("exp"),
+        "error": error,
+        "source": source,
+    }
+
+
+class TokenVerifier:
+    """
+    Vérification des access tokens avec cache des jetons valides.
+
+    Args:
+        secret: Secret JWT HS256 (vide = désactivé)
+        jwks_url: URL JWKS (vide ou PyJWT absent = désactivé)
+        ttl: Durée de conservation d'un jeton vérifié
+        expiry_margin: Marge avant expiration (revérification réseau)
+    """
+
+    def __init__(
+        self,
+        secret: str = SUPABASE_JWT_SECRET,
+        jwks_url: str = SUPABASE_JWKS_URL,
+        ttl: float = TOKEN_CACHE_TTL,
+        expiry_margin: float = TOKEN_EXPIRY_MARGIN,
+    ):
+        self._secret = secret.encode("utf-8") if secret else b""
+        self._jwks = jwt.PyJWKClient(jwks_url, cache_keys=True) if jwt is not None and jwks_url else None
+        self.ttl = ttl
+        self.expiry_margin = expiry_margin
+        self._lock = threading.Lock()
+        # Empreinte du jeton -> (résultat, conservé jusqu'à)
+        self._cache: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self.hits = 0
+        self.local = 0
+        self.remote = 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def _cached(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            result, until = entry
+            if until <= time.time():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return result
+
+    def _remember(self, key: str, result: Dict[str, Any]):
+        """Garde un résultat valide, au plus jusqu'à la marge avant expiration."""
+        until = time.time() + self.ttl
+        if result.get("exp"):
+            until = min(until, float(result["exp"]) - self.expiry_margin)
+        if until <= time.time():
+            return
+        with self._lock:
+            self._cache[key] = ({**result, "source": "cache"}, until)
+            self._cache.move_to_end(key)
+            while len(self._cache) > TOKEN_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def forget(self, token: str):
+        """Retire un jeton du cache (déconnexion, rafraîchissement)."""
+        if token:
+            with self._lock:
+                self._cache.pop(self._key(token), None)
+
+    def _check_claims(self, claims: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Résultat local d'après l'expiration et l'audience (None = à vérifier par le réseau)."""
+        try:
+            exp = float(claims["exp"])
+        except (KeyError, TypeError, ValueError):
+            return _result(False, "local", error="Token invalide")
+        now = time.time()
+        if exp <= now:
+            return _result(False, "local", error="Session expirée")
+        audience = claims.get("aud")
+        audiences = audience if isinstance(audience, list) else [audience]
+        if SUPABASE_JWT_AUDIENCE and SUPABASE_JWT_AUDIENCE not in audiences:
+            return _result(False, "local", error="Token invalide")
+        if not claims.get("sub"):
+            return _result(False, "local", error="Token invalide")
+        if exp - now < self.expiry_margin:
+            return None
+        return _result(True, "local", claims)
+
+    def _verify_hs256(self, signing_input: str, signature: str) -> bool:
+        expected = hmac.new(self._secret, signing_input.encode("ascii"), hashlib.sha256).digest()
+        return hmac.compare_digest(expected, _b64decode(signature))
+
+    def _verify_jwks(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Claims d'un jeton RS256 / ES256: None si la clé est introuvable, {} si
+        la signature est invalide. Appel bloquant (téléchargement des clés).
+        """
+        try:
+            signing_key = self._jwks.get_signing_key_from_jwt(token)
+        except jwt.PyJWTError as e:
+            print(f"⚠️ Clé JWKS indisponible: {e}")
+            return None
+        try:
+            return jwt.decode(
+                token,
+                signing_key.key,
+                algorithms=list(_ASYMMETRIC_ALGORITHMS),
+                options={"verify_exp": False, "verify_aud": False},
+            )
+        except jwt.InvalidTokenError:
+            return {}
+
+    async def _verify_local(self, token: str) -> Optional[Dict[str, Any]]:
+        """Vérification sans Supabase Auth (None = non vérifiable localement)."""
+        try:
+            header_b64, payload_b64, signature = token.split(".")
+            header = json.loads(_b64decode(header_b64))
+            algorithm = header.get("alg")
+        except (ValueError, UnicodeError, AttributeError):
+            return _result(False, "local", error="Token invalide")
+
+        if algorithm == "HS256" and self._secret:
+            try:
+                if not self._verify_hs256(f"{header_b64}.{payload_b64}", signature):
+                    return _result(False, "local", error="Token invalide")
+                claims = json.loads(_b64decode(payload_b64))
+            except (ValueError, UnicodeError):
+                return _result(False, "local", error="Token invalide")
+        elif algorithm in _ASYMMETRIC_ALGORITHMS and self._jwks is not None:
+            claims = await asyncio.to_thread(self._verify_jwks, token)
+            if claims is None:
+                return None
+            if not claims:
+                return _result(False, "local", error="Token invalide")
+        else:
+            return None
+
+        if not isinstance(claims, dict):
+            return _result(False, "local", error="Token invalide")
+        return self._check_claims(claims)
+
+    @staticmethod
+    def _verify_remote(token: str) -> Dict[str, Any]:
+        """Vérification par Supabase Auth (get_user). Appel bloquant."""
+        response = validate_token(token)
+        user = response.get("user")
+        if not response.get("valid") or user is None:
+            return _result(False, "network", error=response.get("error") or "Token invalide")
+        try:
+            exp = json.loads(_b64decode(token.split(".")[1])).get("exp")
+        except (IndexError, ValueError, UnicodeError, AttributeError):
+            exp = None
+        return _result(True, "network", {
+            "sub": user.id,
+            "email": user.email or "",
+            "user_metadata": user.user_metadata or {},
+            "exp": exp,
+        })
+
+    async def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Vérifie un access token: cache, puis signature locale, puis réseau.
+
+        Returns:
+            Dict avec:
+            - 'valid': bool
+            - 'user_id', 'email', 'full_name': str (vides si invalide)
+            - 'exp': expiration (timestamp) si connue
+            - 'error': str ou None
+            - 'source': 'cache', 'local' ou 'network'
+        """
+        if not token:
+            return _result(False, "local", error="Token manquant")
+
+        key = self._key(token)
+        result = self._cached(key)
+        if result is not None:
+            self.hits += 1
+            return result
+
+        result = await self._verify_local(token)
+        if result is not None:
+            self.local += 1
+        else:
+            self.remote += 1
+            result = await asyncio.to_thread(self._verify_remote, token)
+
+        if result["valid"]:
+            self._remember(key, result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._cache)
+        return {
+            "cached": size,
+            "hits": self.hits,
+            "local": self.local,
+            "remote": self.remote,
+            "hs256": bool(self._secret),
+            "jwks": self._jwks is not None,
+        }
+
+
+# Instance singleton
+token_verifier = TokenVerifier()
@@ -4,6 +4,9 @@ Authentication State - Gestion complète de l'authentification avec Supabase
 CORRECTION BUG SESSION PARTAGÉE:
 - check_auth() utilise maintenant validate_token() au lieu de client.auth.get_session()
 - Cela évite que la session d'un utilisateur soit vue par un autre utilisateur
+- Le token est vérifié localement (signature + expiration, token_verifier) et
+  gardé quelques instants en cache: Supabase Auth n'est interrogé que pour les
+  tokens proches de l'expiration ou non vérifiables localement
 
 CORRECTION MESSAGES D'ERREUR:
 - Ajout de computed var has_error pour une meilleure réactivité
@@ -256,26 +259,30 @@ class AuthState(rx.State):
         self.is_checking_auth = True
         
         try:
-            # Essayer d'utiliser validate_token si disponible
-            from ..services.supabase_service import validate_token, refresh_session
+            from ..services.supabase_service import refresh_session
+            from ..services.token_verifier import token_verifier
             
             if not self.access_token:
                 self._clear_user()
                 self.is_checking_auth = False
                 return
             
-            # Valider le token actuel
-            is_valid, user_info = validate_token(self.access_token)
+            # Valider le token actuel (cache, signature locale, puis Supabase Auth)
+            token_info = await token_verifier.verify(self.access_token)
             
-            if is_valid and user_info:
+            if token_info["valid"]:
                 # Token valide - mettre à jour les infos utilisateur
-                self.user_id = user_info.get("sub", "")
-                self.user_email = user_info.get("email", "")
+                self.user_id = token_info["user_id"]
+                self.user_email = token_info["email"]
+                if token_info["full_name"]:
+                    self.user_full_name = token_info["full_name"]
                 self.is_authenticated = True
-                print(f"✅ Token valide pour {self.user_email}")
+                if token_info["source"] != "cache":
+                    print(f"✅ Token valide pour {self.user_email} ({token_info['source']})")
             elif self.refresh_token:
                 # Token expiré mais refresh disponible
                 print("⚠️ Token expiré, tentative de refresh...")
+                token_verifier.forget(self.access_token)
                 refresh_result = refresh_session(self.refresh_token)
                 
                 if refresh_result and refresh_result.get("access_token"):
@@ -516,6 +523,8 @@ class AuthState(rx.State):
             print(f"⚠️ Erreur déconnexion Supabase: {e}")
         
         # Toujours nettoyer l'état local
+        from ..services.token_verifier import token_verifier
+        token_verifier.forget(self.access_token)
         self._clear_user()
         self._clear_login_form()
         self._clear_register_form()
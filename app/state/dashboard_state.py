@@ -1,3 +1,6 @@
+import asyncio
+from datetime import date, datetime
+
 import reflex as rx
 from typing import List, Dict, Any, Optional
 
@@ -5,18 +8,32 @@ from typing import List, Dict, Any, Optional
 class DashboardState(rx.State):
     """État pour le tableau de bord."""
     
-    simulations: List[Dict[str, Any]] = []
+    # Lignes formatées uniquement: les données brutes restent dans le store partagé
+    simulations_list: List[Dict[str, str]] = []
     is_loading: bool = False
     error_message: str = ""
     
+    # KPIs de tout l'historique (agrégés par la base)
+    kpi_total_count: int = 0
+    kpi_total_euros: float = 0.0
+    kpi_total_cumacs: float = 0.0
+    
     # Simulation sélectionnée pour visualisation/export
     selected_simulation_id: str = ""
     
-    @rx.var
-    def simulations_list(self) -> List[Dict[str, str]]:
+    # Sélection pour les rapports groupés (IDs)
+    selected_ids: List[str] = []
+    # Progression du rapport groupé en cours
+    bulk_running: bool = False
+    bulk_done: int = 0
+    bulk_total: int = 0
+    bulk_status: str = ""
+    
+    @staticmethod
+    def _format_simulations(simulations: List[Dict[str, Any]]) -> List[Dict[str, str]]:
         """Liste des simulations formatée pour l'affichage."""
         formatted = []
-        for index, sim in enumerate(self.simulations, start=1):
+        for index, sim in enumerate(simulations, start=1):
             # Formater la date
             date_str = ""
             if sim.get("created_at"):
@@ -45,291 +62,231 @@ class DashboardState(rx.State):
     @rx.var
     def has_simulations(self) -> bool:
         """Vérifie s'il y a des simulations."""
-        return len(self.simulations) > 0
+        return len(self.simulations_list) > 0
+    
+    @rx.var
+    def selection_count(self) -> int:
+        """Nombre de simulations sélectionnées."""
+        return len(self.selected_ids)
+    
+    @rx.var
+    def all_selected(self) -> bool:
+        """Toutes les simulations affichées sont sélectionnées."""
+        return bool(self.simulations_list) and len(self.selected_ids) == len(self.simulations_list)
+    
+    @rx.var
+    def bulk_progress(self) -> int:
+        """Progression du rapport groupé (%)."""
+        if not self.bulk_total:
+            return 0
+        return int(self.bulk_done * 100 / self.bulk_total)
     
     @rx.var
     def total_simulations_str(self) -> str:
         """Nombre total de simulations."""
-        return str(len(self.simulations))
+        return str(self.kpi_total_count)
     
     @rx.var
     def total_euros_str(self) -> str:
         """Total des primes en euros."""
-        total = sum(sim.get("result_euros", 0) or 0 for sim in self.simulations)
-        return f"{total:,.2f} €".replace(",", " ")
+        return f"{self.kpi_total_euros:,.2f} €".replace(",", " ")
     
     @rx.var
     def total_cumacs_str(self) -> str:
         """Total des cumacs."""
-        total = sum(sim.get("result_cumacs", 0) or 0 for sim in self.simulations)
-        return f"{total:,.0f} kWh".replace(",", " ")
+        return f"{self.kpi_total_cumacs:,.0f} kWh".replace(",", " ")
     
-    def _get_supabase_client(self):
-        """Récupère le client Supabase."""
-        try:
-            from ..services.supabase_service import get_service_client
-            return get_service_client()
-        except ImportError:
-            pass
+    async def _get_user_id(self) -> Optional[str]:
+        """Récupère l'ID de l'utilisateur connecté."""
         try:
-            from ..services.supabase_service import get_supabase_client
-            return get_supabase_client()
-        except ImportError:
-            pass
-        return None
+            from .auth_state import AuthState
+            auth_state = await self.get_state(AuthState)
+            return getattr(auth_state, 'user_id', None)
+        except Exception as e:
+            print(f"⚠️ Erreur récupération user_id: {e}")
+            return None
     
     @rx.event
     async def load_simulations(self):
-        """Charge les simulations de l'utilisateur connecté."""
+        """Charge les simulations de l'utilisateur connecté (colonnes affichées uniquement)."""
         self.is_loading = True
         self.error_message = ""
         yield
         
         try:
-            client = self._get_supabase_client()
+            from ..services.simulation_store import simulation_store
             
-            # Récupérer l'utilisateur connecté
-            user_id = None
-            try:
-                from .auth_state import AuthState
-                auth_state = await self.get_state(AuthState)
-                user_id = getattr(auth_state, 'user_id', None)
-            except Exception as e:
-                print(f"⚠️ Erreur récupération user_id: {e}")
+            user_id = await self._get_user_id()
+            simulations = []
             
-            if client and user_id:
-                response = client.table("simulations")\
-                    .select("*")\
-                    .eq("user_id", user_id)\
-                    .order("created_at", desc=True)\
-                    .limit(50)\
-                    .execute()
-                
-                if response.data:
-                    self.simulations = response.data
-                    print(f"✅ {len(response.data)} simulations chargées")
-                else:
-                    self.simulations = []
+            if user_id:
+                kpis = simulation_store.kpis(user_id)
+                self.kpi_total_count = kpis.total_count
+                self.kpi_total_euros = kpis.total_euros
+                self.kpi_total_cumacs = kpis.total_cumacs
+                simulations = simulation_store.recent(user_id, limit=50)
+                if simulations:
+                    print(f"✅ {len(simulations)} simulations chargées")
             else:
                 # Pas de données si pas connecté
-                self.simulations = []
-                print("⚠️ Pas de client Supabase ou user_id")
+                self.kpi_total_count = 0
+                self.kpi_total_euros = 0.0
+                self.kpi_total_cumacs = 0.0
+                print("⚠️ Pas de user_id")
                 
         except Exception as e:
             print(f"❌ Erreur chargement simulations: {e}")
             self.error_message = str(e)
-            self.simulations = []
+            simulations = []
         
+        self.simulations_list = self._format_simulations(simulations)
+        loaded_ids = {sim["id"] for sim in self.simulations_list}
+        self.selected_ids = [sim_id for sim_id in self.selected_ids if sim_id in loaded_ids]
         self.is_loading = False
     
-    def _get_simulation_by_id(self, simulation_id: str) -> Optional[Dict[str, Any]]:
-        """Récupère une simulation par son ID."""
-        for sim in self.simulations:
-            if sim.get("id") == simulation_id:
-                return sim
-        return None
+    @rx.event
+    def toggle_selection(self, simulation_id: str):
+        """Ajoute ou retire une simulation de la sélection."""
+        if simulation_id in self.selected_ids:
+            self.selected_ids = [sim_id for sim_id in self.selected_ids if sim_id != simulation_id]
+        else:
+            self.selected_ids = self.selected_ids + [simulation_id]
+    
+    @rx.event
+    def toggle_select_all(self):
+        """Sélectionne toutes les simulations affichées (ou vide la sélection)."""
+        if self.all_selected:
+            self.selected_ids = []
+        else:
+            self.selected_ids = [sim["id"] for sim in self.simulations_list]
+    
+    @rx.event
+    def clear_selection(self):
+        self.selected_ids = []
+    
+    async def _get_simulation_detail(self, simulation_id: str) -> Optional[Dict[str, Any]]:
+        """Ligne complète d'une simulation, lue à la demande (la liste n'en a qu'une projection)."""
+        from ..services.simulation_repository import simulation_repository
+        
+        user_id = await self._get_user_id()
+        if not user_id:
+            return None
+        # Requête Supabase bloquante: hors de la boucle d'événements
+        return await asyncio.to_thread(simulation_repository.fetch_simulation, user_id, simulation_id)
+    
+    @rx.event
+    async def export_history(self, fmt: str):
+        """
+        Exporte tout l'historique (csv ou xlsx): le fichier est produit en flux
+        par la route /export/simulations, avec un jeton signé de courte durée.
+        """
+        from ..services.download_tokens import download_tokens
+        
+        user_id = await self._get_user_id()
+        if not user_id:
+            yield rx.toast.error("Session expirée, veuillez vous reconnecter")
+            return
+        
+        token = download_tokens.create("export", user_id)
+        yield rx.download(url=f"/export/simulations.{fmt}?token={token}")
     
     @rx.event
     async def download_simulation_pdf(self, simulation_id: str):
-        """Télécharge le PDF d'une simulation."""
-        sim = self._get_simulation_by_id(simulation_id)
+        """
+        Télécharge le PDF d'une simulation: rendu hors de la boucle d'événements
+        (ou lu dans le cache), puis servi par la route /export/reports.
+        """
+        user_id = await self._get_user_id()
+        sim = await self._get_simulation_detail(simulation_id)
         
-        if not sim:
+        if not sim or not user_id:
             yield rx.toast.error("Simulation non trouvée")
             return
         
         try:
-            from reportlab.lib.pagesizes import A4
-            from reportlab.lib import colors
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            from reportlab.lib.units import cm
-            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-            from reportlab.lib.enums import TA_CENTER
-            from datetime import datetime
-            import io
-            import base64
-            
-            # Générer le PDF en mémoire
-            buffer = io.BytesIO()
-            
-            # Nom du fichier
-            safe_name = "".join(c if c.isalnum() or c in (' ', '-', '_') else '_' for c in (sim.get("name") or "simulation"))[:30]
-            safe_name = safe_name.replace(" ", "_")
-            filename = f"simulation_{safe_name}.pdf"
+            from ..services.pdf_cache import pdf_cache, report_download_url
+            from ..services.pdf_report import ReportUnavailableError, report_filename
             
-            # Créer le document
-            doc = SimpleDocTemplate(
-                buffer,
-                pagesize=A4,
-                rightMargin=2*cm,
-                leftMargin=2*cm,
-                topMargin=2*cm,
-                bottomMargin=2*cm
-            )
+            filename = report_filename(sim)
+            # Simulation enregistrée: rapport rendu une seule fois (cache disque / bucket)
+            key = await pdf_cache.ensure_report(sim)
             
-            # Styles
-            styles = getSampleStyleSheet()
+            print(f"✅ PDF prêt pour simulation: {sim.get('name')}")
+            yield rx.download(url=report_download_url(key, user_id, filename), filename=filename)
             
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=24,
-                spaceAfter=30,
-                alignment=TA_CENTER,
-                textColor=colors.HexColor("#1a365d")
-            )
-            
-            subtitle_style = ParagraphStyle(
-                'CustomSubtitle',
-                parent=styles['Normal'],
-                fontSize=12,
-                spaceAfter=20,
-                alignment=TA_CENTER,
-                textColor=colors.HexColor("#718096")
-            )
-            
-            heading_style = ParagraphStyle(
-                'CustomHeading',
-                parent=styles['Heading2'],
-                fontSize=14,
-                spaceBefore=20,
-                spaceAfter=10,
-                textColor=colors.HexColor("#2d3748")
-            )
-            
-            # Contenu du PDF
-            story = []
-            
-            # En-tête
-            story.append(Paragraph("Rapport de Simulation CEE", title_style))
-            story.append(Paragraph(sim.get("name") or "Simulation", subtitle_style))
-            story.append(Paragraph(f"Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}", subtitle_style))
-            story.append(Spacer(1, 20))
-            
-            # Résultats principaux
-            story.append(Paragraph("Résultats de la simulation", heading_style))
-            
-            result_euros = sim.get("result_euros", 0) or 0
-            result_cumacs = sim.get("result_cumacs", 0) or 0
-            
-            results_data = [
-                ["Indicateur", "Valeur"],
-                ["Prime CEE estimée", f"{result_euros:,.2f} €".replace(",", " ")],
-                ["Volume CEE", f"{result_cumacs:,.0f} kWh cumac".replace(",", " ")],
-            ]
-            
-            results_table = Table(results_data, colWidths=[8*cm, 8*cm])
-            results_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#22c55e")),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('TOPPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor("#f0fdf4")),
-                ('FONTSIZE', (0, 1), (-1, -1), 14),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica-Bold'),
-                ('BOTTOMPADDING', (0, 1), (-1, -1), 15),
-                ('TOPPADDING', (0, 1), (-1, -1), 15),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor("#86efac")),
-            ]))
-            story.append(results_table)
-            story.append(Spacer(1, 20))
-            
-            # Détails de l'opération
-            story.append(Paragraph("Détails de l'opération", heading_style))
-            
-            details_data = [
-                ["Paramètre", "Valeur"],
-                ["Fiche d'opération", sim.get("fiche_code") or "-"],
-                ["Secteur", sim.get("sector") or "-"],
-                ["Typologie", sim.get("typology") or "-"],
-                ["Type de bénéficiaire", sim.get("beneficiary_type") or "-"],
-            ]
-            
-            details_table = Table(details_data, colWidths=[6*cm, 10*cm])
-            details_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#5a7a91")),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-                ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-                ('TOPPADDING', (0, 0), (-1, -1), 8),
-                ('BACKGROUND', (0, 1), (0, -1), colors.HexColor("#f1f5f9")),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor("#cbd5e1")),
-            ]))
-            story.append(details_table)
-            story.append(Spacer(1, 20))
-            
-            # Localisation
-            story.append(Paragraph("Localisation et date", heading_style))
-            
-            location_data = [
-                ["Paramètre", "Valeur"],
-                ["Département", sim.get("department") or "-"],
-                ["Zone climatique", sim.get("zone_climatique") or "-"],
-                ["Date de signature", sim.get("date_signature") or "-"],
-            ]
-            
-            location_table = Table(location_data, colWidths=[6*cm, 10*cm])
-            location_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#5a7a91")),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-                ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-                ('TOPPADDING', (0, 0), (-1, -1), 8),
-                ('BACKGROUND', (0, 1), (0, -1), colors.HexColor("#f1f5f9")),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor("#cbd5e1")),
-            ]))
-            story.append(location_table)
-            story.append(Spacer(1, 20))
-            
-            # Note de bas de page
-            story.append(Spacer(1, 30))
-            footer_style = ParagraphStyle(
-                'Footer',
-                parent=styles['Normal'],
-                fontSize=8,
-                textColor=colors.HexColor("#718096"),
-                alignment=TA_CENTER
-            )
-            story.append(Paragraph(
-                "Ce document est une estimation indicative. Le montant réel de la prime CEE peut varier.",
-                footer_style
-            ))
-            story.append(Paragraph(
-                f"Document généré par RDE Consulting - {datetime.now().strftime('%d/%m/%Y %H:%M')}",
-                footer_style
-            ))
-            
-            # Construire le PDF
-            doc.build(story)
+        except ReportUnavailableError as e:
+            print(f"❌ Module manquant: {e}")
+            yield rx.toast.error("Module PDF non disponible", duration=3000)
+        except Exception as e:
+            print(f"❌ Erreur export PDF: {e}")
+            yield rx.toast.error(f"Erreur: {str(e)[:50]}", duration=3000)
+    
+    @rx.event(background=True)
+    async def build_bulk_report(self, fmt: str):
+        """
+        Rapport groupé des simulations sélectionnées: rapports rendus en
+        parallèle (pool de processus), puis dossier PDF fusionné avec page de
+        synthèse (fmt="pdf") ou archive ZIP diffusée (fmt="zip").
+        """
+        from ..services.pdf_cache import pdf_cache, report_download_url
+        from ..services.pdf_report import ReportUnavailableError
+        from ..services.report_bundle import (
+            BULK_REPORT_MAX,
+            build_dossier,
+            bundle_download_url,
+            dossier_available,
+            fetch_records,
+        )
+        
+        async with self:
+            if self.bulk_running:
+                return
+            user_id = await self._get_user_id()
+            simulation_ids = list(self.selected_ids[:BULK_REPORT_MAX])
+            if not user_id or not simulation_ids:
+                return
+            self.bulk_running = True
+            self.bulk_done = 0
+            self.bulk_total = len(simulation_ids)
+            self.bulk_status = "Lecture des simulations..."
+        
+        try:
+            records = await asyncio.to_thread(fetch_records, user_id, simulation_ids)
+            if not records:
+                raise ValueError("Simulations introuvables")
             
-            # Récupérer les bytes du PDF
-            pdf_bytes = buffer.getvalue()
-            buffer.close()
+            async with self:
+                self.bulk_total = len(records)
+                self.bulk_status = "Génération des rapports..."
             
-            # Encoder en base64
-            pdf_base64 = base64.b64encode(pdf_bytes).decode('utf-8')
+            # Rendus en parallèle (déjà en cache pour les simulations téléchargées)
+            for rendered in asyncio.as_completed([pdf_cache.ensure_report(record) for record in records]):
+                await rendered
+                async with self:
+                    self.bulk_done += 1
             
-            print(f"✅ PDF généré pour simulation: {sim.get('name')}")
-            yield rx.toast.success("PDF généré !", duration=2000)
+            if fmt == "pdf" and dossier_available():
+                async with self:
+                    self.bulk_status = "Assemblage du dossier..."
+                filename = f"dossier_simulations_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+                key = await build_dossier(records)
+                url = report_download_url(key, user_id, filename, shared=False)
+            else:
+                if fmt == "pdf":
+                    yield rx.toast.info("Fusion PDF indisponible (pypdf): rapports livrés en ZIP", duration=4000)
+                filename = f"rapports_simulations_{date.today().isoformat()}.zip"
+                url = bundle_download_url(user_id, [record["id"] for record in records])
             
-            # Télécharger
-            yield rx.download(
-                data=f"data:application/pdf;base64,{pdf_base64}",
-                filename=filename
-            )
+            print(f"✅ Rapport groupé prêt: {len(records)} simulation(s)")
+            yield rx.download(url=url, filename=filename)
             
-        except ImportError as e:
+        except ReportUnavailableError as e:
             print(f"❌ Module manquant: {e}")
             yield rx.toast.error("Module PDF non disponible", duration=3000)
         except Exception as e:
-            print(f"❌ Erreur export PDF: {e}")
-            yield rx.toast.error(f"Erreur: {str(e)[:50]}", duration=3000)
\ No newline at end of file
+            print(f"❌ Erreur rapport groupé: {e}")
+            yield rx.toast.error(f"Erreur: {str(e)[:50]}", duration=3000)
+        finally:
+            async with self:
+                self.bulk_running = False
+                self.bulk_status = ""
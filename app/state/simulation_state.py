@@ -4,6 +4,7 @@
 
 import reflex as rx
 from typing import Optional, Dict, List, Any
+import copy
 import json
 
 from ..data.variables import (
@@ -15,12 +16,21 @@ from ..data.variables import (
     get_fiches_for_prefix,
     CEE_CONSTANTS,
 )
+from .virtual_window import WINDOW_SIZE, shift_window, window_slice
 
 
 # Nom du bucket Supabase Storage
 BUCKET_NAME = "fiches-operations"
 
 
+def _match_fiches(fiches: List[Dict[str, str]], search: str) -> List[Dict[str, str]]:
+    """Fiches dont le code ou la description contient la recherche."""
+    if not search:
+        return fiches
+    search = search.lower()
+    return [f for f in fiches if search in f["code"].lower() or search in f["description"].lower()]
+
+
 class SimulationState(rx.State):
     """État du simulateur multi-étapes avec chargement dynamique."""
     
@@ -49,6 +59,8 @@ class SimulationState(rx.State):
     fiche_search: str = ""
     fiche_loaded: bool = False
     fiche_loading_error: str = ""
+    # Début de la fenêtre de la liste virtualisée
+    fiche_window_start: int = 0
     
     # ==================== Étape 5: Paramètres dynamiques ====================
     beneficiary_type: str = ""
@@ -75,6 +87,12 @@ class SimulationState(rx.State):
     simulation_saved: bool = False
     missing_arguments: str = ""
     
+    # ==================== Analyse de sensibilité ====================
+    sweep_running: bool = False
+    sweep_progress: int = 0  # Pourcentage de combinaisons évaluées
+    sweep_error: str = ""
+    sweep_sensitivities: List[Dict[str, Any]] = []  # [{label, spread_label, share}]
+    
     # ==================== Helpers Supabase ====================
     
     def _get_supabase_client(self):
@@ -146,28 +164,6 @@ class SimulationState(rx.State):
             print(f"🔒 Sécurité: Erreur récupération auth: {e}")
             return None
     
-    def _read_file_from_bucket(self, file_path: str, file_type: str = "txt") -> Any:
-        """Lit un fichier depuis le bucket Supabase Storage."""
-        client = self._get_supabase_client()
-        if not client:
-            print(f"❌ Client Supabase non disponible")
-            return None
-        
-        try:
-            print(f"📁 Lecture: {BUCKET_NAME}/{file_path}")
-            raw = client.storage.from_(BUCKET_NAME).download(file_path)
-            print(f"✅ Fichier téléchargé: {len(raw)} bytes")
-            
-            if file_type == "txt":
-                return raw.decode("utf-8")
-            elif file_type == "json":
-                return json.loads(raw)
-            return raw
-            
-        except Exception as e:
-            print(f"❌ Erreur téléchargement {file_path}: {e}")
-            return None
-    
     # ==================== Initialisation ====================
     
     @rx.event
@@ -192,6 +188,7 @@ class SimulationState(rx.State):
         self.selected_fiche = ""
         self.selected_fiche_description = ""
         self.fiche_search = ""
+        self.fiche_window_start = 0
         self.fiche_loaded = False
         self.fiche_loading_error = ""
         self.beneficiary_type = ""
@@ -245,13 +242,19 @@ class SimulationState(rx.State):
         return get_fiches_for_prefix(prefix)
     
     @rx.var
-    def filtered_fiches(self) -> List[Dict[str, str]]:
-        """Retourne les fiches filtrées par la recherche."""
-        fiches = self.fiches_list
-        if not self.fiche_search:
-            return fiches
-        search = self.fiche_search.lower()
-        return [f for f in fiches if search in f["code"].lower() or search in f["description"].lower()]
+    def visible_fiches(self) -> List[Dict[str, str]]:
+        """Fenêtre courante des fiches filtrées par la recherche."""
+        return window_slice(_match_fiches(self.fiches_list, self.fiche_search), self.fiche_window_start)
+    
+    @rx.var
+    def filtered_fiches_count(self) -> int:
+        """Nombre de fiches filtrées par la recherche."""
+        return len(_match_fiches(self.fiches_list, self.fiche_search))
+    
+    @rx.var
+    def fiche_window_has_more(self) -> bool:
+        """Des fiches filtrées suivent la fenêtre."""
+        return self.fiche_window_start + WINDOW_SIZE < self.filtered_fiches_count
     
     @rx.var
     def beneficiary_types_list(self) -> List[Dict[str, str]]:
@@ -311,31 +314,25 @@ class SimulationState(rx.State):
         print(f"=== Chargement configuration pour: {fiche_code} ===")
         
         try:
-            # Charger variables_mapping.json (label -> {option_affichée: valeur_réelle})
-            variables_mapping = self._read_file_from_bucket(
-                f"{fiche_code}/variables_mapping.json",
-                "json"
-            )
+            # Configuration partagée (cache in-process devant Supabase Storage)
+            from ..services.config_loader import config_loader
             
-            # Charger variables_matching.json (label_affiché -> param_fonction)
-            variables_matching = self._read_file_from_bucket(
-                f"{fiche_code}/variables_matching.json",
-                "json"
-            )
-            
-            # Charger string_function.txt (code de la fonction)
-            string_function = self._read_file_from_bucket(
-                f"{fiche_code}/string_function.txt",
-                "txt"
-            )
+            fiche_config = await config_loader.load_fiche_config_async(fiche_code)
             
             # Vérifier que les fichiers essentiels sont chargés
-            if not string_function:
+            if not fiche_config or not fiche_config.string_function:
                 self.fiche_loading_error = "Fichier string_function.txt manquant"
                 self.is_loading = False
                 yield rx.toast.error("Cette fiche n'est pas encore configurée", duration=5000)
                 return
             
+            # variables_mapping: label -> {option_affichée: valeur_réelle}
+            # variables_matching: label_affiché -> param_fonction
+            # (copies: la config en cache est partagée entre les sessions)
+            variables_mapping = copy.deepcopy(fiche_config.variables_mapping)
+            variables_matching = dict(fiche_config.variables_matching or {})
+            string_function = fiche_config.string_function
+            
             # Stocker les configurations
             self.simulator_variables_mapping = variables_mapping or {}
             self.simulator_var_matching = variables_matching or {}
@@ -455,23 +452,14 @@ class SimulationState(rx.State):
             label: Le label affiché à l'utilisateur
             value: La valeur sélectionnée par l'utilisateur (option affichée)
         """
-        print(f"📝 set_param: param={param_name}, label={label}, value={value}")
-        
-        # Déterminer la valeur finale
-        final_value = value
+        from ..services.config_loader import option_value
         
-        # Vérifier si un mapping de valeurs existe
-        if label in self.simulator_variables_mapping:
-            mapping = self.simulator_variables_mapping[label]
-            if isinstance(mapping, dict) and value in mapping:
-                final_value = mapping[value]
-                print(f"   Mapping: '{value}' -> {final_value}")
+        print(f"📝 set_param: param={param_name}, label={label}, value={value}")
         
-        # Gérer les booléens
-        if final_value == "Oui":
-            final_value = True
-        elif final_value == "Non":
-            final_value = False
+        # Valeur mappée (et booléens), comme pour les balayages
+        final_value = option_value(self.simulator_variables_mapping.get(label), value)
+        if final_value != value:
+            print(f"   Mapping: '{value}' -> {final_value}")
         
         # Mettre à jour le paramètre
         if param_name in self.simulator_function_params:
@@ -565,6 +553,7 @@ class SimulationState(rx.State):
         self.typology = ""
         self.typology_abbr = ""
         self.selected_fiche = ""
+        self.fiche_window_start = 0
         self.fiche_loaded = False
     
     @rx.event
@@ -573,12 +562,26 @@ class SimulationState(rx.State):
         self.typology = name
         self.typology_abbr = abbr
         self.selected_fiche = ""
+        self.fiche_window_start = 0
         self.fiche_loaded = False
     
     @rx.event
     def set_fiche_search(self, value: str):
         """Met à jour la recherche de fiche."""
         self.fiche_search = value
+        self.fiche_window_start = 0
+    
+    @rx.event
+    def fiche_window_back(self, in_view: bool):
+        """Le défilement atteint les fiches précédant la fenêtre."""
+        if in_view and self.fiche_window_start > 0:
+            self.fiche_window_start = shift_window(self.fiche_window_start, False, self.fiche_window_has_more)
+    
+    @rx.event
+    def fiche_window_forward(self, in_view: bool):
+        """Le défilement atteint les fiches suivant la fenêtre."""
+        if in_view and self.fiche_window_has_more:
+            self.fiche_window_start = shift_window(self.fiche_window_start, True, True)
     
     @rx.event
     async def select_fiche(self, code: str, description: str):
@@ -641,9 +644,18 @@ class SimulationState(rx.State):
             if self.fiche_loaded and self.simulator_string_function:
                 # Calcul avec la fonction dynamique
                 from ..services.function_loader import FunctionLoader
+                from ..services.execution_pool import execution_pool, use_execution_pool
                 
-                func = FunctionLoader(self.simulator_string_function)
-                result = func.call_with_dict(dict(self.simulator_function_params))
+                if use_execution_pool():
+                    # Exécution hors de la boucle d'événements (processus dédiés)
+                    result = await execution_pool.acall(
+                        self.simulator_string_function,
+                        dict(self.simulator_function_params),
+                        fiche_code=self.selected_fiche,
+                    )
+                else:
+                    func = FunctionLoader(self.simulator_string_function, fiche_code=self.selected_fiche)
+                    result = func.call_with_dict(dict(self.simulator_function_params))
                 
                 self.result_cumacs = float(result)
                 self.result_euros = float(result * CEE_CONSTANTS.get("prix_kwh_cumac", 0.0065))
@@ -677,8 +689,92 @@ class SimulationState(rx.State):
             self.is_loading = False
             yield rx.toast.error(f"Erreur de calcul: {str(e)[:50]}", duration=5000)
     
+    @rx.event(background=True)
+    async def run_sensitivity_sweep(self):
+        """
+        Balaye les options des selects et une plage autour de chaque valeur
+        numérique saisie, puis diffuse la progression et les sensibilités
+        au fur et à mesure des lots.
+        """
+        import asyncio
+        from ..services.config_loader import config_loader
+        from ..services.sweep import (
+            SensitivityAccumulator,
+            build_sweep_axes,
+            iter_sweep,
+            numeric_range,
+        )
+        
+        async with self:
+            if self.sweep_running or not self.fiche_loaded:
+                return
+            self.sweep_running = True
+            self.sweep_progress = 0
+            self.sweep_error = ""
+            self.sweep_sensitivities = []
+            fiche_code = self.selected_fiche
+            base_params = dict(self.simulator_function_params)
+            number_params = [field["param_name"] for field in self.number_fields]
+        
+        try:
+            # Plage de -50% à +50% autour des valeurs numériques saisies
+            numeric_ranges = {}
+            for param_name in number_params:
+                value = base_params.get(param_name)
+                if isinstance(value, (int, float)) and value > 0:
+                    numeric_ranges[param_name] = numeric_range(value * 0.5, value * 1.5, 5)
+            
+            config = await config_loader.load_fiche_config_async(fiche_code)
+            if config is None:
+                raise ValueError(f"Fiche introuvable: {fiche_code}")
+            
+            axes = build_sweep_axes(config, numeric_ranges)
+            accumulator = SensitivityAccumulator(axes)
+            chunks = iter_sweep(config, base_params, axes, accumulator)
+            
+            while True:
+                # Calcul hors de la boucle d'événements
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                async with self:
+                    self.sweep_progress = int(100 * chunk.done / max(chunk.total, 1))
+                    self.sweep_sensitivities = [
+                        {
+                            "label": item["label"],
+                            "spread_label": f"{item['spread']:,.0f} kWh cumac".replace(",", " "),
+                            "share": int(100 * item["relative_spread"]),
+                        }
+                        for item in accumulator.sensitivities()
+                    ]
+        
+        except Exception as e:
+            print(f"❌ Erreur analyse de sensibilité: {e}")
+            async with self:
+                self.sweep_error = str(e)
+        
+        async with self:
+            self.sweep_running = False
+    
     # ==================== Sauvegarde ====================
     
+    def _simulation_record(self) -> Dict[str, Any]:
+        """Simulation courante au format de la table simulations (hors user_id)."""
+        return {
+            "name": self.simulation_name,
+            "fiche_code": self.selected_fiche,
+            "fiche_description": self.selected_fiche_description,
+            "sector": self.sector,
+            "typology": self.typology,
+            "department": self.department,
+            "zone_climatique": self.zone_climatique,
+            "date_signature": self.date_signature,
+            "beneficiary_type": self.beneficiary_type,
+            "result_cumacs": self.result_cumacs,
+            "result_euros": self.result_euros,
+            "input_data": json.dumps(self.simulator_function_params),
+        }
+    
     @rx.event
     async def save_and_redirect(self):
         """Sauvegarde la simulation et redirige vers le dashboard."""
@@ -701,21 +797,7 @@ class SimulationState(rx.State):
                     return
                 
                 # Préparer les données
-                simulation_data = {
-                    "user_id": user_id,
-                    "name": self.simulation_name,
-                    "fiche_code": self.selected_fiche,
-                    "fiche_description": self.selected_fiche_description,
-                    "sector": self.sector,
-                    "typology": self.typology,
-                    "department": self.department,
-                    "zone_climatique": self.zone_climatique,
-                    "date_signature": self.date_signature,
-                    "beneficiary_type": self.beneficiary_type,
-                    "result_cumacs": self.result_cumacs,
-                    "result_euros": self.result_euros,
-                    "input_data": json.dumps(self.simulator_function_params),
-                }
+                simulation_data = {"user_id": user_id, **self._simulation_record()}
                 
                 print(f"💾 Sauvegarde simulation pour user: {user_id[:8]}...")
                 
@@ -723,6 +805,9 @@ class SimulationState(rx.State):
                 
                 if response.data:
                     self.simulation_saved = True
+                    # Tableau de bord et profil relisent l'historique
+                    from ..services.simulation_store import simulation_store
+                    simulation_store.invalidate(user_id)
                     print(f"✅ Simulation sauvegardée: ID={response.data[0].get('id', 'N/A')}")
                     yield rx.toast.success("Simulation sauvegardée !", duration=3000)
                 else:
@@ -745,229 +830,36 @@ class SimulationState(rx.State):
     
     @rx.event
     async def export_pdf(self):
-        """Exporte les résultats de la simulation en PDF (compatible production)."""
+        """
+        Exporte les résultats de la simulation en PDF: rendu dans le pool de
+        processus, fichier servi par la route /export/reports (le handler ne
+        renvoie que l'URL). Disponible aussi sans connexion.
+        """
         try:
-            from reportlab.lib.pagesizes import A4
-            from reportlab.lib import colors
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            from reportlab.lib.units import cm
-            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-            from reportlab.lib.enums import TA_CENTER
+            from ..services.pdf_cache import pdf_cache, report_download_url
+            from ..services.pdf_report import ReportUnavailableError, report_filename
             from datetime import datetime
-            import io
-            import base64
-            
-            # Générer le PDF en mémoire (pas sur le disque)
-            buffer = io.BytesIO()
-            
-            # Nom du fichier pour le téléchargement
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            safe_name = "".join(c if c.isalnum() or c in (' ', '-', '_') else '_' for c in (self.simulation_name or "simulation"))[:30]
-            safe_name = safe_name.replace(" ", "_")
-            filename = f"simulation_{safe_name}_{timestamp}.pdf"
-            
-            # Créer le document
-            doc = SimpleDocTemplate(
-                buffer,
-                pagesize=A4,
-                rightMargin=2*cm,
-                leftMargin=2*cm,
-                topMargin=2*cm,
-                bottomMargin=2*cm
-            )
-            
-            # Styles
-            styles = getSampleStyleSheet()
-            
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=24,
-                spaceAfter=30,
-                alignment=TA_CENTER,
-                textColor=colors.HexColor("#1a365d")
-            )
-            
-            subtitle_style = ParagraphStyle(
-                'CustomSubtitle',
-                parent=styles['Normal'],
-                fontSize=12,
-                spaceAfter=20,
-                alignment=TA_CENTER,
-                textColor=colors.HexColor("#718096")
-            )
-            
-            heading_style = ParagraphStyle(
-                'CustomHeading',
-                parent=styles['Heading2'],
-                fontSize=14,
-                spaceBefore=20,
-                spaceAfter=10,
-                textColor=colors.HexColor("#2d3748")
-            )
-            
-            # Contenu du PDF
-            story = []
-            
-            # En-tête
-            story.append(Paragraph("Rapport de Simulation CEE", title_style))
-            story.append(Paragraph(self.simulation_name or "Simulation", subtitle_style))
-            story.append(Paragraph(f"Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}", subtitle_style))
-            story.append(Spacer(1, 20))
-            
-            # Résultats principaux
-            story.append(Paragraph("Résultats de la simulation", heading_style))
+            import secrets
             
-            results_data = [
-                ["Indicateur", "Valeur"],
-                ["Prime CEE estimée", f"{self.result_euros:,.2f} €".replace(",", " ")],
-                ["Volume CEE", f"{self.result_cumacs:,.0f} kWh cumac".replace(",", " ")],
-            ]
-            
-            results_table = Table(results_data, colWidths=[8*cm, 8*cm])
-            results_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#22c55e")),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('TOPPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor("#f0fdf4")),
-                ('FONTSIZE', (0, 1), (-1, -1), 14),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica-Bold'),
-                ('BOTTOMPADDING', (0, 1), (-1, -1), 15),
-                ('TOPPADDING', (0, 1), (-1, -1), 15),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor("#86efac")),
-            ]))
-            story.append(results_table)
-            story.append(Spacer(1, 20))
-            
-            # Détails de l'opération
-            story.append(Paragraph("Détails de l'opération", heading_style))
-            
-            desc = self.selected_fiche_description or "-"
-            if len(desc) > 50:
-                desc = desc[:50] + "..."
-            
-            details_data = [
-                ["Paramètre", "Valeur"],
-                ["Fiche d'opération", self.selected_fiche or "-"],
-                ["Description", desc],
-                ["Secteur", self.sector or "-"],
-                ["Typologie", self.typology or "-"],
-                ["Type de bénéficiaire", self.beneficiary_type or "-"],
-            ]
-            
-            details_table = Table(details_data, colWidths=[6*cm, 10*cm])
-            details_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#5a7a91")),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-                ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-                ('TOPPADDING', (0, 0), (-1, -1), 8),
-                ('BACKGROUND', (0, 1), (0, -1), colors.HexColor("#f1f5f9")),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor("#cbd5e1")),
-            ]))
-            story.append(details_table)
-            story.append(Spacer(1, 20))
-            
-            # Localisation
-            story.append(Paragraph("Localisation et date", heading_style))
-            
-            location_data = [
-                ["Paramètre", "Valeur"],
-                ["Département", self.department or "-"],
-                ["Zone climatique", self.zone_climatique or "-"],
-                ["Date de signature", self.date_signature or "-"],
-            ]
-            
-            location_table = Table(location_data, colWidths=[6*cm, 10*cm])
-            location_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#5a7a91")),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-                ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-                ('TOPPADDING', (0, 0), (-1, -1), 8),
-                ('BACKGROUND', (0, 1), (0, -1), colors.HexColor("#f1f5f9")),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor("#cbd5e1")),
-            ]))
-            story.append(location_table)
-            story.append(Spacer(1, 20))
-            
-            # Paramètres de calcul (si disponibles)
-            if self.simulator_function_params:
-                story.append(Paragraph("Paramètres de calcul", heading_style))
-                
-                params_data = [["Paramètre", "Valeur"]]
-                for key, value in self.simulator_function_params.items():
-                    param_name = key.replace("_", " ").title()
-                    params_data.append([param_name, str(value)])
-                
-                params_table = Table(params_data, colWidths=[6*cm, 10*cm])
-                params_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#5a7a91")),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                    ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-                    ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 10),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-                    ('TOPPADDING', (0, 0), (-1, -1), 8),
-                    ('BACKGROUND', (0, 1), (0, -1), colors.HexColor("#f1f5f9")),
-                    ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor("#cbd5e1")),
-                ]))
-                story.append(params_table)
-                story.append(Spacer(1, 20))
-            
-            # Note de bas de page
-            story.append(Spacer(1, 30))
-            footer_style = ParagraphStyle(
-                'Footer',
-                parent=styles['Normal'],
-                fontSize=8,
-                textColor=colors.HexColor("#718096"),
-                alignment=TA_CENTER
-            )
-            story.append(Paragraph(
-                "Ce document est une estimation indicative. Le montant réel de la prime CEE peut varier "
-                "en fonction des conditions du marché et des critères d'éligibilité. "
-                "Prix unitaire utilisé : 0,0065 €/kWh cumac.",
-                footer_style
-            ))
-            story.append(Paragraph(
-                f"Document généré par RDE Consulting - {datetime.now().strftime('%d/%m/%Y %H:%M')}",
-                footer_style
-            ))
-            
-            # Construire le PDF en mémoire
-            doc.build(story)
-            
-            # Récupérer les bytes du PDF
-            pdf_bytes = buffer.getvalue()
-            buffer.close()
+            # Le simulateur est ouvert sans connexion: un visiteur anonyme
+            # reçoit un jeton lié à son onglet (client_token Reflex)
+            user_id = await self._get_authenticated_user_id()
+            if not user_id:
+                user_id = f"anon:{self.router.session.client_token or secrets.token_hex(8)}"
             
-            # Encoder en base64 pour le téléchargement
-            pdf_base64 = base64.b64encode(pdf_bytes).decode('utf-8')
+            now = datetime.now()
+            # Simulation en cours: datée de l'export (affichée dans le rapport)
+            record = {**self._simulation_record(), "created_at": now.isoformat()}
+            filename = report_filename(record, timestamp=now)
+            key = await pdf_cache.ensure_report(record, shared=False)
             
-            print(f"✅ PDF généré en mémoire: {len(pdf_bytes)} bytes")
+            print(f"✅ PDF généré: {filename}")
             yield rx.toast.success("PDF généré avec succès !", duration=3000)
+            yield rx.download(url=report_download_url(key, user_id, filename, shared=False), filename=filename)
             
-            # Télécharger directement depuis la mémoire
-            yield rx.download(
-                data=f"data:application/pdf;base64,{pdf_base64}",
-                filename=filename
-            )
-            
-        except ImportError as e:
+        except ReportUnavailableError as e:
             print(f"❌ Module manquant: {e}")
-            yield rx.toast.error("Module PDF non disponible. Installez: pip install reportlab", duration=5000)
+            yield rx.toast.error(str(e), duration=5000)
         except Exception as e:
             print(f"❌ Erreur export PDF: {e}")
             import traceback
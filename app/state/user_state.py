@@ -2,19 +2,36 @@
 État de gestion du profil utilisateur et du dashboard.
 """
 
+import os
+import asyncio
+
 import reflex as rx
 from typing import List, Dict, Any
-from datetime import datetime
 
 from .auth_state import AuthState
+from .virtual_window import WINDOW_SIZE, WINDOW_STEP, shift_window
+from ..services.simulation_repository import (
+    simulation_repository,
+    SimulationFilters,
+    SimulationKpis,
+    SimulationPage,
+    SORT_COLUMNS,
+)
+from ..services.simulation_store import simulation_store
+
+
+# Délai de regroupement des événements de filtre (ms): une rafale de frappes
+# ou de changements de filtres ne déclenche qu'un seul rechargement
+FILTER_DEBOUNCE_MS = int(os.getenv("FILTER_DEBOUNCE_MS", "300"))
 
 
 class UserState(AuthState):
     """État utilisateur étendu avec gestion du dashboard et profil."""
     
     # ==================== Dashboard ====================
+    # Fenêtre visible uniquement (filtres, tri et pagination côté Supabase)
     simulations: List[Dict[str, Any]] = []
-    filtered_simulations: List[Dict[str, Any]] = []
+    filtered_count: int = 0
     
     # Filtres
     filter_date_start: str = ""
@@ -22,11 +39,16 @@ class UserState(AuthState):
     filter_sector: str = ""
     filter_typology: str = ""
     filter_search: str = ""
+    available_sectors: List[str] = []
+    available_typologies: List[str] = []
+    # Génération des filtres: seul le dernier événement d'une rafale recharge
+    _filter_generation: int = 0
     
-    # Pagination
-    page_size: int = 10
-    current_page: int = 1
-    total_pages: int = 1
+    # Fenêtre du tableau virtualisé
+    window_start: int = 0
+    window_has_more: bool = False
+    # Clé keyset des positions déjà atteintes {position: [valeur de tri, id]}
+    _window_keys: Dict[int, List[Any]] = {}
     
     # Tri
     sort_column: str = "created_at"
@@ -65,232 +87,225 @@ class UserState(AuthState):
     
     # ==================== Dashboard Methods ====================
     
+    @staticmethod
+    def _format_simulation(sim: Dict[str, Any]) -> Dict[str, Any]:
+        """Format d'une ligne du tableau (projection "list")."""
+        return {
+            "id": sim.get("id", ""),
+            "name": sim.get("name", "Sans nom"),
+            "created_at": sim.get("created_at", ""),
+            "signature_date": sim.get("date_signature", ""),
+            "department": sim.get("department", ""),
+            "sector": sim.get("sector", ""),
+            "typology": sim.get("typology", ""),
+            "fiche_code": sim.get("fiche_code", ""),
+            "fiche_description": sim.get("fiche_description", ""),
+            "beneficiary_type": sim.get("beneficiary_type", ""),
+            "result_cumacs": sim.get("result_cumacs", 0) or 0,
+            "result_euros": sim.get("result_euros", 0) or 0,
+        }
+    
     @rx.event
     async def load_simulations(self):
-        """Charge les simulations de l'utilisateur depuis Supabase."""
+        """Charge les KPIs puis la première fenêtre des simulations de l'utilisateur."""
         if not self.user_id:
             print("⚠️ Pas de user_id pour charger les simulations")
             self.simulations = []
-            self._apply_filters()
-            self._calculate_kpis()
+            self.filtered_count = 0
+            self.window_start = 0
+            self.window_has_more = False
+            self._calculate_kpis(SimulationKpis())
             return
         
-        try:
-            client = self._get_supabase_client()
-            
-            if client:
-                response = client.table("simulations")\
-                    .select("*")\
-                    .eq("user_id", self.user_id)\
-                    .order("created_at", desc=True)\
-                    .execute()
-                
-                if response.data:
-                    self.simulations = [
-                        {
-                            "id": sim.get("id", ""),
-                            "name": sim.get("name", "Sans nom"),
-                            "created_at": sim.get("created_at", ""),
-                            "signature_date": sim.get("date_signature", ""),
-                            "department": sim.get("department", ""),
-                            "sector": sim.get("sector", ""),
-                            "typology": sim.get("typology", ""),
-                            "fiche_code": sim.get("fiche_code", ""),
-                            "fiche_description": sim.get("fiche_description", ""),
-                            "beneficiary_type": sim.get("beneficiary_type", ""),
-                            "result_cumacs": sim.get("result_cumacs", 0) or 0,
-                            "result_euros": sim.get("result_euros", 0) or 0,
-                            "input_data": sim.get("input_data", ""),
-                        }
-                        for sim in response.data
-                    ]
-                    print(f"✅ {len(self.simulations)} simulations chargées pour le profil")
-                else:
-                    self.simulations = []
-                    print("ℹ️ Aucune simulation trouvée")
-            else:
-                print("⚠️ Client Supabase non disponible")
-                self.simulations = []
-            
-            self._apply_filters()
-            self._calculate_kpis()
-                
-        except Exception as e:
-            print(f"❌ Erreur chargement simulations: {e}")
-            self.simulations = []
-            self._apply_filters()
-            self._calculate_kpis()
-    
-    def _apply_filters(self):
-        """Applique les filtres aux simulations."""
-        filtered = self.simulations.copy()
-        
-        # Filtre par date
-        if self.filter_date_start:
-            try:
-                start = datetime.fromisoformat(self.filter_date_start.replace("Z", "+00:00").replace("+00:00", ""))
-                filtered = [
-                    s for s in filtered
-                    if s["created_at"] and datetime.fromisoformat(s["created_at"].replace("Z", "+00:00").replace("+00:00", "")) >= start
-                ]
-            except:
-                pass
-        
-        if self.filter_date_end:
-            try:
-                end = datetime.fromisoformat(self.filter_date_end.replace("Z", "+00:00").replace("+00:00", ""))
-                filtered = [
-                    s for s in filtered
-                    if s["created_at"] and datetime.fromisoformat(s["created_at"].replace("Z", "+00:00").replace("+00:00", "")) <= end
-                ]
-            except:
-                pass
-        
-        # Filtre par secteur
-        if self.filter_sector:
-            filtered = [s for s in filtered if s.get("sector") == self.filter_sector]
-        
-        # Filtre par typologie
-        if self.filter_typology:
-            filtered = [s for s in filtered if s.get("typology") == self.filter_typology]
+        # Requêtes Supabase bloquantes: hors de la boucle d'événements
+        self._calculate_kpis(await asyncio.to_thread(simulation_store.kpis, self.user_id))
+        await self._apply_filters()
+        print(f"✅ {len(self.simulations)}/{self.filtered_count} simulations chargées pour le profil")
+    
+    async def _apply_filters(self):
+        """Filtres ou tri modifiés: recompte et revient au début du tableau."""
+        # Rend caduc un rechargement regroupé en attente
+        self._filter_generation += 1
+        self.window_start = 0
+        self._window_keys = {}
+        await self._load_window(with_count=True)
+    
+    async def _load_window(self, with_count: bool = False):
+        """Récupère la fenêtre courante (keyset si la clé de sa position est connue, sinon offset)."""
+        if not self.user_id:
+            return
+        start = self.window_start
+        page = await asyncio.to_thread(simulation_store.page, **self._window_query(with_count))
+        self._show_window(start, page, with_count)
+    
+    def _window_query(self, with_count: bool) -> Dict[str, Any]:
+        """Paramètres de simulation_store.page pour la fenêtre courante."""
+        return {
+            "user_id": self.user_id,
+            "filters": SimulationFilters(
+                date_start=self.filter_date_start,
+                date_end=self.filter_date_end,
+                sector=self.filter_sector,
+                typology=self.filter_typology,
+                search=self.filter_search,
+            ),
+            "sort_column": self.sort_column,
+            "descending": self.sort_direction == "desc",
+            "page_size": WINDOW_SIZE,
+            "after": self._window_keys.get(self.window_start),
+            "offset": self.window_start,
+            "with_count": with_count,
+        }
+    
+    def _show_window(self, start: int, page: SimulationPage, with_count: bool):
+        """Affiche une fenêtre commençant à la position start."""
+        self.simulations = [self._format_simulation(sim) for sim in page.rows]
+        self.window_has_more = page.has_more
         
-        # Recherche textuelle
-        if self.filter_search:
-            search = self.filter_search.lower()
-            filtered = [
-                s for s in filtered
-                if search in (s.get("name") or "").lower()
-                or search in (s.get("fiche_code") or "").lower()
-                or search in (s.get("fiche_description") or "").lower()
-                or search in (s.get("department") or "").lower()
-            ]
+        # Clés des positions où la fenêtre pourra commencer ensuite
+        column = SORT_COLUMNS.get(self.sort_column, "created_at")
+        keys = {
+            start + i: [page.rows[i - 1].get(column), page.rows[i - 1].get("id")]
+            for i in range(WINDOW_STEP, len(page.rows) + 1, WINDOW_STEP)
+        }
+        if keys:
+            self._window_keys = {**self._window_keys, **keys}
         
-        # Tri
-        reverse = self.sort_direction == "desc"
-        if self.sort_column in ["created_at", "signature_date"]:
-            filtered.sort(key=lambda x: x.get(self.sort_column) or "", reverse=reverse)
-        elif self.sort_column in ["result_cumacs", "result_euros"]:
-            filtered.sort(key=lambda x: float(x.get(self.sort_column) or 0), reverse=reverse)
+        if page.total is not None:
+            self.filtered_count = page.total
+        elif with_count or not page.has_more:
+            # Comptage indisponible: total découvert au fil du défilement
+            self.filtered_count = start + len(page.rows)
         else:
-            filtered.sort(key=lambda x: str(x.get(self.sort_column) or "").lower(), reverse=reverse)
+            self.filtered_count = max(self.filtered_count, start + len(page.rows))
+    
+    def _calculate_kpis(self, kpis: SimulationKpis):
+        """Met à jour les KPIs du dashboard (agrégés par la base)."""
+        self.total_simulations = kpis.total_count
+        self.simulations_this_month = kpis.this_month_count
+        self.average_result = kpis.average_euros
+        self.last_simulation_date = (kpis.last_created_at or "")[:10]
         
-        self.filtered_simulations = filtered
-        self.total_pages = max(1, (len(filtered) + self.page_size - 1) // self.page_size)
-        self.current_page = min(self.current_page, self.total_pages)
+        # Listes des filtres
+        self.available_sectors = [b["key"] for b in kpis.by_sector if b.get("key")]
+        self.available_typologies = [b["key"] for b in kpis.by_typology if b.get("key")]
     
-    def _calculate_kpis(self):
-        """Calcule les KPIs du dashboard."""
-        self.total_simulations = len(self.simulations)
-        
-        # Simulations ce mois
-        now = datetime.now()
-        first_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        self.simulations_this_month = 0
-        for s in self.simulations:
-            try:
-                if s.get("created_at"):
-                    created = s["created_at"]
-                    if isinstance(created, str):
-                        created = datetime.fromisoformat(created.replace("Z", "+00:00").replace("+00:00", ""))
-                    if created >= first_of_month:
-                        self.simulations_this_month += 1
-            except:
-                pass
+    # ==================== Filtres ====================
+    
+    def _schedule_filters(self, delay_ms: int = FILTER_DEBOUNCE_MS):
+        """Planifie un rechargement regroupé (voir apply_filters_debounced)."""
+        self._filter_generation += 1
+        return UserState.apply_filters_debounced(self._filter_generation, delay_ms)
+    
+    @rx.event(background=True)
+    async def apply_filters_debounced(self, generation: int, delay_ms: int):
+        """
+        Recharge le début du tableau une fois la rafale d'événements terminée:
+        chaque changement de filtre incrémente la génération, seul le dernier
+        (génération inchangée après le délai) interroge le store. Le verrou de
+        l'état n'est tenu que pour lire les filtres et écrire la fenêtre.
+        """
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+        async with self:
+            if generation != self._filter_generation or not self.user_id:
+                return
+            self.window_start = 0
+            self._window_keys = {}
+            query = self._window_query(with_count=True)
         
-        # Moyenne des résultats
-        if self.simulations:
-            total = sum(s.get("result_euros") or 0 for s in self.simulations)
-            self.average_result = total / len(self.simulations)
-        else:
-            self.average_result = 0.0
+        page = await asyncio.to_thread(simulation_store.page, **query)
         
-        # Dernière simulation
-        if self.simulations:
-            try:
-                sorted_sims = sorted(
-                    self.simulations,
-                    key=lambda x: x.get("created_at") or "",
-                    reverse=True
-                )
-                if sorted_sims and sorted_sims[0].get("created_at"):
-                    self.last_simulation_date = sorted_sims[0]["created_at"][:10]
-                else:
-                    self.last_simulation_date = ""
-            except:
-                self.last_simulation_date = ""
-        else:
-            self.last_simulation_date = ""
-    
-    # ==================== Filtres ====================
+        async with self:
+            # Filtres modifiés ou tableau déplacé pendant la requête
+            if generation != self._filter_generation or self.window_start != 0:
+                return
+            self._show_window(0, page, with_count=True)
     
     @rx.event
     def set_filter_date_start(self, value: str):
         self.filter_date_start = value
-        self._apply_filters()
+        return self._schedule_filters()
     
     @rx.event
     def set_filter_date_end(self, value: str):
         self.filter_date_end = value
-        self._apply_filters()
+        return self._schedule_filters()
     
     @rx.event
     def set_filter_sector(self, value: str):
         self.filter_sector = value
-        self._apply_filters()
+        return self._schedule_filters()
     
     @rx.event
     def set_filter_typology(self, value: str):
         self.filter_typology = value
-        self._apply_filters()
+        return self._schedule_filters()
     
     @rx.event
     def set_filter_search(self, value: str):
+        # Frappes déjà regroupées côté client (rx.debounce_input): pas de second délai
         self.filter_search = value
-        self._apply_filters()
+        return self._schedule_filters(delay_ms=0)
     
     @rx.event
-    def clear_filters(self):
-        """Réinitialise tous les filtres."""
+    async def clear_filters(self):
+        """Réinitialise tous les filtres (rechargement immédiat)."""
         self.filter_date_start = ""
         self.filter_date_end = ""
         self.filter_sector = ""
         self.filter_typology = ""
         self.filter_search = ""
-        self._apply_filters()
-    
-    # ==================== Pagination ====================
+        await self._apply_filters()
     
-    @rx.event
-    def set_page_size(self, value: str):
-        self.page_size = int(value)
-        self.current_page = 1
-        self._apply_filters()
+    # ==================== Fenêtre du tableau ====================
     
     @rx.event
-    def go_to_page(self, page: int):
-        self.current_page = max(1, min(page, self.total_pages))
+    async def window_back(self, in_view: bool):
+        """Le défilement atteint les lignes précédant la fenêtre."""
+        if in_view and self.window_start > 0:
+            self.window_start = shift_window(self.window_start, False, self.window_has_more)
+            await self._load_window()
     
     @rx.event
-    def next_page(self):
-        if self.current_page < self.total_pages:
-            self.current_page += 1
-    
-    @rx.event
-    def previous_page(self):
-        if self.current_page > 1:
-            self.current_page -= 1
+    async def window_forward(self, in_view: bool):
+        """Le défilement atteint les lignes suivant la fenêtre."""
+        if in_view and self.window_has_more:
+            self.window_start = shift_window(self.window_start, True, self.window_has_more)
+            await self._load_window()
     
     # ==================== Tri ====================
     
     @rx.event
-    def sort_by(self, column: str):
+    async def sort_by(self, column: str):
         if self.sort_column == column:
             self.sort_direction = "asc" if self.sort_direction == "desc" else "desc"
         else:
             self.sort_column = column
             self.sort_direction = "desc"
-        self._apply_filters()
+        await self._apply_filters()
+    
+    # ==================== Suppression ====================
+    
+    @rx.event
+    async def delete_simulation(self, simulation_id: str):
+        """Supprime une simulation puis recharge les KPIs et la fenêtre courante."""
+        if not self.user_id:
+            return
+        
+        deleted = await asyncio.to_thread(simulation_repository.delete_simulation, self.user_id, simulation_id)
+        if not deleted:
+            yield rx.toast.error("Erreur lors de la suppression", duration=3000)
+            return
+        
+        simulation_store.invalidate(self.user_id)
+        self._calculate_kpis(await asyncio.to_thread(simulation_store.kpis, self.user_id))
+        # Reste à la même position du tableau si elle existe encore
+        self._window_keys = {}
+        await self._load_window(with_count=True)
+        if self.window_start > 0 and not self.simulations:
+            await self._apply_filters()
+        yield rx.toast.success("Simulation supprimée", duration=3000)
     
     # ==================== Profil ====================
     
@@ -376,35 +391,16 @@ class UserState(AuthState):
     # ==================== Computed vars ====================
     # Note: initials et display_name sont hérités de AuthState
     
-    @rx.var
-    def paginated_simulations(self) -> List[Dict[str, Any]]:
-        """Retourne les simulations de la page courante."""
-        start = (self.current_page - 1) * self.page_size
-        end = start + self.page_size
-        return self.filtered_simulations[start:end]
-    
     @rx.var
     def has_simulations(self) -> bool:
         """Vérifie s'il y a des simulations."""
-        return len(self.simulations) > 0
+        return self.total_simulations > 0
     
     @rx.var
     def formatted_average_result(self) -> str:
         """Moyenne formatée en euros."""
         return f"{self.average_result:,.2f} €".replace(",", " ")
     
-    @rx.var
-    def available_sectors(self) -> List[str]:
-        """Liste des secteurs uniques dans les simulations."""
-        sectors = set(s.get("sector") for s in self.simulations if s.get("sector"))
-        return sorted(list(sectors))
-    
-    @rx.var
-    def available_typologies(self) -> List[str]:
-        """Liste des typologies uniques dans les simulations."""
-        typologies = set(s.get("typology") for s in self.simulations if s.get("typology"))
-        return sorted(list(typologies))
-    
     @rx.var
     def total_simulations_str(self) -> str:
         """Nombre total de simulations en string."""
@@ -0,0 +1,32 @@
+"""
+Fenêtres glissantes des listes virtualisées (voir components/virtual_list.py).
+
+Un état n'envoie au navigateur qu'une fenêtre de WINDOW_SIZE lignes à partir
+de window_start; le composant réserve la hauteur des lignes hors fenêtre et
+signale l'arrivée du défilement sur ces zones. La fenêtre se décale alors de
+WINDOW_STEP lignes: window_start reste un multiple de WINDOW_STEP.
+"""
+
+# Lignes envoyées par fenêtre
+WINDOW_SIZE = 48
+# Décalage de la fenêtre à chaque arrivée sur une zone réservée
+WINDOW_STEP = 24
+
+
+def shift_window(start: int, forward: bool, has_more: bool) -> int:
+    """
+    Nouveau début de fenêtre.
+
+    Args:
+        start: Début courant
+        forward: True pour avancer, False pour reculer
+        has_more: Des lignes existent après la fenêtre courante
+    """
+    if forward:
+        return start + WINDOW_STEP if has_more else start
+    return max(0, start - WINDOW_STEP)
+
+
+def window_slice(items: list, start: int) -> list:
+    """Lignes de la fenêtre commençant à start."""
+    return items[start:start + WINDOW_SIZE]
@@ -0,0 +1,3 @@
+"""
+Outils en ligne de commande (maintenance du bucket fiches-operations).
+"""
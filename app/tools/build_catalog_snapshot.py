@@ -0,0 +1,89 @@
+"""
+Construit le snapshot du catalogue (voir services/catalog_snapshot.py)
+et le publie éventuellement dans le bucket fiches-operations.
+
+Usage:
+    python -m app.tools.build_catalog_snapshot                  # data/catalog_snapshot.bin
+    python -m app.tools.build_catalog_snapshot -o /tmp/cat.bin
+    python -m app.tools.build_catalog_snapshot --upload         # publie pour les instances
+"""
+
+import argparse
+import sys
+from typing import Dict, List
+
+from ..data.variables import DEPARTEMENTS_FRANCE, ZONES_CLIMATIQUES
+from ..services.supabase_client import upload_file_to_bucket, BUCKET_NAME
+from ..services.config_loader import ConfigLoader
+from ..services.fiche_bundle import pack_bundle
+from ..services.prewarm import list_catalog_fiche_codes
+from ..services.catalog_snapshot import (
+    CATALOG_SNAPSHOT_PATH,
+    CATALOG_SNAPSHOT_OBJECT,
+    build_snapshot,
+)
+
+
+def collect_bundles(codes: List[str]) -> Dict[str, bytes]:
+    """Télécharge la configuration de chaque fiche et la réencode en bundle."""
+    bundles = {}
+    for code in codes:
+        config = ConfigLoader.fetch_fiche_config(code)
+        if config is None:
+            print(f"⚠️ Fiche ignorée: {code}")
+            continue
+        bundles[code] = pack_bundle(code, {
+            "function_param_values": config.function_param_values,
+            "variables_mapping": config.variables_mapping,
+            "variables_matching": config.variables_matching,
+            "string_function": config.string_function,
+        })
+    return bundles
+
+
+def collect_catalog() -> dict:
+    """Secteurs, typologies et fiches tels que servis par ConfigLoader."""
+    sectors = ConfigLoader.load_sectors()
+    sector_typology_map = ConfigLoader.get_sector_typology_map()
+
+    typologies = {"": ConfigLoader.load_typologies("")}
+    fiches = {}
+    for sector in sectors:
+        name = sector.get("value") or sector.get("label", "")
+        typologies[name] = ConfigLoader.load_typologies(name)
+        for typology_abbr in sector_typology_map.get(name, {}).values():
+            fiches.update(ConfigLoader.load_fiches(sector.get("abbr", ""), typology_abbr))
+
+    return {"sectors": sectors, "typologies": typologies, "fiches": fiches}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Construit le snapshot du catalogue des fiches")
+    parser.add_argument("-o", "--output", default=CATALOG_SNAPSHOT_PATH, help="Fichier de sortie")
+    parser.add_argument("--upload", action="store_true", help="Publie le snapshot dans le bucket")
+    args = parser.parse_args(argv)
+
+    codes = list_catalog_fiche_codes()
+    bundles = collect_bundles(codes)
+    if not bundles:
+        print("❌ Aucune fiche chargée, snapshot non construit")
+        return 1
+
+    version = build_snapshot(
+        args.output,
+        bundles=bundles,
+        departements=DEPARTEMENTS_FRANCE,
+        zones_climatiques=ZONES_CLIMATIQUES,
+        **collect_catalog(),
+    )
+    print(f"✅ Snapshot {version}: {len(bundles)}/{len(codes)} fiche(s) → {args.output}")
+
+    if args.upload:
+        with open(args.output, "rb") as f:
+            if not upload_file_to_bucket(BUCKET_NAME, CATALOG_SNAPSHOT_OBJECT, f.read(), upsert=True):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
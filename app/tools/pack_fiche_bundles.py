@@ -0,0 +1,90 @@
+"""
+Construit les bundles des fiches (bundle.json.gz) à partir des 4 fichiers
+historiques et les publie dans le bucket fiches-operations.
+
+Usage:
+    python -m app.tools.pack_fiche_bundles                 # toutes les fiches
+    python -m app.tools.pack_fiche_bundles BAR-TH-104 ...  # fiches choisies
+    python -m app.tools.pack_fiche_bundles --dry-run       # sans upload
+"""
+
+import argparse
+import sys
+from typing import List
+
+from ..services.supabase_client import (
+    read_file_from_bucket,
+    get_file_validators,
+    upload_file_to_bucket,
+    BUCKET_NAME,
+)
+from ..services.fiche_bundle import (
+    BUNDLE_CONTENT_TYPE,
+    bundle_path,
+    legacy_files,
+    pack_bundle,
+    source_validators,
+)
+from ..services.prewarm import list_catalog_fiche_codes
+
+
+def pack_fiche(fiche_code: str, dry_run: bool = False) -> bool:
+    """
+    Construit (et publie) le bundle d'une fiche.
+
+    Returns:
+        True si le bundle a été construit (et uploadé)
+    """
+    # Validateurs lus avant le contenu: un fichier modifié entre les deux
+    # rend le bundle périmé plutôt que de masquer la modification
+    validators = get_file_validators(BUCKET_NAME, fiche_code)
+    if validators is None:
+        print(f"❌ Listing impossible pour {fiche_code}")
+        return False
+
+    files = {
+        key: read_file_from_bucket(BUCKET_NAME, path, file_type)
+        for key, (path, file_type) in legacy_files(fiche_code).items()
+    }
+
+    try:
+        bundle = pack_bundle(fiche_code, files, source_validators(validators))
+    except ValueError as e:
+        print(f"❌ {e}")
+        return False
+
+    print(f"📦 {fiche_code}: bundle de {len(bundle)} bytes")
+    if dry_run:
+        return True
+
+    return upload_file_to_bucket(
+        BUCKET_NAME,
+        bundle_path(fiche_code),
+        bundle,
+        BUNDLE_CONTENT_TYPE,
+        upsert=True,
+    )
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Construit les bundles des fiches CEE")
+    parser.add_argument("codes", nargs="*", help="Codes des fiches (toutes si vide)")
+    parser.add_argument("--dry-run", action="store_true", help="Construit sans uploader")
+    args = parser.parse_args(argv)
+
+    codes = args.codes or list_catalog_fiche_codes()
+    if not codes:
+        print("⚠️ Aucune fiche à traiter")
+        return 1
+
+    failed = [code for code in codes if not pack_fiche(code, args.dry_run)]
+
+    print(f"✅ {len(codes) - len(failed)}/{len(codes)} bundle(s) construits")
+    if failed:
+        print(f"❌ Échecs: {', '.join(failed)}")
+    # Les instances en cours rechargeront les fiches à la revalidation (ETag)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
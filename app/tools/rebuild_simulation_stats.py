@@ -0,0 +1,79 @@
+"""
+Recalcule les agrégats user_simulation_stats à partir de la table simulations
+et vérifie éventuellement qu'ils correspondent à un calcul complet.
+
+Usage:
+    python -m app.tools.rebuild_simulation_stats                  # tous les utilisateurs
+    python -m app.tools.rebuild_simulation_stats USER_ID ...      # utilisateurs choisis
+    python -m app.tools.rebuild_simulation_stats --verify USER_ID # compare sans recalculer
+"""
+
+import argparse
+import sys
+from typing import List
+
+from ..services.simulation_repository import aggregate_kpis, simulation_repository
+
+
+# Champs comparés entre les agrégats et le calcul complet
+VERIFIED_FIELDS = ["total_count", "total_euros", "total_cumacs", "this_month_count", "by_sector", "by_month", "by_fiche"]
+
+
+def _normalize(value):
+    """Arrondit les montants (sommes flottantes calculées dans un ordre différent)."""
+    if isinstance(value, float):
+        return round(value, 2)
+    if isinstance(value, list):
+        return [{k: _normalize(v) for k, v in item.items()} for item in value]
+    return value
+
+
+def verify_user(user_id: str) -> bool:
+    """
+    Compare les KPIs issus des agrégats à un calcul complet sur l'historique.
+
+    Returns:
+        True si les valeurs sont identiques
+    """
+    stored = simulation_repository.fetch_kpis(user_id)
+    expected = aggregate_kpis(simulation_repository.fetch_summary(user_id))
+
+    differences = [
+        name for name in VERIFIED_FIELDS
+        if _normalize(getattr(stored, name)) != _normalize(getattr(expected, name))
+    ]
+    if differences:
+        print(f"❌ {user_id}: écarts sur {', '.join(differences)}")
+        return False
+    print(f"✅ {user_id}: {stored.total_count} simulation(s), agrégats cohérents")
+    return True
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Recalcule les agrégats des simulations")
+    parser.add_argument("users", nargs="*", help="IDs des utilisateurs (tous si vide)")
+    parser.add_argument("--verify", action="store_true", help="Compare sans recalculer")
+    args = parser.parse_args(argv)
+
+    if args.verify:
+        if not args.users:
+            print("⚠️ --verify nécessite au moins un ID utilisateur")
+            return 1
+        failed = [user_id for user_id in args.users if not verify_user(user_id)]
+        return 1 if failed else 0
+
+    failed = []
+    for user_id in args.users or [None]:
+        rows = simulation_repository.rebuild_stats(user_id)
+        if rows is None:
+            failed.append(user_id or "tous")
+        else:
+            print(f"🔄 {user_id or 'Tous les utilisateurs'}: {rows} compartiment(s) recalculé(s)")
+
+    if failed:
+        print(f"❌ Échecs: {', '.join(failed)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
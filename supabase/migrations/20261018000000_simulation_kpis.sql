@@ -0,0 +1,58 @@
+-- Indicateurs de l'historique des simulations calculés par la base.
+-- Le tableau de bord et le profil lisent un seul objet JSON par utilisateur
+-- au lieu de télécharger tout l'historique.
+
+-- Index utilisé par les KPIs et par la pagination de l'historique
+create index if not exists simulations_user_id_created_at_idx
+    on public.simulations (user_id, created_at desc);
+
+create or replace function public.simulation_kpis(p_user_id public.simulations.user_id%type)
+returns jsonb
+language sql
+stable
+as $$
+    with sims as (
+        select
+            created_at,
+            coalesce(result_euros, 0) as euros,
+            coalesce(result_cumacs, 0) as cumacs,
+            coalesce(sector, '') as sector,
+            coalesce(typology, '') as typology,
+            to_char(date_trunc('month', created_at), 'YYYY-MM') as month
+        from public.simulations
+        where user_id = p_user_id
+    ),
+    totals as (
+        select
+            count(*) as total_count,
+            coalesce(sum(euros), 0) as total_euros,
+            coalesce(sum(cumacs), 0) as total_cumacs,
+            coalesce(avg(euros), 0) as average_euros,
+            count(*) filter (where created_at >= date_trunc('month', now())) as this_month_count,
+            max(created_at) as last_created_at
+        from sims
+    )
+    select jsonb_build_object(
+        'total_count', totals.total_count,
+        'total_euros', totals.total_euros,
+        'total_cumacs', totals.total_cumacs,
+        'average_euros', totals.average_euros,
+        'this_month_count', totals.this_month_count,
+        'last_created_at', totals.last_created_at,
+        'by_sector', coalesce((
+            select jsonb_agg(jsonb_build_object('key', sector, 'count', n, 'euros', e, 'cumacs', c) order by sector)
+            from (select sector, count(*) as n, sum(euros) as e, sum(cumacs) as c from sims group by sector) as t
+        ), '[]'::jsonb),
+        'by_typology', coalesce((
+            select jsonb_agg(jsonb_build_object('key', typology, 'count', n, 'euros', e, 'cumacs', c) order by typology)
+            from (select typology, count(*) as n, sum(euros) as e, sum(cumacs) as c from sims group by typology) as t
+        ), '[]'::jsonb),
+        'by_month', coalesce((
+            select jsonb_agg(jsonb_build_object('key', month, 'count', n, 'euros', e, 'cumacs', c) order by month)
+            from (select month, count(*) as n, sum(euros) as e, sum(cumacs) as c from sims group by month) as t
+        ), '[]'::jsonb)
+    )
+    from totals;
+$$;
+
+grant execute on function public.simulation_kpis to authenticated, service_role;
@@ -0,0 +1,198 @@
+-- Agrégats par utilisateur maintenus au fil de l'eau (user_simulation_stats).
+-- Chaque insertion / suppression / modification d'une simulation met à jour
+-- un seul compartiment (mois, secteur, typologie, fiche): la lecture des KPIs
+-- ne dépend plus de la taille de l'historique.
+
+create table if not exists public.user_simulation_stats (
+    user_id public.simulations.user_id%type not null,
+    month text not null,                 -- AAAA-MM
+    sector text not null default '',
+    typology text not null default '',
+    fiche_code text not null default '',
+    simulation_count bigint not null default 0,
+    total_euros double precision not null default 0,
+    total_cumacs double precision not null default 0,
+    last_created_at timestamptz,
+    primary key (user_id, month, sector, typology, fiche_code)
+);
+
+alter table public.user_simulation_stats enable row level security;
+
+drop policy if exists "user_simulation_stats_select_own" on public.user_simulation_stats;
+create policy "user_simulation_stats_select_own" on public.user_simulation_stats
+    for select using (user_id::text = auth.uid()::text);
+
+
+-- Ajoute (p_sign = 1) ou retire (p_sign = -1) une simulation de son compartiment
+create or replace function public.apply_simulation_stats(rec public.simulations, p_sign integer)
+returns void
+language plpgsql
+as $$
+declare
+    v_month text := to_char(date_trunc('month', rec.created_at), 'YYYY-MM');
+    v_sector text := coalesce(rec.sector, '');
+    v_typology text := coalesce(rec.typology, '');
+    v_fiche text := coalesce(rec.fiche_code, '');
+begin
+    if p_sign > 0 then
+        insert into public.user_simulation_stats as s (
+            user_id, month, sector, typology, fiche_code,
+            simulation_count, total_euros, total_cumacs, last_created_at
+        )
+        values (
+            rec.user_id, v_month, v_sector, v_typology, v_fiche,
+            1, coalesce(rec.result_euros, 0), coalesce(rec.result_cumacs, 0), rec.created_at
+        )
+        on conflict (user_id, month, sector, typology, fiche_code) do update set
+            simulation_count = s.simulation_count + 1,
+            total_euros = s.total_euros + excluded.total_euros,
+            total_cumacs = s.total_cumacs + excluded.total_cumacs,
+            last_created_at = greatest(s.last_created_at, excluded.last_created_at);
+        return;
+    end if;
+
+    update public.user_simulation_stats as s set
+        simulation_count = s.simulation_count - 1,
+        total_euros = s.total_euros - coalesce(rec.result_euros, 0),
+        total_cumacs = s.total_cumacs - coalesce(rec.result_cumacs, 0)
+    where s.user_id = rec.user_id and s.month = v_month and s.sector = v_sector
+        and s.typology = v_typology and s.fiche_code = v_fiche;
+
+    delete from public.user_simulation_stats as s
+    where s.user_id = rec.user_id and s.month = v_month and s.sector = v_sector
+        and s.typology = v_typology and s.fiche_code = v_fiche
+        and s.simulation_count <= 0;
+
+    -- La dernière simulation du compartiment a été retirée: recalcul du max
+    -- (limité à un mois d'un utilisateur, index user_id/created_at)
+    update public.user_simulation_stats as s set
+        last_created_at = (
+            select max(created_at) from public.simulations
+            where user_id = rec.user_id
+                and created_at >= date_trunc('month', rec.created_at)
+                and created_at < date_trunc('month', rec.created_at) + interval '1 month'
+                and coalesce(sector, '') = v_sector
+                and coalesce(typology, '') = v_typology
+                and coalesce(fiche_code, '') = v_fiche
+        )
+    where s.user_id = rec.user_id and s.month = v_month and s.sector = v_sector
+        and s.typology = v_typology and s.fiche_code = v_fiche
+        and s.last_created_at <= rec.created_at;
+end;
+$$;
+
+revoke execute on function public.apply_simulation_stats from public, anon, authenticated;
+
+
+create or replace function public.simulations_stats_trigger()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if tg_op in ('DELETE', 'UPDATE') then
+        perform public.apply_simulation_stats(old, -1);
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        perform public.apply_simulation_stats(new, 1);
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists simulations_stats on public.simulations;
+create trigger simulations_stats
+    after insert or delete or update of user_id, created_at, sector, typology, fiche_code, result_euros, result_cumacs
+    on public.simulations
+    for each row execute function public.simulations_stats_trigger();
+
+
+-- Recalcul complet (vérification, reprise après import): un utilisateur ou tous
+create or replace function public.rebuild_user_simulation_stats(p_user_id public.simulations.user_id%type default null)
+returns bigint
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_rows bigint;
+begin
+    delete from public.user_simulation_stats
+    where p_user_id is null or user_id = p_user_id;
+
+    insert into public.user_simulation_stats (
+        user_id, month, sector, typology, fiche_code,
+        simulation_count, total_euros, total_cumacs, last_created_at
+    )
+    select
+        user_id,
+        to_char(date_trunc('month', created_at), 'YYYY-MM'),
+        coalesce(sector, ''),
+        coalesce(typology, ''),
+        coalesce(fiche_code, ''),
+        count(*),
+        coalesce(sum(result_euros), 0),
+        coalesce(sum(result_cumacs), 0),
+        max(created_at)
+    from public.simulations
+    where p_user_id is null or user_id = p_user_id
+    group by 1, 2, 3, 4, 5;
+
+    get diagnostics v_rows = row_count;
+    return v_rows;
+end;
+$$;
+
+revoke execute on function public.rebuild_user_simulation_stats from public, anon, authenticated;
+grant execute on function public.rebuild_user_simulation_stats to service_role;
+
+
+-- simulation_kpis lit désormais les agrégats (même format de réponse)
+create or replace function public.simulation_kpis(p_user_id public.simulations.user_id%type)
+returns jsonb
+language sql
+stable
+as $$
+    with stats as (
+        select * from public.user_simulation_stats where user_id = p_user_id
+    ),
+    totals as (
+        select
+            coalesce(sum(simulation_count), 0) as total_count,
+            coalesce(sum(total_euros), 0) as total_euros,
+            coalesce(sum(total_cumacs), 0) as total_cumacs,
+            coalesce(sum(total_euros) / nullif(sum(simulation_count), 0), 0) as average_euros,
+            coalesce(sum(simulation_count) filter (where month = to_char(now(), 'YYYY-MM')), 0) as this_month_count,
+            max(last_created_at) as last_created_at
+        from stats
+    )
+    select jsonb_build_object(
+        'total_count', totals.total_count,
+        'total_euros', totals.total_euros,
+        'total_cumacs', totals.total_cumacs,
+        'average_euros', totals.average_euros,
+        'this_month_count', totals.this_month_count,
+        'last_created_at', totals.last_created_at,
+        'by_sector', coalesce((
+            select jsonb_agg(jsonb_build_object('key', sector, 'count', n, 'euros', e, 'cumacs', c) order by sector)
+            from (select sector, sum(simulation_count) as n, sum(total_euros) as e, sum(total_cumacs) as c from stats group by sector) as t
+        ), '[]'::jsonb),
+        'by_typology', coalesce((
+            select jsonb_agg(jsonb_build_object('key', typology, 'count', n, 'euros', e, 'cumacs', c) order by typology)
+            from (select typology, sum(simulation_count) as n, sum(total_euros) as e, sum(total_cumacs) as c from stats group by typology) as t
+        ), '[]'::jsonb),
+        'by_month', coalesce((
+            select jsonb_agg(jsonb_build_object('key', month, 'count', n, 'euros', e, 'cumacs', c) order by month)
+            from (select month, sum(simulation_count) as n, sum(total_euros) as e, sum(total_cumacs) as c from stats group by month) as t
+        ), '[]'::jsonb),
+        'by_fiche', coalesce((
+            select jsonb_agg(jsonb_build_object('key', fiche_code, 'count', n, 'euros', e, 'cumacs', c) order by fiche_code)
+            from (select fiche_code, sum(simulation_count) as n, sum(total_euros) as e, sum(total_cumacs) as c from stats group by fiche_code) as t
+        ), '[]'::jsonb)
+    )
+    from totals;
+$$;
+
+-- Initialisation à partir de l'historique existant
+select public.rebuild_user_simulation_stats();
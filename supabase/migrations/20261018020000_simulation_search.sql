@@ -0,0 +1,44 @@
+-- Recherche dans l'historique des simulations, insensible à la casse et aux
+-- accents ("energie" trouve "énergie"):
+--   - search_text: texte normalisé (unaccent + minuscules), index trigramme
+--     pour les recherches partielles (ilike '%terme%');
+--   - search_tsv: vecteur plein texte français (racines: "pompes" -> "pompe").
+
+create extension if not exists unaccent with schema extensions;
+create extension if not exists pg_trgm with schema extensions;
+
+-- unaccent n'est pas IMMUTABLE: enveloppe utilisable dans une colonne générée
+create or replace function public.simulation_search_text(
+    p_name text,
+    p_fiche_code text,
+    p_fiche_description text,
+    p_department text
+)
+returns text
+language sql
+immutable
+parallel safe
+as $$
+    select lower(extensions.unaccent(
+        'extensions.unaccent'::regdictionary,
+        concat_ws(' ', p_name, p_fiche_code, p_fiche_description, p_department)
+    ));
+$$;
+
+alter table public.simulations
+    add column if not exists search_text text
+    generated always as (
+        public.simulation_search_text(name, fiche_code, fiche_description, department)
+    ) stored;
+
+alter table public.simulations
+    add column if not exists search_tsv tsvector
+    generated always as (
+        to_tsvector('french'::regconfig, public.simulation_search_text(name, fiche_code, fiche_description, department))
+    ) stored;
+
+create index if not exists simulations_search_text_trgm_idx
+    on public.simulations using gin (search_text extensions.gin_trgm_ops);
+
+create index if not exists simulations_search_tsv_idx
+    on public.simulations using gin (search_tsv);
@@ -0,0 +1,24 @@
+-- Noms des paramètres (clés de input_data) d'un historique: colonnes
+-- variables des exports CSV/XLSX, connues avant de diffuser la première ligne.
+-- input_data contient un objet JSON, stocké tel quel ou sous forme de texte.
+
+create or replace function public.simulation_input_keys(p_user_id public.simulations.user_id%type default null)
+returns setof text
+language sql
+stable
+as $$
+    with raw as (
+        select input_data::text::jsonb as v
+        from public.simulations
+        where (p_user_id is null or user_id = p_user_id)
+            and input_data is not null
+    ),
+    decoded as (
+        select case when jsonb_typeof(v) = 'string' then (v #>> '{}')::jsonb else v end as v
+        from raw
+    )
+    select distinct k
+    from decoded,
+        jsonb_object_keys(case when jsonb_typeof(v) = 'object' then v else '{}'::jsonb end) as k
+    order by k;
+$$;
@@ -0,0 +1,141 @@
+"""
+Client Supabase minimal en mémoire pour les tests du dépôt de simulations.
+
+Reproduit ce dont SimulationRepository dépend: filtres eq/gte/lt/lte/in_,
+arbres logiques or_ (eq, gt, lt, is.null, not), tris avec la place des NULL de
+PostgreSQL, limit/range et le plafond max-rows de PostgREST.
+"""
+
+import re
+from functools import cmp_to_key
+from typing import Any, Callable, Dict, List, Optional
+
+
+def _split(expr: str) -> List[str]:
+    """Découpe une liste PostgREST au premier niveau (virgules hors parenthèses et guillemets)."""
+    parts, depth, quoted, current = [], 0, False, ""
+    for char in expr:
+        if char == '"' and not current.endswith("\\"):
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        if char == "," and depth == 0 and not quoted:
+            parts.append(current)
+            current = ""
+        else:
+            current += char
+    parts.append(current)
+    return parts
+
+
+def _value(text: str) -> Any:
+    if text.startswith('"') and text.endswith('"'):
+        return text[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return text
+
+
+def _condition(expr: str) -> Callable[[Dict[str, Any]], bool]:
+    match = re.fullmatch(r"(and|or)\((.*)\)", expr)
+    if match:
+        children = [_condition(part) for part in _split(match.group(2))]
+        if match.group(1) == "and":
+            return lambda row: all(child(row) for child in children)
+        return lambda row: any(child(row) for child in children)
+
+    column, op, raw = expr.split(".", 2)
+    if op == "not":
+        condition = _condition(f"{column}.{raw}")
+        return lambda row: not condition(row)
+    value = _value(raw)
+    if op == "is":
+        return lambda row: row.get(column) is None
+    compare = {
+        "eq": lambda a, b: a == b,
+        "gt": lambda a, b: a > b,
+        "lt": lambda a, b: a < b,
+    }[op]
+    return lambda row: row.get(column) is not None and compare(str(row.get(column)), value)
+
+
+class FakeQuery:
+    def __init__(self, client: "FakeClient", rows: List[Dict[str, Any]]):
+        self.client = client
+        self.rows = rows
+        self.filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self.orders: List[tuple] = []
+        self.start, self.stop = 0, None
+
+    def select(self, columns: str, count: Optional[str] = None):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row[column] >= value)
+        return self
+
+    def lt(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row[column] < value)
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row[column] <= value)
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def or_(self, expr: str):
+        self.filters.append(_condition(f"or({expr})"))
+        return self
+
+    def order(self, column, desc=False, nullsfirst=None):
+        # PostgreSQL: NULLS LAST en ordre croissant, NULLS FIRST en décroissant
+        self.orders.append((column, desc, desc if nullsfirst is None else nullsfirst))
+        return self
+
+    def limit(self, count):
+        self.stop = self.start + count
+        return self
+
+    def range(self, start, end):
+        self.start, self.stop = start, end + 1
+        return self
+
+    def _compare(self, a, b):
+        for column, desc, nulls_first in self.orders:
+            x, y = a.get(column), b.get(column)
+            if x == y:
+                continue
+            if x is None or y is None:
+                return (-1 if x is None else 1) * (1 if nulls_first else -1)
+            result = -1 if x < y else 1
+            return -result if desc else result
+        return 0
+
+    def execute(self):
+        rows = [row for row in self.rows if all(f(row) for f in self.filters)]
+        rows.sort(key=cmp_to_key(self._compare))
+        rows = rows[self.start:self.stop][:self.client.max_rows]
+        self.client.requests += 1
+        return type("Response", (), {"data": rows, "count": None})()
+
+
+class FakeClient:
+    """Table unique en mémoire, réponses plafonnées à max_rows lignes."""
+
+    def __init__(self, rows: List[Dict[str, Any]], max_rows: int = 1000):
+        self.rows = rows
+        self.max_rows = max_rows
+        self.requests = 0
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, self.rows)
+
+    def rpc(self, name: str, params: Dict[str, Any]):
+        raise RuntimeError(f"Fonction {name} non déployée")
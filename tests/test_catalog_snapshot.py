@@ -0,0 +1,84 @@
+"""Évictions du snapshot du catalogue partagées entre workers et instances."""
+
+import json
+
+import pytest
+
+from app.services import catalog_snapshot as catalog_snapshot_module
+from app.services.catalog_snapshot import CatalogSnapshotStore, build_snapshot
+from app.services.fiche_bundle import pack_bundle
+
+CODES = ("BAR-TH-101", "BAR-TH-104")
+
+
+class SharedBucket:
+    """Dossier _catalog du bucket, commun à tous les processus simulés."""
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = 0
+
+    def validators(self, bucket, folder):
+        return {path.rsplit("/", 1)[1]: etag for path, (_, etag) in self.objects.items()}
+
+    def read(self, bucket, path, file_type="txt"):
+        if path not in self.objects:
+            return None
+        content = self.objects[path][0]
+        return json.loads(content) if file_type == "json" else content
+
+    def upload(self, bucket, path, content, content_type="", upsert=False):
+        self.uploads += 1
+        self.objects[path] = (content, f"etag-{self.uploads}")
+        return True
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    bucket = SharedBucket()
+    monkeypatch.setattr(catalog_snapshot_module, "get_file_validators", bucket.validators)
+    monkeypatch.setattr(catalog_snapshot_module, "read_file_from_bucket", bucket.read)
+    monkeypatch.setattr(catalog_snapshot_module, "upload_file_to_bucket", bucket.upload)
+    return bucket
+
+
+def _workers(tmp_path, count=2):
+    """Processus servant le même fichier de snapshot."""
+    path = str(tmp_path / "catalog_snapshot.bin")
+    bundles = {code: pack_bundle(code, {"string_function": "def calcul(): return 1"}) for code in CODES}
+    build_snapshot(path, bundles, [], {}, {}, {}, {})
+    workers = [CatalogSnapshotStore(path) for _ in range(count)]
+    for worker in workers:
+        worker.boot()
+    return workers
+
+
+def test_eviction_reaches_other_workers(tmp_path, bucket):
+    first, second = _workers(tmp_path)
+    assert first.evict("BAR-TH-101") == 1
+    assert second.serves("BAR-TH-101") is not None
+
+    assert second.poll_evictions() == 1
+    assert second.serves("BAR-TH-101") is None
+    assert second.serves("BAR-TH-104") is not None
+
+    # Liste inchangée: pas de nouveau téléchargement
+    assert second.poll_evictions() == 0
+
+
+def test_evictions_accumulate_and_follow_snapshot_version(tmp_path, bucket):
+    first, second = _workers(tmp_path)
+    first.evict("BAR-TH-101")
+    second.evict("BAR-TH-104")
+
+    first.poll_evictions()
+    assert first.serves("BAR-TH-104") is None
+    assert first.serves("BAR-TH-101") is None
+
+    # Évictions d'une autre version du snapshot: ignorées
+    record = json.loads(bucket.objects[catalog_snapshot_module.CATALOG_EVICTIONS_OBJECT][0])
+    record["version"] = "autre"
+    bucket.upload(None, catalog_snapshot_module.CATALOG_EVICTIONS_OBJECT, json.dumps(record).encode())
+    third, = _workers(tmp_path, count=1)
+    assert third.poll_evictions() == 0
+    assert third.serves("BAR-TH-101") is not None
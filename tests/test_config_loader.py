@@ -0,0 +1,131 @@
+"""Invalidation des fiches servies par le snapshot du catalogue, fraîcheur des bundles."""
+
+import asyncio
+import sys
+
+import pytest
+
+from app.services import catalog_snapshot as catalog_snapshot_module
+from app.services.catalog_snapshot import CatalogSnapshotStore, build_snapshot
+from app.services.config_loader import ConfigLoader, FicheConfig
+from app.services.fiche_bundle import BUNDLE_FILE_NAME, pack_bundle, source_validators
+from app.services.fiche_cache import FicheConfigCache
+
+# app.services réexporte l'instance config_loader sous le nom du module
+config_loader_module = sys.modules[ConfigLoader.__module__]
+
+
+@pytest.fixture
+def snapshot_store(tmp_path, monkeypatch):
+    path = str(tmp_path / "catalog_snapshot.bin")
+    bundles = {
+        code: pack_bundle(code, {"string_function": "def calcul(): return 1"})
+        for code in ("BAR-TH-101", "BAR-TH-104")
+    }
+    build_snapshot(path, bundles, [], {}, {}, {}, {})
+    store = CatalogSnapshotStore(path)
+    store.boot()
+    # Publication des évictions dans le bucket (voir test_catalog_snapshot)
+    monkeypatch.setattr(catalog_snapshot_module, "read_file_from_bucket", lambda *args: None)
+    monkeypatch.setattr(catalog_snapshot_module, "upload_file_to_bucket", lambda *args, **kwargs: True)
+
+    # Version republiée, servie par Supabase Storage
+    republished = lambda code: FicheConfig(code, "", {}, {}, {}, "def calcul(): return 2")
+    monkeypatch.setattr(config_loader_module, "catalog_snapshots", store)
+    monkeypatch.setattr(config_loader_module, "fiche_config_cache", FicheConfigCache(loader=republished))
+    return store
+
+
+def test_invalidated_fiche_no_longer_served_from_snapshot(snapshot_store):
+    assert ConfigLoader.load_fiche_config("BAR-TH-101").string_function.endswith("1")
+
+    assert ConfigLoader.invalidate_fiche_config("BAR-TH-101") == 1
+    assert ConfigLoader.load_fiche_config("BAR-TH-101").string_function.endswith("2")
+    assert ConfigLoader.load_fiche_config("BAR-TH-104").string_function.endswith("1")
+
+
+def test_invalidate_all_evicts_snapshot(snapshot_store):
+    assert ConfigLoader.invalidate_fiche_config() == 2
+    assert ConfigLoader.load_fiche_config("BAR-TH-104").string_function.endswith("2")
+
+
+def test_new_snapshot_serves_fiches_again(snapshot_store):
+    ConfigLoader.invalidate_fiche_config("BAR-TH-101")
+    snapshot_store._swap(snapshot_store.current)
+    assert ConfigLoader.load_fiche_config("BAR-TH-101").string_function.endswith("1")
+
+
+class FakeBucket:
+    """Dossier d'une fiche dans Supabase Storage: contenu et ETag par fichier."""
+
+    def __init__(self):
+        self.objects = {}
+        self.reads = []
+        self.uploads = 0
+
+    def publish(self, name, content):
+        self.uploads += 1
+        self.objects[name] = (content, f"etag-{self.uploads}")
+
+    def validators(self, bucket, folder):
+        return {name: etag for name, (_, etag) in self.objects.items()}
+
+    def read(self, bucket, path, file_type="json"):
+        name = path.split("/", 1)[1]
+        self.reads.append(name)
+        return self.objects[name][0] if name in self.objects else None
+
+    async def read_async(self, bucket, path, file_type="json"):
+        return self.read(bucket, path, file_type)
+
+    async def read_many_async(self, bucket, files):
+        return {key: self.read(bucket, path, file_type) for key, (path, file_type) in files.items()}
+
+    async def validators_async(self, bucket, folder):
+        return self.validators(bucket, folder)
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    bucket = FakeBucket()
+    bucket.publish("string_function.txt", "def calcul(): return 1")
+    monkeypatch.setattr(config_loader_module, "get_file_validators", bucket.validators)
+    monkeypatch.setattr(config_loader_module, "get_file_validators_async", bucket.validators_async)
+    monkeypatch.setattr(config_loader_module, "read_file_from_bucket", bucket.read)
+    monkeypatch.setattr(config_loader_module, "read_file_from_bucket_async", bucket.read_async)
+    monkeypatch.setattr(config_loader_module, "read_files_from_bucket_async", bucket.read_many_async)
+    monkeypatch.setattr(config_loader_module, "_fiches_without_bundle", set())
+    return bucket
+
+
+def _pack(bucket):
+    """Équivalent de tools/pack_fiche_bundles pour le dossier simulé."""
+    files = {"string_function": bucket.objects["string_function.txt"][0]}
+    bundle = pack_bundle("BAR-TH-101", files, source_validators(bucket.validators(None, None)))
+    bucket.publish(BUNDLE_FILE_NAME, bundle)
+
+
+def test_current_bundle_served_alone(bucket):
+    _pack(bucket)
+    config = ConfigLoader.fetch_fiche_config("BAR-TH-101")
+    assert config.string_function.endswith("1")
+    assert bucket.reads == [BUNDLE_FILE_NAME]
+
+
+def test_bundle_older_than_legacy_files_is_ignored(bucket):
+    _pack(bucket)
+    # Republication « à l'ancienne », sans reconstruire le bundle
+    bucket.publish("string_function.txt", "def calcul(): return 2")
+
+    assert ConfigLoader.fetch_fiche_config("BAR-TH-101").string_function.endswith("2")
+    config = asyncio.run(ConfigLoader.fetch_fiche_config_async("BAR-TH-101"))
+    assert config.string_function.endswith("2")
+
+
+def test_fiche_without_bundle_skips_bundle_request(bucket):
+    assert ConfigLoader.fetch_fiche_config("BAR-TH-101").string_function.endswith("1")
+    assert BUNDLE_FILE_NAME not in bucket.reads
+
+    # En asynchrone, la fiche connue sans bundle est lue avec le listing
+    asyncio.run(ConfigLoader.fetch_fiche_config_async("BAR-TH-101"))
+    assert BUNDLE_FILE_NAME not in bucket.reads
@@ -0,0 +1,45 @@
+"""Isolation des dépassements de durée dans le pool d'exécution des fiches."""
+
+import threading
+
+import pytest
+
+from app.services.execution_pool import ExecutionPool, FicheTimeoutError
+
+# time.sleep ne consomme pas de temps CPU: seule la durée de l'appel est dépassée
+SLEEP = """
+def calcul(seconds):
+    import time
+    time.sleep(seconds)
+    return seconds
+"""
+
+
+@pytest.fixture
+def pool():
+    pool = ExecutionPool(workers=2, timeout=5, memory_limit_mb=0)
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+
+def test_timeout_does_not_fail_concurrent_call(pool):
+    results = {}
+
+    def neighbour():
+        results["neighbour"] = pool.call(SLEEP, {"seconds": 1.5}, fiche_code="SLEEP")
+
+    thread = threading.Thread(target=neighbour)
+    thread.start()
+    with pytest.raises(FicheTimeoutError):
+        pool.call(SLEEP, {"seconds": 30}, fiche_code="SLEEP", timeout=0.5)
+    thread.join()
+
+    assert results["neighbour"] == 1.5
+
+
+def test_timeout_keeps_other_parts_of_batch(pool):
+    outcomes = pool.call_many(SLEEP, [{"seconds": 30}, {"seconds": 0.5}], fiche_code="SLEEP", timeout=2)
+
+    assert outcomes[0][0] is False and "interrompu" in outcomes[0][2]
+    assert outcomes[1] == (True, 0.5, "")
@@ -0,0 +1,79 @@
+"""Parcours de l'historique face au plafond de lignes de PostgREST."""
+
+import pytest
+
+from app.services.simulation_repository import SimulationFilters, SimulationRepository, decode_input_data
+
+from .fake_postgrest import FakeClient
+
+
+def _history(count, user_id="u1"):
+    return [
+        {
+            "id": f"{user_id}-{i:06d}",
+            "user_id": user_id,
+            "name": f"Simulation {i}",
+            "created_at": f"2026-01-01T00:00:{i % 60:02d}",
+            "input_data": {f"param_{i % 3}": i},
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def repository(monkeypatch):
+    def make(rows, max_rows=1000):
+        client = FakeClient(rows, max_rows=max_rows)
+        repo = SimulationRepository()
+        monkeypatch.setattr(repo, "_get_client", lambda: client)
+        return repo, client
+    return make
+
+
+@pytest.mark.parametrize("batch_size", [500, 1000, 2000])
+def test_iter_simulations_reads_past_row_cap(repository, batch_size):
+    repo, _ = repository(_history(5000))
+    rows = list(repo.iter_simulations("u1", batch_size=batch_size))
+    assert len(rows) == 5000
+    assert len({row["id"] for row in rows}) == 5000
+
+
+def test_iter_simulations_empty_history(repository):
+    repo, client = repository([])
+    assert list(repo.iter_simulations("u1")) == []
+    assert client.requests == 1
+
+
+def test_iter_simulations_filters_owner(repository):
+    repo, _ = repository(_history(1500) + _history(700, user_id="u2"))
+    assert len(list(repo.iter_simulations("u2"))) == 700
+    assert len(list(repo.iter_simulations(None))) == 2200
+
+
+def test_fetch_input_keys_fallback_scans_whole_history(repository):
+    rows = _history(3000)
+    rows[-1]["input_data"] = {"last_only": 1}
+    repo, _ = repository(rows)
+    assert repo.fetch_input_keys("u1") == ["last_only", "param_0", "param_1", "param_2"]
+    assert decode_input_data(rows[0]["input_data"]) == {"param_0": 0}
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_fetch_page_keeps_null_sort_values(repository, descending):
+    rows = _history(25)
+    for i, row in enumerate(rows):
+        row["date_signature"] = None if i % 3 == 0 else f"2025-0{i % 9 + 1}-01"
+    repo, _ = repository(rows)
+
+    seen, after = [], None
+    while True:
+        page = repo.fetch_page("u1", SimulationFilters(), "signature_date", descending, 4, after=after)
+        seen += page.rows
+        if not page.has_more:
+            break
+        after = page.last_key
+
+    assert sorted(row["id"] for row in seen) == sorted(row["id"] for row in rows)
+    # NULL classé comme la plus petite valeur (comme SimulationIndex)
+    nulls = [row["date_signature"] is None for row in seen]
+    assert nulls == sorted(nulls, reverse=not descending)
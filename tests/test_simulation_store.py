@@ -0,0 +1,123 @@
+"""Index de l'historique: construction en arrière-plan, plafond de lignes de PostgREST."""
+
+import sys
+from concurrent.futures import Future
+
+import pytest
+
+from app.services.simulation_repository import SimulationFilters, simulation_repository
+from app.services.simulation_store import SimulationStore
+
+from .fake_postgrest import FakeClient
+
+# app.services réexporte l'instance simulation_store sous le nom du module
+simulation_store_module = sys.modules[SimulationStore.__module__]
+
+
+def _history(count, user_id="u1"):
+    return [
+        {
+            "id": f"{user_id}-{i:06d}",
+            "user_id": user_id,
+            "name": f"Simulation {i}",
+            "created_at": f"2026-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}",
+            "result_euros": 1.0,
+        }
+        for i in range(count)
+    ]
+
+
+class DeferredExecutor:
+    """Garde les constructions soumises: le test décide quand elles s'exécutent."""
+
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, fn, *args):
+        self.calls.append((fn, args))
+        return Future()
+
+    def run(self):
+        calls, self.calls = self.calls, []
+        for fn, args in calls:
+            fn(*args)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = FakeClient(_history(2500) + _history(300, user_id="u2") + _history(300, user_id="u3"))
+    monkeypatch.setattr(simulation_repository, "_get_client", lambda: client)
+    return client
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    executor = DeferredExecutor()
+    monkeypatch.setattr(simulation_store_module, "_index_executor", executor)
+    return executor
+
+
+def test_page_does_not_wait_for_index(client, builds):
+    store = SimulationStore()
+    page = store.page("u1", SimulationFilters(), page_size=10)
+    assert len(page.rows) == 10
+    assert client.requests == 1
+    assert len(builds.calls) == 1
+
+    # Construction déjà planifiée: pas de nouvelle soumission
+    store.page("u1", SimulationFilters(), page_size=10, offset=10)
+    assert len(builds.calls) == 1
+
+
+def test_index_covers_history_past_row_cap(client, builds):
+    store = SimulationStore()
+    assert store.index("u1") is None
+    builds.run()
+
+    index = store.index("u1")
+    assert index is not None and len(index) == 2500
+
+    requests = client.requests
+    page = store.page("u1", SimulationFilters(), offset=2490, page_size=10, with_count=True)
+    assert page.total == 2500
+    assert len(page.rows) == 10
+    assert not page.has_more
+    assert client.requests == requests
+
+
+def test_failed_build_remembered_until_invalidation(client, builds, monkeypatch):
+    store = SimulationStore()
+    store.kpis("u1")
+    monkeypatch.setattr(simulation_repository, "fetch_recent", lambda *args, **kwargs: _history(1000))
+    store.index("u1")
+    builds.run()
+
+    assert store.index("u1") is None
+    assert builds.calls == []
+
+    store.invalidate("u1")
+    store.index("u1")
+    assert len(builds.calls) == 1
+
+
+def test_index_built_from_complete_recent_rows(client, builds):
+    store = SimulationStore()
+    store.recent("u2", limit=500)
+    index = store.index("u2")
+    assert index is not None and len(index) == 300
+    assert builds.calls == []
+
+
+def test_indexed_rows_bounded_across_users(client, builds):
+    store = SimulationStore(max_indexed_rows=700)
+    for user_id in ("u2", "u3"):
+        store.index(user_id)
+    builds.run()
+    assert store._entries["u2"].index is not None
+
+    # u1 dépasse seul le budget: les index des autres utilisateurs sont libérés
+    store.index("u1")
+    builds.run()
+    assert store._entries["u2"].index is None
+    assert store._entries["u3"].index is None
+    assert len(store._entries["u1"].index) == 2500
@@ -0,0 +1,55 @@
+"""Balayage: mêmes valeurs de paramètres que le simulateur interactif."""
+
+from app.services.config_loader import FicheConfig, option_value
+from app.services.function_loader import FunctionLoader
+from app.services.sweep import build_sweep_axes, iter_sweep
+
+# Table indexée par le texte de l'option mappée: "1" et 1 ne sont pas équivalents
+FUNCTION = """
+def calcul(zone, isolation, surface):
+    coef = {"1": 1.2, "2": 1.0}[zone]
+    return coef * surface * (2 if isolation else 1)
+"""
+
+CONFIG = FicheConfig(
+    code="TEST-SWEEP",
+    description="",
+    function_param_values={},
+    variables_mapping={
+        "Zone": {"H1": "1", "H2": "2"},
+        "Isolation": ["Oui", "Non"],
+    },
+    variables_matching={"Zone": "zone", "Isolation": "isolation", "Surface": "surface"},
+    string_function=FUNCTION,
+)
+
+
+def _simulate(options, surface):
+    """Équivalent de set_param puis execute_simulation (sans pool)."""
+    params = {
+        CONFIG.variables_matching[label]: option_value(CONFIG.variables_mapping[label], option)
+        for label, option in options.items()
+    }
+    params["surface"] = surface
+    loader = FunctionLoader(CONFIG.string_function, fiche_code=CONFIG.code)
+    return float(loader.call_with_dict(params))
+
+
+def test_single_point_matches_simulation():
+    axes = build_sweep_axes(CONFIG, {"surface": [80.0]}, select_params=["zone"])
+    base = {"isolation": option_value(["Oui", "Non"], "Oui"), "surface": 80.0}
+    rows = [row for chunk in iter_sweep(CONFIG, base, axes) for row in chunk.rows]
+
+    row = next(row for row in rows if row["zone"] == "H1")
+    assert row["success"]
+    assert row["cumacs"] == _simulate({"Zone": "H1", "Isolation": "Oui"}, 80.0)
+
+
+def test_sweep_matches_simulation_for_every_option():
+    axes = build_sweep_axes(CONFIG, {"surface": [50.0, 100.0]})
+    rows = [row for chunk in iter_sweep(CONFIG, {}, axes) for row in chunk.rows]
+
+    assert len(rows) == 8
+    for row in rows:
+        expected = _simulate({"Zone": row["zone"], "Isolation": row["isolation"]}, float(row["surface"]))
+        assert row["success"] and row["cumacs"] == expected